@@ -4,11 +4,19 @@ import frappe
 import json
 from frappe import _
 from frappe.utils import now, now_datetime
+from pos_restaurant_itb.utils.doc_handoff import get_handoff_doc, handoff
+from pos_restaurant_itb.utils.kot_helpers import get_attribute_summary
+from pos_restaurant_itb.utils.variants import encode_attributes, get_attributes_hash
 
 @frappe.whitelist()
 def create_kot_from_pos_order(pos_order_id: str):
     """
     Create a Kitchen Order Ticket (KOT) from POS Order.
+
+    Does not commit: the KOT, its KDS and Kitchen Station entries and the
+    POS Order updates are written in the caller's transaction. On error the
+    exception is raised again so that the whole transaction is rolled back,
+    along with its queued after-commit work and reserved sequence blocks.
     
     Args:
         pos_order_id: The ID of the POS Order
@@ -20,7 +28,7 @@ def create_kot_from_pos_order(pos_order_id: str):
         frappe.throw(_("POS Order ID is required."))
     
     try:
-        pos_order = frappe.get_doc("POS Order", pos_order_id)
+        pos_order = get_handoff_doc("POS Order", pos_order_id)
         
         # Check if any items need to be sent to kitchen
         items_to_send = [
@@ -56,25 +64,19 @@ def create_kot_from_pos_order(pos_order_id: str):
                 "kot_last_update": now_datetime(),
                 # Copy variant attributes if available
                 "variant_attributes": item.variant_attributes,
+                "pos_order_item": item.name,
                 "cancelled": False
             })
         
-        # Insert KOT
-        kot.insert(ignore_permissions=True)
-        
-        # Update POS Order items to mark them as sent to kitchen
-        for item in items_to_send:
-            frappe.db.set_value("POS Order Item", item.name, {
-                "sent_to_kitchen": 1,
-                "kot_id": kot.name
-            })
+        # Insert KOT; its validate and after_insert reuse the order in memory,
+        # and after_insert marks the POS Order items as sent to kitchen
+        with handoff(pos_order):
+            kot.insert(ignore_permissions=True)
         
-        # Update POS Order status if needed
-        if pos_order.status == "Draft":
+        # Update POS Order status if needed; a new KOT reopens kitchen work
+        if pos_order.status in ("Draft", "Ready for Billing"):
             frappe.db.set_value("POS Order", pos_order.name, "status", "In Progress")
         
-        frappe.db.commit()
-        
         return {
             "status": "success",
             "message": _("Kitchen Order Ticket created successfully."),
@@ -82,11 +84,217 @@ def create_kot_from_pos_order(pos_order_id: str):
         }
         
     except Exception as e:
+        # A partially built KOT / kitchen fan-out must not be committed
         log_error(e, pos_order_id)
-        return {
-            "status": "error",
-            "message": _("Error creating Kitchen Order Ticket: {0}").format(str(e))
+        raise
+
+@frappe.whitelist()
+def create_kots_for_orders(order_ids):
+    """
+    Create Kitchen Order Tickets for many POS Orders at once.
+
+    Orders, their unsent items and branches are loaded with a few queries,
+    all KOTs and KOT Items are written with one multi-row insert each, and
+    the sent-to-kitchen flags and order statuses are set with one UPDATE
+    each. Naming, branch checks and flags match create_kot_from_pos_order.
+    
+    Args:
+        order_ids: List (or JSON list) of POS Order IDs
+        
+    Returns:
+        Dict of POS Order ID -> result dict, in the shape returned by
+        create_kot_from_pos_order
+    """
+    if isinstance(order_ids, str):
+        order_ids = json.loads(order_ids)
+    
+    order_ids = list(dict.fromkeys(order_ids or []))
+    if not order_ids:
+        frappe.throw(_("POS Order IDs are required."))
+    
+    orders = {
+        order.name: order
+        for order in frappe.get_all(
+            "POS Order",
+            filters={"name": ["in", order_ids]},
+            fields=["name", "branch", "table", "status", "docstatus"]
+        )
+    }
+    
+    items_by_order = {}
+    branches = {}
+    if orders:
+        items = frappe.get_all(
+            "POS Order Item",
+            filters={
+                "parenttype": "POS Order",
+                "parent": ["in", list(orders)],
+                "sent_to_kitchen": 0,
+                "cancelled": 0
+            },
+            fields=["name", "parent", "item_code", "item_name", "qty", "note", "variant_attributes"],
+            order_by="idx asc"
+        )
+        for item in items:
+            items_by_order.setdefault(item.parent, []).append(item)
+        
+        branches = {
+            branch.name: branch
+            for branch in frappe.get_all(
+                "Branch",
+                filters={"name": ["in", list({order.branch for order in orders.values()})]},
+                fields=["name", "branch_code", "is_active"]
+            )
         }
+    
+    results = {}
+    to_create = []
+    for order_id in order_ids:
+        order = orders.get(order_id)
+        branch = branches.get(order.branch) if order else None
+        
+        if not order:
+            results[order_id] = {"status": "error", "message": _("POS Order {0} not found.").format(order_id)}
+        elif order.docstatus == 1 and order.status == "Paid":
+            results[order_id] = {"status": "error", "message": _("Cannot create KOT from a finalized POS Order.")}
+        elif not branch or not branch.is_active:
+            results[order_id] = {"status": "error", "message": _("Cannot create kitchen orders for inactive branch.")}
+        elif not items_by_order.get(order_id):
+            results[order_id] = {"status": "warning", "message": _("No new items to send to kitchen.")}
+        else:
+            to_create.append(order)
+    
+    if not to_create:
+        return results
+    
+    kots = build_kots(to_create, items_by_order, branches)
+    bulk_insert_kots(kots)
+    
+    # Flag exactly the POS Order rows each KOT was built from
+    frappe.db.sql("""
+        UPDATE `tabPOS Order Item` poi
+        INNER JOIN `tabKOT Item` ki ON ki.pos_order_item = poi.name
+        SET poi.sent_to_kitchen = 1, poi.kot_id = ki.parent, poi.modified = %s
+        WHERE ki.parenttype = 'Kitchen Order Ticket'
+        AND ki.parent IN %s
+    """, (now_datetime(), tuple(kot.name for kot in kots)))
+    
+    # Update POS Order status if needed; a new KOT reopens kitchen work
+    frappe.db.sql("""
+        UPDATE `tabPOS Order`
+        SET status = 'In Progress', modified = %s
+        WHERE name IN %s AND status IN ('Draft', 'Ready for Billing')
+    """, (now_datetime(), tuple(order.name for order in to_create)))
+    
+    # Bulk inserts skip document hooks, run the KOT after_insert pipeline explicitly
+    from pos_restaurant_itb.utils.kitchen_pipeline import process_kot_after_insert
+    for kot in kots:
+        process_kot_after_insert(kot)
+        results[kot.pos_order] = {
+            "status": "success",
+            "message": _("Kitchen Order Ticket created successfully."),
+            "kot_id": kot.name
+        }
+    
+    return results
+
+def build_kots(orders, items_by_order, branches):
+    """
+    Build unsaved KOT documents for the given orders, named in advance
+    with one sequence reservation per branch
+    """
+    from pos_restaurant_itb.utils.sequence import reserve_sequence
+    
+    timestamp = now_datetime()
+    today = timestamp.strftime("%Y%m%d")
+    waiter = get_waiter_from_user(frappe.session.user)
+    
+    orders_by_branch = {}
+    for order in orders:
+        orders_by_branch.setdefault(order.branch, []).append(order)
+    
+    # Same KOT-YYYYMMDD-BRANCHCODE-#### IDs as KOT.autoname
+    kot_ids_by_branch = {}
+    for branch_name, branch_orders in orders_by_branch.items():
+        branch_code = (branches[branch_name].branch_code or "XXX").strip().upper()
+        prefix = f"KOT-{today}-{branch_code}"
+        numbers = reserve_sequence(
+            "Kitchen Order Ticket", branch_code, today, len(branch_orders), legacy_prefix=prefix
+        )
+        kot_ids_by_branch[branch_name] = iter(f"{prefix}-{str(n).zfill(4)}" for n in numbers)
+    
+    # Same canonical attributes as KOT.validate
+    attributes_by_row = {
+        item.name: encode_attributes(item.variant_attributes) if item.variant_attributes else None
+        for order in orders
+        for item in items_by_order[order.name]
+    }
+    
+    kots = []
+    for order in orders:
+        kot_id = next(kot_ids_by_branch[order.branch])
+        kot = frappe.get_doc({
+            "doctype": "Kitchen Order Ticket",
+            "name": kot_id,
+            "kot_id": kot_id,
+            "pos_order": order.name,
+            "table": order.table,
+            "branch": order.branch,
+            "kot_time": timestamp,
+            "status": "New",
+            "waiter": waiter,
+            "kot_items": [
+                {
+                    "name": frappe.generate_hash(length=10),
+                    "item_code": item.item_code,
+                    "item_name": item.item_name,
+                    "qty": item.qty,
+                    "note": item.note,
+                    "kot_status": "Queued",
+                    "kot_last_update": timestamp,
+                    "variant_attributes": attributes_by_row[item.name],
+                    "attribute_summary": get_attribute_summary(attributes_by_row[item.name]),
+                    "attributes_hash": get_attributes_hash(attributes_by_row[item.name]),
+                    "pos_order_item": item.name,
+                    "cancelled": 0
+                }
+                for item in items_by_order[order.name]
+            ]
+        })
+        kots.append(kot)
+    
+    return kots
+
+def bulk_insert_kots(kots):
+    """
+    Write KOTs and their items with one multi-row insert per table
+    """
+    timestamp = now_datetime()
+    user = frappe.session.user
+    standard = {"creation": timestamp, "modified": timestamp, "modified_by": user, "owner": user, "docstatus": 0}
+    
+    kot_fields = ["name", "creation", "modified", "modified_by", "owner", "docstatus", "idx",
+                  "kot_id", "pos_order", "table", "branch", "status", "kot_time", "waiter"]
+    item_fields = ["name", "creation", "modified", "modified_by", "owner", "docstatus", "idx",
+                   "parent", "parenttype", "parentfield", "item_code", "item_name", "qty", "note",
+                   "kot_status", "kot_last_update", "variant_attributes", "attribute_summary",
+                   "attributes_hash", "pos_order_item", "cancelled"]
+    
+    kot_values = []
+    item_values = []
+    for kot in kots:
+        row = dict(standard, idx=0)
+        row.update({f: kot.get(f) for f in kot_fields if f not in row})
+        kot_values.append(tuple(row[f] for f in kot_fields))
+        
+        for idx, item in enumerate(kot.kot_items, start=1):
+            item.idx = idx
+            row = dict(standard, idx=idx, parent=kot.name, parenttype="Kitchen Order Ticket", parentfield="kot_items")
+            row.update({f: item.get(f) for f in item_fields if f not in row})
+            item_values.append(tuple(row[f] for f in item_fields))
+    
+    frappe.db.bulk_insert("Kitchen Order Ticket", kot_fields, kot_values)
+    frappe.db.bulk_insert("KOT Item", item_fields, item_values)
 
 def get_waiter_from_user(user_id: str):
     """
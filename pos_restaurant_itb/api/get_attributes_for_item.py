@@ -2,52 +2,35 @@
 
 import frappe
 from frappe import _
+from pos_restaurant_itb.utils.variants import get_attribute_catalog
 
 @frappe.whitelist()
-def get_attributes_for_item(item_code):
+def get_attributes_for_item(item_code, version=None):
     """
     Get all possible attributes for an item template
     
+    The catalog is cached per template. Terminals that pass the version
+    they already hold get the attributes only when the catalog changed.
+    
     Args:
         item_code: The template item code
+        version: Optional catalog version held by the caller ("" when it
+            holds none)
         
     Returns:
-        List of attributes with their possible values
+        Without version: list of attributes with their possible values.
+        With version: {"version", "attributes"} when the catalog differs
+        from the caller's version, otherwise {"version", "unchanged": True}
     """
     if not item_code:
-        return []
-        
-    # Check if this is a template item
-    is_template = frappe.db.get_value("Item", item_code, "has_variants")
-    if not is_template:
-        return []
-        
-    # Get attributes for this template
-    attributes = frappe.get_all(
-        "Item Variant Attribute",
-        filters={"parent": item_code},
-        fields=["attribute", "attribute_values"]
-    )
+        return [] if version is None else {"version": None, "attributes": []}
     
-    result = []
-    for attr in attributes:
-        # Get attribute values (either from the field or from Attribute doctype)
-        values = []
-        if attr.attribute_values:
-            values = attr.attribute_values.split("\n")
-        else:
-            # Get from Attribute doctype
-            attr_values = frappe.get_all(
-                "Item Attribute Value",
-                filters={"parent": attr.attribute},
-                fields=["attribute_value"],
-                order_by="idx"
-            )
-            values = [av.attribute_value for av in attr_values]
-            
-        result.append({
-            "attribute": attr.attribute,
-            "values": values
-        })
-        
-    return result
\ No newline at end of file
+    catalog = get_attribute_catalog(item_code)
+    
+    if version is None:
+        return catalog["attributes"]
+    
+    if version == catalog["version"]:
+        return {"version": catalog["version"], "unchanged": True}
+    
+    return catalog
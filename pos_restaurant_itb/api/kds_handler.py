@@ -3,6 +3,9 @@
 import frappe
 from frappe import _
 from frappe.utils import now_datetime
+from pos_restaurant_itb.utils.doc_handoff import get_handoff_doc
+from pos_restaurant_itb.utils.kds_realtime import publish_kds_created
+from pos_restaurant_itb.utils.status_propagation import propagating
 
 @frappe.whitelist()
 def create_kds_from_kot(kot_id):
@@ -13,7 +16,7 @@ def create_kds_from_kot(kot_id):
     if not kot_id:
         frappe.throw(_("KOT ID is required."))
     
-    kot = frappe.get_doc("Kitchen Order Ticket", kot_id)
+    kot = get_handoff_doc("Kitchen Order Ticket", kot_id)
     
     # Validate branch isolation - only process for active branches
     branch_is_active = frappe.db.get_value("Branch", kot.branch, "is_active")
@@ -45,16 +48,28 @@ def create_kds_from_kot(kot_id):
             "kot_status": item.kot_status,
             "kot_last_update": item.kot_last_update,
             "dynamic_attributes": item.dynamic_attributes,  # Using dynamic_attributes as per your schema
+            "variant_attributes": item.variant_attributes,
+            "attribute_summary": item.attribute_summary,
+            "attributes_hash": item.attributes_hash,
             "cancelled": item.cancelled,
-            "cancellation_note": item.cancellation_note
+            "cancellation_note": item.cancellation_note,
+            "source_kot_item": item.name
         })
     
-    # Set flag to prevent circular updates
-    frappe.flags.in_kot_update = True
-    kds.insert(ignore_permissions=True)
-    frappe.flags.in_kot_update = False
-    
-    frappe.db.commit()
+    # The new KDS mirrors its KOT, there is nothing to carry back to it
+    try:
+        with propagating():
+            kds.insert(ignore_permissions=True)
+    except frappe.DuplicateEntryError:
+        # A concurrent pipeline run created it first; the KDS name is derived
+        # from the KOT, so there can only ever be one
+        return {
+            "status": "warning",
+            "message": _(f"KDS for {kot.name} already exists."),
+            "kds_name": kds.name
+        }
+
+    publish_kds_created(kds)
     
     return {
         "status": "success",
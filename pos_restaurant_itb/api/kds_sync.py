@@ -0,0 +1,253 @@
+# File: pos_restaurant_itb/api/kds_sync.py
+
+from datetime import timedelta
+
+import frappe
+from frappe import _
+from frappe.utils import get_datetime, now_datetime
+from pos_restaurant_itb.utils.kds_realtime import (
+    KDS_ITEM_FIELDS,
+    KITCHEN_STATION_FIELDS,
+    check_kds_access,
+    get_kitchen_station_delta,
+)
+from pos_restaurant_itb.utils.kitchen_routing import (
+    get_item_group_positions,
+    get_routing_index,
+    lookup_stations,
+)
+from pos_restaurant_itb.utils.kot_helpers import KITCHEN_STATUSES, get_status_qty_field
+from pos_restaurant_itb.utils.settings import get_pos_setting
+
+# Seconds a cursor stays behind the clock, so a change stamped just before
+# a poll but committed after it is still picked up by the next poll. Set
+# with `pos_restaurant_kds_sync_lookback`; a transaction that commits later
+# than this after its last_updated stamp is missed until the screen does
+# a full sync (without cursor)
+CURSOR_LOOKBACK = 2
+
+CURSOR_SEPARATOR = "|"
+
+# Kitchen Station rows in these statuses are no longer shown on screens
+CLOSED_KITCHEN_STATION_STATUSES = ("Served", "Cancelled")
+
+@frappe.whitelist()
+def get_kds_changes(branch, station=None, since_cursor=None):
+    """
+    Kitchen Display Orders and Kitchen Station rows of a branch changed
+    since a cursor, for screens that poll or reconnect
+
+    Without a cursor all open documents are returned. With one, only what
+    changed after it; archived, cancelled or deleted documents and served
+    Kitchen Station rows come back as tombstones. Changes within the last few
+    seconds (see CURSOR_LOOKBACK) may be returned again by the next poll,
+    screens merge them by name.
+
+    Args:
+        branch: Branch of the screen
+        station: Kitchen Station Setup the screen shows; limits items and
+            rows to the ones routed to it
+        since_cursor: Cursor returned by the previous call
+
+    Returns:
+        Dict with "cursor" (pass it to the next call), "kds" (list of
+        {name, kot, table, status, last_updated, items}), "kitchen_station"
+        (list of rows) and "removed" ({"kds": [...], "kitchen_station":
+        [...]} names to drop)
+    """
+    check_kds_access(branch)
+    if station and frappe.db.get_value("Kitchen Station Setup", station, "branch") != branch:
+        frappe.throw(_("Kitchen station {0} does not belong to branch {1}.").format(station, branch))
+
+    cursor = parse_cursor(since_cursor)
+    deleted = []
+    if cursor:
+        kds_names, station_names, deleted = get_changed_names(branch, cursor)
+    else:
+        kds_names, station_names = get_open_names(branch)
+
+    changes = {"kds": [], "kitchen_station": [], "removed": {"kds": [], "kitchen_station": []}}
+    latest = cursor
+
+    for row in deleted:
+        latest = get_latest(latest, row)
+        changes["removed"][row.kind].append(row.name)
+
+    routing_index = get_routing_index(branch) if station else None
+
+    def routed_to_station(lft):
+        return not station or station in lookup_stations(routing_index, lft)
+
+    for kds in get_kds_headers(kds_names):
+        latest = get_latest(latest, kds)
+        if kds.archived or kds.status == "Cancelled":
+            changes["removed"]["kds"].append(kds.name)
+            continue
+        changes["kds"].append(kds)
+
+    items = get_kds_items([kds.name for kds in changes["kds"]])
+    positions = get_item_group_positions(
+        [row.item_code for rows in items.values() for row in rows]
+    ) if station else {}
+
+    for kds in changes["kds"]:
+        rows = items.get(kds.name, [])
+        if station:
+            # Same routing as the realtime push: lines no station handles are left out
+            rows = [
+                row for row in rows
+                if row.item_code in positions and routed_to_station(positions[row.item_code])
+            ]
+        kds["items"] = [{field: row.get(field) for field in ("name",) + KDS_ITEM_FIELDS} for row in rows]
+        del kds.archived
+
+    if station:
+        changes["kds"] = [kds for kds in changes["kds"] if kds["items"]]
+
+    for row in get_kitchen_station_rows(station_names):
+        latest = get_latest(latest, row)
+        # Same rows as a full sync (see get_open_names): served ones leave the screen
+        if row.cancelled or row.status in CLOSED_KITCHEN_STATION_STATUSES:
+            changes["removed"]["kitchen_station"].append(row.name)
+            continue
+        if not routed_to_station(row.lft):
+            continue
+        changes["kitchen_station"].append(get_kitchen_station_delta(row))
+
+    changes["cursor"] = format_cursor(clamp_cursor(latest, cursor))
+    return changes
+
+def parse_cursor(cursor):
+    """
+    Returns a (last_updated, name) tuple from a cursor string, or None
+    """
+    if not cursor:
+        return None
+
+    timestamp, _separator, name = cursor.partition(CURSOR_SEPARATOR)
+    try:
+        return (get_datetime(timestamp), name)
+    except Exception:
+        frappe.throw(_("Invalid cursor: {0}").format(cursor))
+
+def format_cursor(cursor):
+    return f"{cursor[0]}{CURSOR_SEPARATOR}{cursor[1]}" if cursor else ""
+
+def get_latest(latest, row):
+    """
+    The later of a cursor and the position of a row
+    """
+    if not row.last_updated:
+        return latest
+    position = (row.last_updated, row.name)
+    return max(latest, position) if latest else position
+
+def clamp_cursor(latest, previous):
+    """
+    Keeps the cursor CURSOR_LOOKBACK seconds behind the clock, but never
+    moves it back
+    """
+    lookback = get_pos_setting("kds_sync_lookback", CURSOR_LOOKBACK)
+    horizon = (now_datetime() - timedelta(seconds=float(lookback)), "")
+    cursor = min(latest, horizon) if latest else horizon
+    return max(cursor, previous) if previous else cursor
+
+def get_changed_names(branch, cursor):
+    """
+    Names of the KDS and Kitchen Station rows of a branch changed or
+    deleted after a cursor
+
+    The lookups are range scans on the (branch, last_updated) indexes and
+    the (branch, deleted_at) index of Kitchen Tombstone in one round trip,
+    so a poll without changes reads no documents.
+
+    Returns:
+        Tuple of (KDS names, Kitchen Station names, deleted rows as
+        {kind, name, last_updated})
+    """
+    timestamp, name = cursor
+    rows = frappe.db.sql("""
+        SELECT 'kds' AS kind, name, NULL AS last_updated
+        FROM `tabKitchen Display Order`
+        WHERE branch = %(branch)s
+        AND (last_updated > %(timestamp)s OR (last_updated = %(timestamp)s AND name > %(name)s))
+        UNION ALL
+        SELECT 'kitchen_station', name, NULL
+        FROM `tabKitchen Station`
+        WHERE branch = %(branch)s
+        AND (last_updated > %(timestamp)s OR (last_updated = %(timestamp)s AND name > %(name)s))
+        UNION ALL
+        SELECT IF(reference_doctype = 'Kitchen Display Order', 'deleted_kds', 'deleted_kitchen_station'),
+            reference_name, deleted_at
+        FROM `tabKitchen Tombstone`
+        WHERE branch = %(branch)s
+        AND (deleted_at > %(timestamp)s OR (deleted_at = %(timestamp)s AND reference_name > %(name)s))
+    """, {"branch": branch, "timestamp": timestamp, "name": name}, as_dict=1)
+
+    kds_names = [row.name for row in rows if row.kind == "kds"]
+    station_names = [row.name for row in rows if row.kind == "kitchen_station"]
+    deleted = [
+        frappe._dict(kind=row.kind[len("deleted_"):], name=row.name, last_updated=row.last_updated)
+        for row in rows if row.kind.startswith("deleted_")
+    ]
+    return kds_names, station_names, deleted
+
+def get_open_names(branch):
+    """
+    Names of the open KDS and Kitchen Station rows of a branch
+    """
+    kds_names = frappe.get_all(
+        "Kitchen Display Order",
+        filters={"branch": branch, "archived": 0, "status": ["!=", "Cancelled"]},
+        pluck="name"
+    )
+    station_names = frappe.get_all(
+        "Kitchen Station",
+        filters={"branch": branch, "cancelled": 0, "status": ["not in", list(CLOSED_KITCHEN_STATION_STATUSES)]},
+        pluck="name"
+    )
+    return kds_names, station_names
+
+def get_kds_headers(names):
+    if not names:
+        return []
+
+    return frappe.db.sql("""
+        SELECT name, kot_id AS kot, table_number AS `table`, status, last_updated, archived
+        FROM `tabKitchen Display Order`
+        WHERE name IN %s
+        ORDER BY last_updated, name
+    """, (tuple(names),), as_dict=1)
+
+def get_kds_items(names):
+    """
+    Item rows of many KDS with one query, as a dict of KDS name -> rows
+    """
+    if not names:
+        return {}
+
+    items = {}
+    for row in frappe.db.sql(f"""
+        SELECT parent, name, {", ".join(KDS_ITEM_FIELDS)}
+        FROM `tabKOT Item`
+        WHERE parent IN %s
+        AND parenttype = 'Kitchen Display Order'
+        AND parentfield = 'item_list'
+        ORDER BY parent, idx
+    """, (tuple(names),), as_dict=1):
+        items.setdefault(row.parent, []).append(row)
+    return items
+
+def get_kitchen_station_rows(names):
+    if not names:
+        return []
+
+    counter_fields = [get_status_qty_field(status) for status in KITCHEN_STATUSES]
+    return frappe.db.sql(f"""
+        SELECT ks.{", ks.".join(KITCHEN_STATION_FIELDS)}, ks.kot_item,
+            ks.{", ks.".join(counter_fields)}, ig.lft
+        FROM `tabKitchen Station` ks
+        LEFT JOIN `tabItem Group` ig ON ig.name = ks.item_group
+        WHERE ks.name IN %s
+        ORDER BY ks.last_updated, ks.name
+    """, (tuple(names),), as_dict=1)
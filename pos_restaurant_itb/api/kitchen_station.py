@@ -1,55 +1,114 @@
 # pos_restaurant_itb/api/kitchen_station.py
 
+import frappe
+from frappe import _
+from frappe.utils import cint, now_datetime
+from pos_restaurant_itb.utils.doc_handoff import get_handoff_doc
+from pos_restaurant_itb.utils.kds_realtime import check_kds_access, publish_kitchen_station_rows
+from pos_restaurant_itb.utils.kitchen_routing import get_item_groups
+from pos_restaurant_itb.utils.kot_helpers import (
+    KITCHEN_STATUSES,
+    get_aggregate_unit_status,
+    get_status_qty_field,
+    validate_kitchen_status_transition,
+)
+from pos_restaurant_itb.utils.sequence import reserve_naming_series
+from pos_restaurant_itb.utils.settings import get_pos_setting
+from pos_restaurant_itb.utils.status_propagation import (
+    propagate_kitchen_station_changes,
+    propagating,
+)
+
+# Series key of the Kitchen Station autoname ("KS-.####"), shared by the
+# bulk path and documents inserted one by one
+KITCHEN_STATION_SERIES = "KS-"
+
+# Kitchen Station storage modes, set with `pos_restaurant_kitchen_station_storage`
+PER_UNIT = "per_unit"   # one row per unit of qty, each with its own status
+PER_LINE = "per_line"   # one row per KOT line with per-status unit counters
+
+# doc_events run by a document insert, which the bulk path skips
+INSERT_DOC_EVENTS = (
+    "before_insert", "before_validate", "validate", "before_save",
+    "after_insert", "on_update", "on_change"
+)
+
+# Columns written by the bulk path, in insert order
+KITCHEN_STATION_FIELDS = [
+    "name", "creation", "modified", "modified_by", "owner", "docstatus", "idx",
+    "kot", "branch", "item_code", "item_name", "item_group", "status", "last_updated",
+    "dynamic_attributes", "attribute_summary", "attributes_hash", "note", "cancelled",
+    "cancellation_note", "kot_item", "qty", "queued_qty", "cooking_qty", "ready_qty",
+    "served_qty", "cancelled_qty", "source_kot_item"
+]
+
 # Update the existing function to properly handle variant_attributes
 @frappe.whitelist()
 def create_kitchen_station_items_from_kot(kot_id):
     """
     Create Kitchen Station items for each item in the KOT.
-    For items with quantity > 1, creates multiple Kitchen Station entries.
+    For items with quantity > 1, creates multiple Kitchen Station entries,
+    or a single entry with unit counters when the storage mode is per_line.
+
+    All rows for the KOT are built in memory, named from one reserved range
+    of the KS- series and written with a single multi-row insert.
     """
     if not kot_id:
         frappe.throw(_("KOT ID is required."))
-    
-    kot = frappe.get_doc("Kitchen Order Ticket", kot_id)
-    created_items = []
-    
+
+    kot = get_handoff_doc("Kitchen Order Ticket", kot_id)
+
     # Validate branch isolation - only process for active branches
     branch_is_active = frappe.db.get_value("Branch", kot.branch, "is_active")
     if not branch_is_active:
         frappe.throw(_("Cannot create kitchen station items for inactive branch."))
-    
-    for kot_item in kot.kot_items:
-        # Skip cancelled items
-        if kot_item.cancelled:
-            continue
-        
-        # Get the item group
-        item_group = frappe.db.get_value("Item", kot_item.item_code, "item_group")
-        
-        # For each quantity unit, create a separate Kitchen Station entry
-        for i in range(int(kot_item.qty)):
-            kitchen_item = frappe.new_doc("Kitchen Station")
-            kitchen_item.kot = kot.name
-            kitchen_item.branch = kot.branch  # Ensure branch isolation
-            kitchen_item.item_code = kot_item.item_code
-            kitchen_item.item_group = item_group
-            kitchen_item.status = kot_item.kot_status or "Queued"
-            kitchen_item.note = kot_item.note
-            
+
+    # Skip cancelled items
+    kot_items = [item for item in kot.kot_items if not item.cancelled]
+    item_groups = get_item_groups([item.item_code for item in kot_items])
+
+    per_line = get_kitchen_station_storage_mode() == PER_LINE
+
+    rows = []
+    for kot_item in kot_items:
+        row = {
+            "kot": kot.name,
+            "branch": kot.branch,  # Ensure branch isolation
+            "item_code": kot_item.item_code,
+            "item_name": kot_item.item_name,
+            "item_group": item_groups.get(kot_item.item_code),
+            "status": kot_item.kot_status or "Queued",
+            "note": kot_item.note,
             # Copy variant attributes
-            kitchen_item.variant_attributes = kot_item.variant_attributes
-            # Update attribute summary
-            kitchen_item.attribute_summary = kot_item.attribute_summary
-            
-            kitchen_item.cancelled = kot_item.cancelled
-            kitchen_item.cancellation_note = kot_item.cancellation_note
-            
-            # Save the Kitchen Station item
-            kitchen_item.insert(ignore_permissions=True)
-            created_items.append(kitchen_item.name)
-    
+            "dynamic_attributes": kot_item.dynamic_attributes or kot_item.variant_attributes,
+            "attribute_summary": kot_item.attribute_summary,
+            "attributes_hash": kot_item.attributes_hash,
+            "cancelled": kot_item.cancelled,
+            "cancellation_note": kot_item.cancellation_note,
+            "source_kot_item": kot_item.name,
+            "qty": 1
+        }
+        row.update({get_status_qty_field(status): 0 for status in KITCHEN_STATUSES})
+
+        if per_line:
+            # One entry for the whole line, every unit starts in the line's status
+            qty = int(kot_item.qty)
+            row.update({"kot_item": kot_item.name, "qty": qty})
+            row[get_status_qty_field(row["status"])] = qty
+            rows.append(row)
+        else:
+            # For each quantity unit, build a separate Kitchen Station entry
+            rows.extend(dict(row) for i in range(int(kot_item.qty)))
+
+    if has_doc_event_hooks("Kitchen Station"):
+        # Another app listens to Kitchen Station events, keep per-document inserts
+        created_items = insert_kitchen_station_docs(rows)
+    else:
+        created_items = bulk_insert_kitchen_station_rows(rows)
+        # The controller announces rows inserted one by one
+        publish_kitchen_station_rows(rows)
+
     if created_items:
-        frappe.db.commit()
         return {
             "status": "success",
             "message": _(f"Created {len(created_items)} Kitchen Station items for KOT {kot_id}"),
@@ -59,4 +118,178 @@ def create_kitchen_station_items_from_kot(kot_id):
         return {
             "status": "warning",
             "message": _(f"No items created for KOT {kot_id}")
-        }
\ No newline at end of file
+        }
+
+@frappe.whitelist()
+def move_kitchen_station_units(kitchen_station, from_status, to_status, qty=1):
+    """
+    Move units of a per-line Kitchen Station row from one status to another.
+
+    The row is locked while the counters are checked, so concurrent moves
+    on the same line never overdraw a status. The user needs write access
+    to the row and access to its branch.
+
+    Args:
+        kitchen_station: Name of the Kitchen Station row
+        from_status: Status the units are currently in
+        to_status: Status to move the units to
+        qty: Number of units to move
+
+    Returns:
+        Dict with the new unit counts and the row's aggregate status
+    """
+    qty = cint(qty)
+    if qty <= 0:
+        frappe.throw(_("Quantity to move must be greater than zero."))
+    if from_status == to_status:
+        frappe.throw(_("Source and target status must differ."))
+    # Same rules as the bulk status changes, e.g. served units stay served
+    validate_kitchen_status_transition(from_status, to_status, kitchen_station)
+
+    from_field = get_status_qty_field(from_status)
+    to_field = get_status_qty_field(to_status)
+    counter_fields = [get_status_qty_field(status) for status in KITCHEN_STATUSES]
+
+    row = frappe.db.sql(
+        f"""SELECT kot_item, source_kot_item, branch, item_group, {", ".join(counter_fields)}
+            FROM `tabKitchen Station`
+            WHERE name = %s
+            FOR UPDATE""",
+        (kitchen_station,),
+        as_dict=True
+    )
+    if not row:
+        frappe.throw(_("Kitchen Station {0} not found.").format(kitchen_station))
+    row = row[0]
+
+    if not frappe.has_permission("Kitchen Station", "write", doc=kitchen_station):
+        frappe.throw(_("Not permitted to change kitchen status."), frappe.PermissionError)
+    check_kds_access(row.branch)
+
+    if not row.kot_item:
+        frappe.throw(_("Kitchen Station {0} tracks a single unit, update its status instead.").format(
+            kitchen_station
+        ))
+    if cint(row[from_field]) < qty:
+        frappe.throw(_("Only {0} unit(s) are {1}.").format(cint(row[from_field]), from_status))
+
+    counts = {status: cint(row[get_status_qty_field(status)]) for status in KITCHEN_STATUSES}
+    counts[from_status] -= qty
+    counts[to_status] += qty
+    status = get_aggregate_unit_status(counts)
+    timestamp = now_datetime()
+
+    frappe.db.sql(
+        f"""UPDATE `tabKitchen Station`
+            SET `{from_field}` = `{from_field}` - %(qty)s,
+                `{to_field}` = `{to_field}` + %(qty)s,
+                status = %(status)s,
+                last_updated = %(timestamp)s,
+                modified = %(timestamp)s,
+                modified_by = %(user)s
+            WHERE name = %(name)s""",
+        {
+            "qty": qty,
+            "status": status,
+            "timestamp": timestamp,
+            "user": frappe.session.user,
+            "name": kitchen_station
+        }
+    )
+
+    publish_kitchen_station_rows([{
+        "name": kitchen_station,
+        "branch": row.branch,
+        "item_group": row.item_group,
+        "status": status,
+        "last_updated": timestamp,
+        "unit_counts": counts
+    }])
+
+    # The KOT line, its KDS and the order follow the units
+    propagate_kitchen_station_changes({row.source_kot_item or row.kot_item})
+
+    return {
+        "status": "success",
+        "kitchen_station": kitchen_station,
+        "unit_counts": counts,
+        "line_status": status
+    }
+
+def get_kitchen_station_storage_mode():
+    """
+    Returns PER_UNIT (default) or PER_LINE
+    """
+    mode = get_pos_setting("kitchen_station_storage", PER_UNIT)
+    return PER_LINE if mode == PER_LINE else PER_UNIT
+
+def bulk_insert_kitchen_station_rows(rows):
+    """
+    Write Kitchen Station rows with one multi-row INSERT
+
+    Args:
+        rows: List of dicts with Kitchen Station field values
+
+    Returns:
+        List of the assigned Kitchen Station names, in row order
+    """
+    if not rows:
+        return []
+
+    timestamp = now_datetime()
+    user = frappe.session.user
+    numbers = reserve_naming_series(KITCHEN_STATION_SERIES, len(rows))
+
+    names = []
+    values = []
+    for number, row in zip(numbers, rows):
+        name = f"{KITCHEN_STATION_SERIES}{str(number).zfill(4)}"
+        names.append(name)
+        row.update({
+            "name": name,
+            "creation": timestamp,
+            "modified": timestamp,
+            "modified_by": user,
+            "owner": user,
+            "docstatus": 0,
+            "idx": 0,
+            "last_updated": timestamp
+        })
+        values.append(tuple(row.get(field) for field in KITCHEN_STATION_FIELDS))
+
+    frappe.db.bulk_insert("Kitchen Station", KITCHEN_STATION_FIELDS, values)
+    return names
+
+def insert_kitchen_station_docs(rows):
+    """
+    Insert Kitchen Station rows one document at a time, running all hooks
+
+    New rows start in the status of their KOT line, so there is nothing
+    to propagate.
+    """
+    created_items = []
+    with propagating():
+        for row in rows:
+            kitchen_item = frappe.new_doc("Kitchen Station")
+            kitchen_item.update(row)
+            kitchen_item.insert(ignore_permissions=True)
+            created_items.append(kitchen_item.name)
+    return created_items
+
+def has_doc_event_hooks(doctype):
+    """
+    Check whether any installed app registers doc_events that an insert
+    of this doctype would run, for the doctype itself or for every
+    doctype ("*")
+
+    Frappe's own "*" handlers (notifications, assignment rules, energy
+    points, ...) are registered on every site and are not counted, or the
+    bulk path could never be used.
+    """
+    for app in frappe.get_installed_apps():
+        doc_events = frappe.get_hooks("doc_events", app_name=app) or {}
+        for key in ((doctype,) if app == "frappe" else (doctype, "*")):
+            events = doc_events.get(key) or {}
+            if any(events.get(event) for event in INSERT_DOC_EVENTS):
+                return True
+    return False
@@ -0,0 +1,92 @@
+# File: pos_restaurant_itb/api/kitchen_status.py
+
+import frappe
+from frappe import _
+from pos_restaurant_itb.utils.kds_realtime import check_kds_access
+from pos_restaurant_itb.utils.kot_helpers import KITCHEN_STATUSES
+from pos_restaurant_itb.utils.status_propagation import move_kitchen_station_rows, move_kot_items
+
+KITCHEN_STATION = "Kitchen Station"
+KOT_ITEM = "KOT Item"
+
+@frappe.whitelist()
+def update_kitchen_status(doctype, names, status, from_status=None):
+    """
+    Move many Kitchen Station rows or KOT Items to a kitchen status at
+    once, e.g. "fire" every queued burger with one call
+
+    The user needs write access and access to the branch of every row.
+    All rows are locked, checked against the allowed transitions and
+    written with set-based updates in one transaction. Each KOT line,
+    KDS, KOT and POS Order affected is updated once, whatever the number
+    of rows (see utils.status_propagation).
+
+    Rows already in the target status are left alone. Per-line Kitchen
+    Station rows move their units in from_status, or by default every
+    unit in an earlier status that may move to the target.
+
+    Args:
+        doctype: "Kitchen Station" or "KOT Item"
+        names: List (or JSON list) of row names; KOT Items may be KOT or
+            KDS rows
+        status: Target kitchen status
+        from_status: Only move rows (units) currently in this status
+
+    Returns:
+        Dict with status, message, "updated" (number of rows changed),
+        "kds" (KDS name -> status), "kot" and "pos_order" (name -> new
+        status, for the ones that changed)
+    """
+    if isinstance(names, str):
+        names = frappe.parse_json(names)
+    names = list(dict.fromkeys(names or []))
+
+    if doctype not in (KITCHEN_STATION, KOT_ITEM):
+        frappe.throw(_("Kitchen status can only be changed for Kitchen Station rows or KOT Items."))
+    if not names:
+        frappe.throw(_("Select at least one row."))
+    if status not in KITCHEN_STATUSES:
+        frappe.throw(_("Invalid kitchen status: {0}").format(status))
+    if from_status and from_status not in KITCHEN_STATUSES:
+        frappe.throw(_("Invalid kitchen status: {0}").format(from_status))
+
+    permission_doctype = KITCHEN_STATION if doctype == KITCHEN_STATION else "Kitchen Display Order"
+    if not frappe.has_permission(permission_doctype, "write"):
+        frappe.throw(_("Not permitted to change kitchen status."), frappe.PermissionError)
+    for branch in get_branches(doctype, names):
+        check_kds_access(branch)
+
+    if doctype == KITCHEN_STATION:
+        result = move_kitchen_station_rows(names, status, from_status)
+    else:
+        result = move_kot_items(names, status, from_status)
+
+    return {
+        "status": "success",
+        "message": _("{0} row(s) moved to {1}.").format(result["updated"], status),
+        "updated": result["updated"],
+        "kds": result["kds"],
+        "kot": result["kot"],
+        "pos_order": result["pos_order"]
+    }
+
+def get_branches(doctype, names):
+    """
+    Branches of Kitchen Station rows, or of the KDS or KOT of KOT Items
+    """
+    if doctype == KITCHEN_STATION:
+        return frappe.db.sql("""
+            SELECT DISTINCT branch
+            FROM `tabKitchen Station`
+            WHERE name IN %s
+        """, (tuple(names),), pluck=True)
+
+    return frappe.db.sql("""
+        SELECT DISTINCT COALESCE(kds.branch, kot.branch)
+        FROM `tabKOT Item` ki
+        LEFT JOIN `tabKitchen Display Order` kds
+            ON ki.parenttype = 'Kitchen Display Order' AND kds.name = ki.parent
+        LEFT JOIN `tabKitchen Order Ticket` kot
+            ON ki.parenttype = 'Kitchen Order Ticket' AND kot.name = ki.parent
+        WHERE ki.name IN %s
+    """, (tuple(names),), pluck=True)
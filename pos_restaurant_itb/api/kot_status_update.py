@@ -1,30 +1,35 @@
 # File: pos_restaurant_itb/api/kot_status_update.py
 
 import frappe
+from pos_restaurant_itb.utils.status_propagation import propagate_kds_item_changes
 
 @frappe.whitelist()
 def update_kds_status_from_kot(kds_name):
     """
     Update the status of Kitchen Display Order based on KOT item statuses.
+
+    The status is derived from the KDS item counters, so no item rows are
+    read; it is written only when it changes.
     """
     if not kds_name:
         return
-    
-    kds = frappe.get_doc("Kitchen Display Order", kds_name)
-    statuses = [item.kot_status for item in kds.item_list if not item.cancelled]
-    
-    if not statuses:
-        new_status = "New"
-    elif all(s == "Served" for s in statuses):
-        new_status = "Served"
-    elif all(s in ("Ready", "Served") for s in statuses):
-        new_status = "Ready"
-    elif any(s == "Cooking" for s in statuses):
-        new_status = "In Progress"
-    else:
-        new_status = "New"
-    
-    if kds.status != new_status:
-        kds.status = new_status
-        kds.save(ignore_permissions=True)
-        frappe.db.commit()
\ No newline at end of file
+
+    apply_kds_item_status_changes(kds_name, {})
+
+def apply_kds_item_status_changes(kds_name, changes):
+    """
+    Move items of a Kitchen Display Order between kitchen statuses and
+    update its status, without loading or saving the document
+
+    A new status is carried to the KOT and its POS Order, see
+    utils.status_propagation.
+
+    Args:
+        kds_name: Name of the Kitchen Display Order
+        changes: Dict of kitchen status -> change in its item count, e.g.
+            {"Queued": -1, "Cooking": 1} when one item starts cooking
+
+    Returns:
+        The status of the KDS
+    """
+    return propagate_kds_item_changes({kds_name: changes})["kds"][kds_name]
@@ -0,0 +1,200 @@
+# File: pos_restaurant_itb/api/menu_snapshot.py
+
+import gzip
+import json
+
+import frappe
+from frappe import _
+from werkzeug.wrappers import Response
+from pos_restaurant_itb.utils.cache import delete_cache
+from pos_restaurant_itb.utils.kitchen_routing import get_routing_index, lookup_stations
+from pos_restaurant_itb.utils.variants import (
+    build_attribute_catalogs,
+    build_variant_indexes,
+    get_content_hash,
+)
+
+MENU_SNAPSHOT_CACHE_KEY = "pos_restaurant_menu_snapshot"
+MENU_HISTORY_CACHE_KEY = "pos_restaurant_menu_history"
+
+# Versions per branch a terminal can still get a delta from
+MENU_HISTORY_LENGTH = 20
+
+SECTIONS = ("items", "templates")
+
+@frappe.whitelist(methods=["GET"])
+def get_menu_snapshot(branch):
+    """
+    Everything a POS terminal needs to start: sellable items with rates
+    and kitchen stations, and for templates their attribute values and
+    variant map
+
+    Served gzip-compressed with the snapshot version as ETag; a terminal
+    sending the version it holds in If-None-Match gets an empty 304.
+
+    Args:
+        branch: The branch of the terminal
+
+    Returns:
+        JSON {"version", "branch", "items", "templates"} where items maps
+        item code -> {item_name, item_group, uom, rate, has_variants,
+        stations} and templates maps template code -> {attributes,
+        variants (attributes_hash of the canonical attribute JSON ->
+        variant code), variant_details}
+    """
+    snapshot = get_cached_snapshot(branch)
+    etag = f'"{snapshot["version"]}"'
+
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding"
+    }
+
+    if_none_match = frappe.get_request_header("If-None-Match") or ""
+    if etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+        return Response(status=304, headers=headers)
+
+    if "gzip" in (frappe.get_request_header("Accept-Encoding") or ""):
+        body = snapshot["body"]
+        headers["Content-Encoding"] = "gzip"
+    else:
+        body = gzip.decompress(snapshot["body"])
+
+    return Response(body, status=200, headers=headers, content_type="application/json")
+
+@frappe.whitelist(methods=["GET"])
+def get_menu_delta(branch, since_version):
+    """
+    Changes to a branch's menu snapshot since a version the terminal holds
+
+    Args:
+        branch: The branch of the terminal
+        since_version: Snapshot version held by the terminal
+
+    Returns:
+        {"version", "unchanged": True} when nothing changed,
+        {"version", "reset": True} when since_version is too old (fetch
+        the full snapshot again), otherwise {"version", "changed",
+        "removed"} with changed and new entries per section and the keys
+        removed per section
+    """
+    snapshot = get_cached_snapshot(branch)
+    version = snapshot["version"]
+
+    if since_version == version:
+        return {"version": version, "unchanged": True}
+
+    history = dict(frappe.cache().hget(MENU_HISTORY_CACHE_KEY, branch) or [])
+    old_hashes = history.get(since_version)
+    if old_hashes is None:
+        return {"version": version, "reset": True}
+
+    data = snapshot["data"]
+    changed = {}
+    removed = {}
+    for section in SECTIONS:
+        new_hashes = snapshot["hashes"][section]
+        changed[section] = {
+            key: data[section][key]
+            for key, entry_hash in new_hashes.items()
+            if old_hashes[section].get(key) != entry_hash
+        }
+        removed[section] = [key for key in old_hashes[section] if key not in new_hashes]
+
+    return {"version": version, "changed": changed, "removed": removed}
+
+def get_cached_snapshot(branch):
+    """
+    Returns the menu snapshot of a branch from the shared cache, building
+    it on first use
+    """
+    if not branch or not frappe.db.exists("Branch", branch):
+        frappe.throw(_("Branch {0} not found.").format(branch))
+
+    return frappe.cache().hget(
+        MENU_SNAPSHOT_CACHE_KEY, branch, generator=lambda: build_snapshot(branch)
+    )
+
+def build_snapshot(branch):
+    """
+    Builds the menu snapshot of a branch with a handful of queries,
+    whatever the number of items, and records its version in the
+    branch's history for deltas
+    """
+    rows = frappe.db.sql("""
+        SELECT i.name, i.item_name, i.item_group, i.stock_uom, i.standard_rate,
+            i.has_variants, ig.lft
+        FROM `tabItem` i
+        LEFT JOIN `tabItem Group` ig ON ig.name = i.item_group
+        WHERE i.disabled = 0
+        AND i.is_sales_item = 1
+        AND IFNULL(i.variant_of, '') = ''
+        ORDER BY i.name
+    """, as_dict=1)
+
+    routing_index = get_routing_index(branch)
+    items = {
+        row.name: {
+            "item_name": row.item_name,
+            "item_group": row.item_group,
+            "uom": row.stock_uom,
+            "rate": row.standard_rate,
+            "has_variants": row.has_variants,
+            "stations": lookup_stations(routing_index, row.lft)
+        }
+        for row in rows
+    }
+
+    template_codes = [code for code, item in items.items() if item["has_variants"]]
+    catalogs = build_attribute_catalogs(template_codes)
+    variant_indexes = build_variant_indexes(template_codes)
+    templates = {
+        code: {
+            "attributes": catalogs[code]["attributes"],
+            "variants": variant_indexes[code]["by_signature"],
+            "variant_details": variant_indexes[code]["details"]
+        }
+        for code in template_codes
+    }
+
+    data = {"items": items, "templates": templates}
+    hashes = {
+        section: {key: get_content_hash(entry) for key, entry in data[section].items()}
+        for section in SECTIONS
+    }
+    version = get_content_hash(hashes)
+
+    record_version(branch, version, hashes)
+
+    body = json.dumps(
+        dict(data, version=version, branch=branch), separators=(",", ":"), default=str
+    ).encode()
+
+    return {
+        "version": version,
+        "data": data,
+        "hashes": hashes,
+        "body": gzip.compress(body, compresslevel=6)
+    }
+
+def record_version(branch, version, hashes):
+    """
+    Keeps the entry hashes of the latest snapshot versions of a branch
+    """
+    history = [
+        entry for entry in frappe.cache().hget(MENU_HISTORY_CACHE_KEY, branch) or []
+        if entry[0] != version
+    ]
+    history.append((version, hashes))
+    frappe.cache().hset(MENU_HISTORY_CACHE_KEY, branch, history[-MENU_HISTORY_LENGTH:])
+
+def clear_menu_snapshot(doc=None, method=None, *args):
+    """
+    Drops the cached menu snapshots of every branch, now and after commit;
+    the version history is kept so terminals can still get deltas
+
+    Called when an Item, Item Attribute, Item Group or Kitchen Station
+    Setup is saved or deleted.
+    """
+    delete_cache(MENU_SNAPSHOT_CACHE_KEY)
@@ -3,6 +3,12 @@
 import frappe
 import json
 from frappe import _
+from pos_restaurant_itb.utils.variants import (
+    find_variant,
+    get_attributes_dict,
+    get_variant_details,
+    prefetch_variant_indexes,
+)
 
 @frappe.whitelist()
 def resolve_variant(template, attributes):
@@ -25,20 +31,15 @@ def resolve_variant(template, attributes):
         variant_item = POSOrderItem.resolve_item_variant(template, attributes)
         
         if variant_item:
-            # Get additional details for the variant
-            item_details = frappe.get_value(
-                "Item", 
-                variant_item, 
-                ["item_name", "standard_rate", "stock_uom"], 
-                as_dict=True
-            )
+            # Additional details for the variant come from the same cached index
+            item_details = get_variant_details(template, variant_item)
             
             return {
                 "status": "success",
                 "item_code": variant_item,
-                "item_name": item_details.item_name,
-                "rate": item_details.standard_rate,
-                "uom": item_details.stock_uom
+                "item_name": item_details["item_name"],
+                "rate": item_details["rate"],
+                "uom": item_details["uom"]
             }
         else:
             return {
@@ -50,4 +51,76 @@ def resolve_variant(template, attributes):
         return {
             "status": "error",
             "message": _("Error resolving variant: {0}").format(str(e))
-        }
\ No newline at end of file
+        }
+
+
+@frappe.whitelist()
+def resolve_variants(lines):
+    """
+    Resolve item variants for a whole cart at once
+    
+    The variant indexes of all templates in the cart are loaded together
+    (from cache, and the missing ones with a single query). A malformed
+    line is reported as unresolved without failing the others.
+    
+    Args:
+        lines: List (or JSON list) of {"template": ..., "attributes": [...]}
+            or [template, attributes] pairs, attributes in the format
+            accepted by resolve_variant
+        
+    Returns:
+        List with one result per line, in the shape returned by
+        resolve_variant
+    """
+    if isinstance(lines, str):
+        lines = json.loads(lines)
+    
+    parsed = []
+    for line in lines or []:
+        try:
+            if isinstance(line, dict):
+                template, attributes = line.get("template"), line.get("attributes")
+            elif isinstance(line, (list, tuple)):
+                template, attributes = line
+            else:
+                raise ValueError(_("Invalid cart line: {0}").format(line))
+            parsed.append((template, get_attributes_dict(attributes), None))
+        except Exception as e:
+            parsed.append((None, None, e))
+    
+    prefetch_variant_indexes([
+        template for template, _attrs, error in parsed
+        if not error and isinstance(template, str)
+    ])
+    
+    results = []
+    for template, attrs, error in parsed:
+        if not error:
+            try:
+                variant_item = find_variant(template, attrs)
+            except Exception as e:
+                error = e
+        
+        if error:
+            results.append({
+                "status": "error",
+                "message": _("Error resolving variant: {0}").format(str(error))
+            })
+            continue
+        
+        if variant_item:
+            item_details = get_variant_details(template, variant_item)
+            results.append({
+                "status": "success",
+                "item_code": variant_item,
+                "item_name": item_details["item_name"],
+                "rate": item_details["rate"],
+                "uom": item_details["uom"]
+            })
+        else:
+            results.append({
+                "status": "error",
+                "message": _("No matching variant found for the selected attributes.")
+            })
+    
+    return results
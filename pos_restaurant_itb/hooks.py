@@ -15,10 +15,60 @@ doc_events = {
         "on_submit": "pos_restaurant_itb.utils.pos_order.create_kot_from_pos_order"
     },
     "Kitchen Order Ticket": {
-        "after_insert": [
-            "pos_restaurant_itb.api.kds_handler.create_kds_from_kot",
-            "pos_restaurant_itb.api.kitchen_station.create_kitchen_station_items_from_kot"
+        # Creates the KDS and Kitchen Station entries, inline or via background job
+        # depending on the `pos_restaurant_kitchen_pipeline` site config
+        "after_insert": "pos_restaurant_itb.utils.kitchen_pipeline.process_kot_after_insert"
+    },
+    "Kitchen Display Order": {
+        # Kitchen screens syncing with a cursor learn about deletions from tombstones
+        "on_trash": "pos_restaurant_itb.pos_restaurant_itb.doctype.kitchen_tombstone.kitchen_tombstone.add_kitchen_tombstone"
+    },
+    "Kitchen Station": {
+        "on_trash": "pos_restaurant_itb.pos_restaurant_itb.doctype.kitchen_tombstone.kitchen_tombstone.add_kitchen_tombstone"
+    },
+    "Item": {
+        # Variant resolution, attribute pickers and menu snapshots use cached item data
+        "on_update": [
+            "pos_restaurant_itb.utils.variants.clear_variant_index",
+            "pos_restaurant_itb.utils.variants.clear_attribute_catalog",
+            "pos_restaurant_itb.api.menu_snapshot.clear_menu_snapshot"
+        ],
+        "on_trash": [
+            "pos_restaurant_itb.utils.variants.clear_variant_index",
+            "pos_restaurant_itb.utils.variants.clear_attribute_catalog",
+            "pos_restaurant_itb.api.menu_snapshot.clear_menu_snapshot"
+        ],
+        "after_rename": [
+            "pos_restaurant_itb.utils.variants.clear_variant_index",
+            "pos_restaurant_itb.utils.variants.clear_attribute_catalog",
+            "pos_restaurant_itb.api.menu_snapshot.clear_menu_snapshot"
+        ]
+    },
+    "Item Attribute": {
+        "on_update": [
+            "pos_restaurant_itb.utils.variants.clear_attribute_catalog",
+            "pos_restaurant_itb.api.menu_snapshot.clear_menu_snapshot"
+        ],
+        "on_trash": [
+            "pos_restaurant_itb.utils.variants.clear_attribute_catalog",
+            "pos_restaurant_itb.api.menu_snapshot.clear_menu_snapshot"
         ]
+    },
+    "Item Group": {
+        # Tree changes renumber lft/rgt, which the kitchen routing index is built on
+        "on_update": [
+            "pos_restaurant_itb.utils.kitchen_routing.clear_routing_index",
+            "pos_restaurant_itb.api.menu_snapshot.clear_menu_snapshot"
+        ],
+        "on_trash": [
+            "pos_restaurant_itb.utils.kitchen_routing.clear_routing_index",
+            "pos_restaurant_itb.api.menu_snapshot.clear_menu_snapshot"
+        ]
+    },
+    "Printer Mapping POS Restaurant": {
+        # Kitchen stations cache their resolved printer lists
+        "on_update": "pos_restaurant_itb.utils.kitchen_routing.clear_station_printers",
+        "on_trash": "pos_restaurant_itb.utils.kitchen_routing.clear_station_printers"
     }
 }
 
@@ -38,15 +88,29 @@ fixtures = [
 # Whitelisted methods
 whitelist_methods = {
     "pos_restaurant_itb.api.create_kot.create_kot_from_pos_order": True,
+    "pos_restaurant_itb.api.create_kot.create_kots_for_orders": True,
     "pos_restaurant_itb.api.get_attributes_for_item.get_attributes_for_item": True,
-    "pos_restaurant_itb.api.resolve_variant.resolve_variant": True
+    "pos_restaurant_itb.api.kds_sync.get_kds_changes": True,
+    "pos_restaurant_itb.api.kitchen_status.update_kitchen_status": True,
+    "pos_restaurant_itb.api.menu_snapshot.get_menu_snapshot": True,
+    "pos_restaurant_itb.api.menu_snapshot.get_menu_delta": True,
+    "pos_restaurant_itb.api.resolve_variant.resolve_variant": True,
+    "pos_restaurant_itb.api.resolve_variant.resolve_variants": True
 }
 
 # Scheduler tasks - for background processing if needed
 scheduler_events = {
     "hourly": [
         "pos_restaurant_itb.utils.cleanup.clear_old_kitchen_sessions"
-    ]
+    ],
+    "daily": [
+        "pos_restaurant_itb.utils.cleanup.clear_old_kitchen_tombstones"
+    ],
+    "cron": {
+        "*/5 * * * *": [
+            "pos_restaurant_itb.utils.kitchen_pipeline.enqueue_missing_kitchen_pipelines"
+        ]
+    }
 }
 
 # Permissions hook
@@ -0,0 +1,76 @@
+# File: pos_restaurant_itb/patches/v1_0/normalize_attributes.py
+
+import frappe
+from pos_restaurant_itb.utils.kot_helpers import get_attribute_summary
+from pos_restaurant_itb.utils.variants import (
+    encode_attribute_pairs,
+    get_attribute_pairs,
+    get_attributes_hash,
+)
+
+ATTRIBUTE_COLUMNS = {
+    "POS Order Item": ("dynamic_attributes", "variant_attributes"),
+    "KOT Item": ("dynamic_attributes", "variant_attributes"),
+    "Kitchen Station": ("dynamic_attributes", "variant_attributes"),
+}
+
+def execute():
+    """
+    Rewrite existing attribute JSON in the canonical encoding, computed
+    once per distinct value, then store the summary and hash of each row
+    from its dynamic_attributes, else its variant_attributes (as
+    set_attribute_fields does); unparsable values are left as they are
+    """
+    for doctype, fieldnames in ATTRIBUTE_COLUMNS.items():
+        fieldnames = [f for f in fieldnames if frappe.db.has_column(doctype, f)]
+        if not fieldnames:
+            continue
+
+        for fieldname in fieldnames:
+            normalize_column(doctype, fieldname)
+        set_summary_and_hash(doctype, fieldnames)
+
+def normalize_column(doctype, fieldname):
+    values = frappe.db.sql(f"""
+        SELECT DISTINCT `{fieldname}`
+        FROM `tab{doctype}`
+        WHERE IFNULL(`{fieldname}`, '') != ''
+    """, pluck=True)
+
+    for value in values:
+        try:
+            pairs = get_attribute_pairs(value)
+        except (ValueError, TypeError, AttributeError):
+            continue
+
+        encoded = encode_attribute_pairs(pairs) if pairs else None
+        if encoded != value:
+            frappe.db.sql(f"""
+                UPDATE `tab{doctype}`
+                SET `{fieldname}` = %s
+                WHERE `{fieldname}` = %s
+            """, (encoded, value))
+
+def set_summary_and_hash(doctype, fieldnames):
+    source = "COALESCE({0})".format(
+        ", ".join(f"NULLIF(`{fieldname}`, '')" for fieldname in fieldnames)
+    )
+    values = frappe.db.sql(f"""
+        SELECT DISTINCT {source}
+        FROM `tab{doctype}`
+        WHERE {source} IS NOT NULL
+    """, pluck=True)
+
+    for value in values:
+        try:
+            get_attribute_pairs(value)
+        except (ValueError, TypeError, AttributeError):
+            continue
+
+        attributes_hash = get_attributes_hash(value)
+        frappe.db.sql(f"""
+            UPDATE `tab{doctype}`
+            SET attribute_summary = %s, attributes_hash = %s
+            WHERE {source} = %s
+            AND NOT attributes_hash <=> %s
+        """, (get_attribute_summary(value), attributes_hash, value, attributes_hash))
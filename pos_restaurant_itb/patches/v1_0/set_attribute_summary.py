@@ -0,0 +1,32 @@
+# File: pos_restaurant_itb/patches/v1_0/set_attribute_summary.py
+
+import frappe
+from pos_restaurant_itb.utils.kot_helpers import get_attribute_summary
+
+def execute():
+    """
+    Store the attribute summary of existing KOT Item and POS Order Item
+    rows, computed once per distinct attribute JSON
+    """
+    for doctype, fieldname in (
+        ("KOT Item", "dynamic_attributes"),
+        ("KOT Item", "variant_attributes"),
+        ("POS Order Item", "variant_attributes"),
+    ):
+        if not frappe.db.has_column(doctype, fieldname):
+            continue
+
+        values = frappe.db.sql(f"""
+            SELECT DISTINCT `{fieldname}`
+            FROM `tab{doctype}`
+            WHERE IFNULL(`{fieldname}`, '') != ''
+            AND IFNULL(attribute_summary, '') = ''
+        """, pluck=True)
+
+        for value in values:
+            frappe.db.sql(f"""
+                UPDATE `tab{doctype}`
+                SET attribute_summary = %s
+                WHERE `{fieldname}` = %s
+                AND IFNULL(attribute_summary, '') = ''
+            """, (get_attribute_summary(value), value))
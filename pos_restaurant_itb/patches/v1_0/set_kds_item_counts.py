@@ -0,0 +1,33 @@
+# File: pos_restaurant_itb/patches/v1_0/set_kds_item_counts.py
+
+import frappe
+from pos_restaurant_itb.utils.kot_helpers import KITCHEN_STATUSES, get_kds_counter_field
+
+def execute():
+    """
+    Count the items per kitchen status of existing Kitchen Display Orders
+    with one set-based UPDATE
+    """
+    counts = []
+    for status in KITCHEN_STATUSES:
+        if status == "Cancelled":
+            condition = "cancelled = 1 OR kot_status = 'Cancelled'"
+        elif status == "Queued":
+            condition = "cancelled = 0 AND IFNULL(kot_status, '') IN ('', 'Queued')"
+        else:
+            condition = f"cancelled = 0 AND kot_status = '{status}'"
+        counts.append(f"SUM({condition}) AS `{get_kds_counter_field(status)}`")
+
+    frappe.db.sql(f"""
+        UPDATE `tabKitchen Display Order` kds
+        INNER JOIN (
+            SELECT parent, {", ".join(counts)}
+            FROM `tabKOT Item`
+            WHERE parenttype = 'Kitchen Display Order'
+            GROUP BY parent
+        ) item_counts ON item_counts.parent = kds.name
+        SET {", ".join(
+            f"kds.`{field}` = item_counts.`{field}`"
+            for field in map(get_kds_counter_field, KITCHEN_STATUSES)
+        )}
+    """)
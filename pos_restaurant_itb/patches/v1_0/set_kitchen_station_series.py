@@ -0,0 +1,27 @@
+# File: pos_restaurant_itb/patches/v1_0/set_kitchen_station_series.py
+
+import frappe
+from frappe.utils import cint
+from pos_restaurant_itb.api.kitchen_station import KITCHEN_STATION_SERIES
+
+def execute():
+    """
+    Kitchen Station names now come from the "KS-" series key that the bulk
+    insert reserves from; move the key past every existing name
+    """
+    last = frappe.db.sql("""
+        SELECT MAX(CAST(SUBSTRING(name, %s) AS UNSIGNED))
+        FROM `tabKitchen Station`
+        WHERE name LIKE %s
+    """, (len(KITCHEN_STATION_SERIES) + 1, f"{KITCHEN_STATION_SERIES}%"))[0][0]
+    if not last:
+        return
+
+    frappe.db.sql(
+        "INSERT IGNORE INTO `tabSeries` (name, current) VALUES (%s, 0)",
+        (KITCHEN_STATION_SERIES,)
+    )
+    frappe.db.sql(
+        "UPDATE `tabSeries` SET current = GREATEST(current, %s) WHERE name = %s",
+        (cint(last), KITCHEN_STATION_SERIES)
+    )
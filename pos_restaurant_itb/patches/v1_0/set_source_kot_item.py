@@ -0,0 +1,31 @@
+# File: pos_restaurant_itb/patches/v1_0/set_source_kot_item.py
+
+import frappe
+
+def execute():
+    """
+    Link existing KDS items and per-line Kitchen Station rows to the KOT
+    row they came from
+
+    KDS items were copied from their KOT in order, so they match by idx.
+    Per-unit Kitchen Station rows carry no reference to their line and
+    are left as they are.
+    """
+    frappe.db.sql("""
+        UPDATE `tabKOT Item` copy
+        INNER JOIN `tabKitchen Display Order` kds ON kds.name = copy.parent
+        INNER JOIN `tabKOT Item` source
+            ON source.parent = kds.kot_id
+            AND source.parenttype = 'Kitchen Order Ticket'
+            AND source.idx = copy.idx
+        SET copy.source_kot_item = source.name
+        WHERE copy.parenttype = 'Kitchen Display Order'
+        AND IFNULL(copy.source_kot_item, '') = ''
+    """)
+
+    frappe.db.sql("""
+        UPDATE `tabKitchen Station`
+        SET source_kot_item = kot_item
+        WHERE IFNULL(kot_item, '') != ''
+        AND IFNULL(source_kot_item, '') = ''
+    """)
@@ -2,6 +2,12 @@ import frappe
 from frappe import _
 from frappe.model.document import Document
 from frappe.utils import now_datetime
+from pos_restaurant_itb.utils.kot_helpers import (
+    KITCHEN_STATUSES,
+    get_item_kitchen_status,
+    get_kds_counter_field,
+)
+from pos_restaurant_itb.utils.status_propagation import propagate_kds_status
 
 class KitchenDisplayOrder(Document):
     def autoname(self):
@@ -21,19 +27,36 @@ class KitchenDisplayOrder(Document):
         """
         self.last_updated = now_datetime()
     
-    def on_update(self):
+    def validate(self):
         """
-        Update the last_updated field on every update
-        Also update the status of the related KOT if needed
+        Update the last_updated field on every save, kitchen screens sync on it
+        Also recount the items per kitchen status
         """
         self.last_updated = now_datetime()
-        
-        # Only update the KOT if this document is being updated manually (not from KOT)
-        if not frappe.flags.in_kot_update and self.kot_id:
-            kot = frappe.get_doc("Kitchen Order Ticket", self.kot_id)
-            
-            # Only update KOT status if it's different
-            if kot.status != self.status:
-                kot.status = self.status
-                kot.db.set_value("Kitchen Order Ticket", self.kot_id, "status", self.status)
-                frappe.db.commit()
\ No newline at end of file
+        self.set_item_counts()
+
+    def set_item_counts(self):
+        """
+        Set the per-status item counters from the item list
+        """
+        counts = dict.fromkeys(KITCHEN_STATUSES, 0)
+        for item in self.item_list:
+            counts[get_item_kitchen_status(item)] += 1
+
+        for status, count in counts.items():
+            self.set(get_kds_counter_field(status), count)
+
+    def on_update(self):
+        """
+        Update the status of the related KOT (and its POS Order) if needed
+
+        Saves made while a status change propagates are skipped, the
+        propagation updates the KOT itself.
+        """
+        propagate_kds_status(self)
+
+def on_doctype_update():
+    """
+    Kitchen screens poll for changes per branch in last_updated order
+    """
+    frappe.db.add_index("Kitchen Display Order", ["branch", "last_updated"])
@@ -2,6 +2,9 @@ import frappe
 from frappe import _
 from frappe.model.document import Document
 from frappe.utils import now, now_datetime
+from pos_restaurant_itb.utils.doc_handoff import get_handoff_doc, get_handoff_doc_if_present
+from pos_restaurant_itb.utils.kot_helpers import mark_items_sent_to_kitchen, set_attribute_fields
+from pos_restaurant_itb.utils.sequence import next_sequence
 
 class KOT(Document):
     def autoname(self):
@@ -16,22 +19,16 @@ class KOT(Document):
         
         prefix = f"KOT-{today}-{branch_code}"
         
-        last = frappe.db.sql(
-            """SELECT name FROM `tabKOT`
-               WHERE name LIKE %s
-               ORDER BY name DESC LIMIT 1""",
-            (prefix + "%",)
-        )
-        
-        last_number = int(last[0][0].split("-")[-1]) if last else 0
-        self.kot_id = f"{prefix}-{str(last_number + 1).zfill(4)}"
+        # Atomic per-branch/per-day counter instead of scanning the table
+        number = next_sequence("Kitchen Order Ticket", branch_code, today, legacy_prefix=prefix)
+        self.kot_id = f"{prefix}-{str(number).zfill(4)}"
 
     def validate(self):
         """
         Validates the Kitchen Order Ticket data.
         """
         if self.pos_order:
-            pos_order = frappe.get_doc("POS Order", self.pos_order)
+            pos_order = get_handoff_doc("POS Order", self.pos_order)
             
             # Prevent creating KOT from finalized POS Orders
             if pos_order.docstatus == 1 and pos_order.status == "Paid":
@@ -53,6 +50,7 @@ class KOT(Document):
                             "kot_status": "Queued",
                             "kot_last_update": now(),
                             "dynamic_attributes": item.dynamic_attributes,
+                            "pos_order_item": item.name,
                             "cancelled": 0
                         })
         
@@ -63,6 +61,11 @@ class KOT(Document):
         # Ensure there are items to process
         if not self.kot_items:
             frappe.throw(_("No valid items found to create KOT."))
+        
+        # Canonical attributes with their summary and hash, stored once for KDS,
+        # Kitchen Station and printing
+        for item in self.kot_items:
+            set_attribute_fields(item)
             
         # Set KOT time if not set
         if not self.kot_time:
@@ -70,29 +73,20 @@ class KOT(Document):
             
     def after_insert(self):
         """
-        After KOT is saved, update the related POS Order items
+        After KOT is saved, mark exactly the POS Order rows it was built from
+        as sent to kitchen, with a single UPDATE
         """
         if self.pos_order:
-            # Get all item codes in this KOT
-            kot_item_codes = [item.item_code for item in self.kot_items]
+            row_names = [item.pos_order_item for item in self.kot_items if item.pos_order_item]
+            mark_items_sent_to_kitchen(self.name, row_names)
             
-            # Update POS Order Items
-            pos_order_items = frappe.get_all(
-                "POS Order Item", 
-                filters={
-                    "parent": self.pos_order,
-                    "item_code": ["in", kot_item_codes],
-                    "sent_to_kitchen": 0,
-                    "cancelled": 0
-                },
-                fields=["name"]
-            )
-            
-            for item in pos_order_items:
-                frappe.db.set_value("POS Order Item", item.name, {
-                    "sent_to_kitchen": 1,
-                    "kot_id": self.name
-                })
+            # Keep the in-memory order in step when the caller passed it down
+            pos_order = get_handoff_doc_if_present("POS Order", self.pos_order)
+            if pos_order:
+                for item in pos_order.items:
+                    if item.name in row_names:
+                        item.sent_to_kitchen = 1
+                        item.kot_id = self.name
     
     def get_waiter_from_user(self):
         """
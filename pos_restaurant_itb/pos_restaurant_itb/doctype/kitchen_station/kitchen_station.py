@@ -1,57 +1,65 @@
 # File: pos_restaurant_itb/api/kitchen_station.py
 
 import frappe
+from frappe import _
 from frappe.model.document import Document
+from frappe.utils import now_datetime
+from pos_restaurant_itb.utils.kds_realtime import publish_kitchen_station_rows
+from pos_restaurant_itb.utils.kot_helpers import (
+    KITCHEN_STATUSES,
+    get_aggregate_unit_status,
+    get_status_qty_field,
+    set_attribute_fields,
+)
+from pos_restaurant_itb.utils.status_propagation import propagate_kitchen_station_changes
 
 class KitchenStation(Document):
-    pass
+    def validate(self):
+        """
+        Keep per-line rows consistent: unit counters must add up to qty
+        and the row status follows the counters
+        """
+        set_attribute_fields(self)
+        self.last_updated = now_datetime()
+
+        if not self.kot_item:
+            return
+
+        counts = self.get_unit_counts()
+        if any(qty < 0 for qty in counts.values()):
+            frappe.throw(_("Unit counts cannot be negative."))
+        if sum(counts.values()) != int(self.qty or 0):
+            frappe.throw(_("Unit counts must add up to the quantity of {0}.").format(self.qty))
+
+        self.status = get_aggregate_unit_status(counts)
+
+    def on_update(self):
+        """
+        Push the row to the kitchen screens of its branch and stations,
+        then carry its status up to the KOT line and beyond
+        """
+        publish_kitchen_station_rows([self.as_dict()])
+        propagate_kitchen_station_changes({self.source_kot_item or self.kot_item})
+
+    def get_unit_counts(self):
+        """
+        Returns a dict of kitchen status -> units in that status
+        """
+        return {
+            status: int(self.get(get_status_qty_field(status)) or 0)
+            for status in KITCHEN_STATUSES
+        }
+
+def on_doctype_update():
+    """
+    Kitchen screens poll for changes per branch in last_updated order
+    """
+    frappe.db.add_index("Kitchen Station", ["branch", "last_updated"])
 
 @frappe.whitelist()
 def create_kitchen_station_items_from_kot(kot_id):
     """
-    Create Kitchen Station items for each item in the KOT.
-    For items with quantity > 1, creates multiple Kitchen Station entries.
+    Kept for callers of the old path, see api/kitchen_station.py
     """
-    if not kot_id:
-        frappe.throw(_("KOT ID is required."))
-    
-    kot = frappe.get_doc("Kitchen Order Ticket", kot_id)
-    created_items = []
-    
-    for kot_item in kot.kot_items:
-        # Skip cancelled items
-        if kot_item.cancelled:
-            continue
-        
-        # Get the item group
-        item_group = frappe.db.get_value("Item", kot_item.item_code, "item_group")
-        
-        # For each quantity unit, create a separate Kitchen Station entry
-        for i in range(int(kot_item.qty)):
-            kitchen_item = frappe.new_doc("Kitchen Station")
-            kitchen_item.kot = kot.name
-            kitchen_item.branch = kot.branch  # Set the branch from the KOT
-            kitchen_item.item_code = kot_item.item_code
-            kitchen_item.item_group = item_group
-            kitchen_item.status = kot_item.kot_status or "Queued"
-            kitchen_item.note = kot_item.note
-            kitchen_item.dynamic_attributes = kot_item.dynamic_attributes
-            kitchen_item.cancelled = kot_item.cancelled
-            kitchen_item.cancellation_note = kot_item.cancellation_note
-            
-            # Save the Kitchen Station item
-            kitchen_item.insert(ignore_permissions=True)
-            created_items.append(kitchen_item.name)
-    
-    if created_items:
-        frappe.db.commit()
-        return {
-            "status": "success",
-            "message": _(f"Created {len(created_items)} Kitchen Station items for KOT {kot_id}"),
-            "items": created_items
-        }
-    else:
-        return {
-            "status": "warning",
-            "message": _(f"No items created for KOT {kot_id}")
-        }
\ No newline at end of file
+    from pos_restaurant_itb.api.kitchen_station import create_kitchen_station_items_from_kot as create_items
+    return create_items(kot_id)
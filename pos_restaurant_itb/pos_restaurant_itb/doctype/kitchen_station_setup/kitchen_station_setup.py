@@ -1,6 +1,8 @@
 import frappe
 from frappe import _
 from frappe.model.document import Document
+from pos_restaurant_itb.api.menu_snapshot import clear_menu_snapshot
+from pos_restaurant_itb.utils.kitchen_routing import clear_routing_index, clear_station_printers
 
 class KitchenStationSetup(Document):
     def autoname(self):
@@ -41,6 +43,28 @@ class KitchenStationSetup(Document):
         if not self.station_display_name:
             self.station_display_name = self.station_name
     
+    def on_update(self):
+        """
+        Routing, printer lists and menu snapshots depend on this station,
+        rebuild them lazily
+        """
+        clear_routing_index()
+        clear_station_printers()
+        clear_menu_snapshot()
+    
+    def on_trash(self):
+        clear_routing_index()
+        clear_station_printers()
+        clear_menu_snapshot()
+
+    def after_rename(self, old_name, new_name, merge=False):
+        """
+        Cached routing and printer lists still carry the old name
+        """
+        clear_routing_index()
+        clear_station_printers()
+        clear_menu_snapshot()
+    
     def validate_printer_mappings(self):
         """
         Validates printer mappings
@@ -0,0 +1,28 @@
+import frappe
+from frappe.model.document import Document
+from frappe.utils import now_datetime
+
+class KitchenTombstone(Document):
+    pass
+
+def on_doctype_update():
+    """
+    Kitchen screens poll for deletions per branch in deleted_at order
+    """
+    frappe.db.add_index("Kitchen Tombstone", ["branch", "deleted_at"])
+
+def add_kitchen_tombstone(doc, method=None):
+    """
+    Record a deleted Kitchen Display Order or Kitchen Station row, so
+    screens syncing with a cursor drop it (see api.kds_sync)
+    """
+    if not doc.get("branch"):
+        return
+
+    frappe.get_doc({
+        "doctype": "Kitchen Tombstone",
+        "reference_doctype": doc.doctype,
+        "reference_name": doc.name,
+        "branch": doc.branch,
+        "deleted_at": now_datetime()
+    }).insert(ignore_permissions=True)
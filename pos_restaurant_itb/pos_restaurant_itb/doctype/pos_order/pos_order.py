@@ -2,6 +2,8 @@ import frappe
 from frappe import _
 from frappe.utils import today, now_datetime
 from frappe.model.document import Document
+from pos_restaurant_itb.utils.kot_helpers import set_attribute_fields
+from pos_restaurant_itb.utils.sequence import next_sequence
 
 class POSOrder(Document):
     def autoname(self):
@@ -15,21 +17,10 @@ class POSOrder(Document):
             
             date_str = now_datetime().strftime("%Y%m%d")
             prefix = f"ORD-{branch_code}-{date_str}"
-            
-            # Find the last order ID with this prefix
-            last_order = frappe.db.sql("""
-                SELECT name FROM `tabPOS Order`
-                WHERE name LIKE %s
-                ORDER BY name DESC LIMIT 1
-            """, (prefix + "%",))
-            
-            if last_order:
-                last_num = int(last_order[0][0].split("-")[-1])
-                order_id = f"{prefix}-{str(last_num + 1).zfill(4)}"
-            else:
-                order_id = f"{prefix}-0001"
-                
-            self.order_id = order_id
+
+            # Atomic per-branch/per-day counter instead of scanning the table
+            number = next_sequence("POS Order", branch_code, date_str, legacy_prefix=prefix)
+            self.order_id = f"{prefix}-{str(number).zfill(4)}"
     
     def validate(self):
         """Validate POS Order data."""
@@ -73,6 +64,10 @@ class POSOrder(Document):
         """Validate that the order has items."""
         if not self.items or len(self.items) == 0:
             frappe.throw(_("Please add at least one item to the order."))
+        
+        # Child controllers are not validated by the parent save
+        for item in self.items:
+            set_attribute_fields(item)
     
     def calculate_total_amount(self):
         """Calculate the total amount based on items."""
@@ -93,7 +88,7 @@ class POSOrder(Document):
             valid_transitions = {
                 "Draft": ["In Progress", "Cancelled"],
                 "In Progress": ["Ready for Billing", "Cancelled"],
-                "Ready for Billing": ["Paid", "Cancelled"],
+                "Ready for Billing": ["In Progress", "Paid", "Cancelled"],
                 "Paid": [],  # Cannot transition from Paid
                 "Cancelled": []  # Cannot transition from Cancelled
             }
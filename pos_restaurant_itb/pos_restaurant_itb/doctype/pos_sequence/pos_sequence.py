@@ -0,0 +1,10 @@
+from frappe.model.document import Document
+from pos_restaurant_itb.utils.sequence import get_sequence_key
+
+class POSSequence(Document):
+    def autoname(self):
+        """
+        One row per (doctype, branch code, date), named by the same key
+        the allocator in utils/sequence.py uses
+        """
+        self.name = get_sequence_key(self.reference_doctype, self.branch_code, self.sequence_date)
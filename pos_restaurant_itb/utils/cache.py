@@ -0,0 +1,31 @@
+# File: pos_restaurant_itb/utils/cache.py
+
+import frappe
+
+def delete_cache(key, fields=None):
+    """
+    Drops a cached value (or some fields of a cached hash) now and again
+    once the transaction commits
+
+    Dropping it now keeps this transaction from reading the old entry;
+    dropping it after commit also discards an entry that a concurrent
+    request rebuilt from the data as it was before the commit.
+
+    Args:
+        key: Cache key
+        fields: Fields of the hash to drop; the whole key when not given
+    """
+    if fields is not None:
+        fields = [field for field in fields if field]
+        if not fields:
+            return
+
+    def delete():
+        if fields is not None:
+            for field in fields:
+                frappe.cache().hdel(key, field)
+        else:
+            frappe.cache().delete_value(key)
+
+    delete()
+    frappe.db.after_commit.add(delete)
@@ -1,5 +1,6 @@
 import frappe
 from frappe.utils import now_datetime, add_days
+from pos_restaurant_itb.utils.settings import get_pos_setting
 
 def clear_old_kitchen_sessions():
     """Clear kitchen sessions older than 24 hours"""
@@ -10,7 +11,8 @@ def clear_old_kitchen_sessions():
         "Kitchen Display Order",
         filters={
             "creation": ["<", cutoff_time],
-            "status": ["in", ["Served", "Cancelled"]]
+            "status": ["in", ["Served", "Cancelled"]],
+            "archived": 0
         },
         pluck="name"
     )
@@ -18,8 +20,11 @@ def clear_old_kitchen_sessions():
     count = 0
     for kds in old_kds:
         try:
-            # Either archive or delete
-            frappe.db.set_value("Kitchen Display Order", kds, "archived", 1)
+            # Bumping last_updated hands screens the tombstone on their next sync
+            frappe.db.set_value("Kitchen Display Order", kds, {
+                "archived": 1,
+                "last_updated": now_datetime()
+            })
             count += 1
         except Exception as e:
             frappe.log_error(f"Failed to archive KDS {kds}: {str(e)}", "Cleanup Error")
@@ -27,4 +32,10 @@ def clear_old_kitchen_sessions():
     frappe.db.commit()
     
     if count > 0:
-        frappe.log_error(f"Cleared {count} old kitchen sessions", "Kitchen Cleanup")
\ No newline at end of file
+        frappe.log_error(f"Cleared {count} old kitchen sessions", "Kitchen Cleanup")
+
+def clear_old_kitchen_tombstones():
+    """Delete Kitchen Tombstones older than `pos_restaurant_kds_tombstone_days`"""
+    cutoff_time = add_days(now_datetime(), -int(get_pos_setting("kds_tombstone_days", 7)))
+    frappe.db.delete("Kitchen Tombstone", {"deleted_at": ["<", cutoff_time]})
+    frappe.db.commit()
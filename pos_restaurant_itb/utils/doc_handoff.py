@@ -0,0 +1,63 @@
+# File: pos_restaurant_itb/utils/doc_handoff.py
+
+from contextlib import contextmanager
+
+import frappe
+
+
+@contextmanager
+def handoff(*docs):
+    """
+    Make in-memory documents available to the code running inside the block
+
+    The order-to-kitchen chain passes ids between hooks and API functions;
+    handing the documents off lets each step reuse the instance the caller
+    already holds instead of loading it again. Documents are only shared for
+    the duration of the block, so later code in the same request never sees
+    a stale copy.
+
+    Usage:
+        with handoff(pos_order):
+            create_kot_from_pos_order(pos_order.name)
+    """
+    store = _get_store()
+    keys = []
+    for doc in docs:
+        key = (doc.doctype, doc.name)
+        if key not in store:
+            store[key] = doc
+            keys.append(key)
+
+    try:
+        yield
+    finally:
+        for key in keys:
+            store.pop(key, None)
+
+
+def get_handoff_doc(doctype, name):
+    """
+    Return the handed-off document, or load it when no caller passed it down
+
+    Args:
+        doctype: DocType of the document
+        name: Name of the document
+
+    Returns:
+        Document instance
+    """
+    doc = get_handoff_doc_if_present(doctype, name)
+    return doc if doc is not None else frappe.get_doc(doctype, name)
+
+
+def get_handoff_doc_if_present(doctype, name):
+    """
+    Return the handed-off document or None
+    """
+    return _get_store().get((doctype, name))
+
+
+def _get_store():
+    if not hasattr(frappe.local, "pos_restaurant_handoff"):
+        frappe.local.pos_restaurant_handoff = {}
+    return frappe.local.pos_restaurant_handoff
@@ -0,0 +1,193 @@
+# File: pos_restaurant_itb/utils/escpos.py
+
+"""
+ESC/POS ticket renderer
+
+Kitchen tickets are rendered straight to printer bytes instead of going
+through Jinja, HTML and PDF. A layout is a short line-based template that
+is compiled once (and cached) into pre-encoded byte chunks, so rendering a
+ticket only fills in the placeholders.
+
+Layout syntax, one printed line per template line:
+
+    [center][double]{station}       directives, then text with {field}s
+    [rule]                          a full-width line of dashes
+    [item]{qty} x {item_name}       repeated for every ticket line
+    [feed 3]                        feed n lines
+    [cut]                           feed and cut the paper
+
+Directives: [left] [center] [right] [bold] [double] [item] [rule]
+[feed n] [cut]. A line with placeholders is left out when all of them are
+empty, e.g. an item without a note skips its note line. All [item] lines
+form one block that is printed where the first of them appears.
+
+This module does not depend on Frappe.
+"""
+
+import re
+import textwrap
+from functools import lru_cache
+from string import Formatter
+
+DEFAULT_WIDTH = 48
+DEFAULT_ENCODING = "cp437"
+
+DEFAULT_LAYOUT = """
+[center][double]{station}
+[center][bold]{kot}
+Table: {table}
+Waiter: {waiter}
+{time}
+[rule]
+[item][bold]{qty} x {item_name}
+[item]   {attribute_summary}
+[item]   Note: {note}
+[rule]
+[feed 3]
+[cut]
+"""
+
+# ESC/POS commands
+INIT = b"\x1b@"
+ALIGN = {"left": b"\x1ba\x00", "center": b"\x1ba\x01", "right": b"\x1ba\x02"}
+BOLD_ON, BOLD_OFF = b"\x1bE\x01", b"\x1bE\x00"
+DOUBLE_ON, DOUBLE_OFF = b"\x1d!\x11", b"\x1d!\x00"
+CUT = b"\x1dV\x42\x00"
+
+LINE_PATTERN = re.compile(r"^((?:\[[a-z]+(?: \d+)?\])*)(.*)$")
+DIRECTIVE_PATTERN = re.compile(r"\[([a-z]+)(?: (\d+))?\]")
+STYLE_DIRECTIVES = {"left", "center", "right", "bold", "double", "item"}
+
+class CompiledLayout:
+    """
+    A layout turned into byte chunks and line formatters
+
+    Attributes:
+        header: Ops printed once per ticket before the item block
+        items: Ops printed for every ticket line
+        footer: Ops printed once per ticket after the item block
+    """
+    def __init__(self, header, items, footer, width, encoding):
+        self.header = header
+        self.items = items
+        self.footer = footer
+        self.width = width
+        self.encoding = encoding
+
+    def render(self, ticket, items):
+        """
+        Render a ticket to ESC/POS bytes
+
+        Args:
+            ticket: Mapping of header fields (station, kot, table, ...)
+            items: Iterable of mappings with the item fields (qty,
+                item_name, attribute_summary, note, ...)
+        """
+        out = [INIT]
+        self._render_ops(self.header, ticket, out)
+        for item in items:
+            self._render_ops(self.items, item, out)
+        self._render_ops(self.footer, ticket, out)
+        return b"".join(out)
+
+    def _render_ops(self, ops, values, out):
+        for op in ops:
+            if isinstance(op, bytes):
+                out.append(op)
+                continue
+
+            prefix, template, fields, suffix, width = op
+            filled = {field: _text(values.get(field)) for field in fields}
+            if not any(filled.values()):
+                continue
+
+            text = template.format_map(filled)
+            out.append(prefix)
+            if len(text) <= width:
+                out.append(text.encode(self.encoding, "replace"))
+                out.append(b"\n")
+            else:
+                for part in textwrap.wrap(text, width) or [""]:
+                    out.append(part.encode(self.encoding, "replace"))
+                    out.append(b"\n")
+            out.append(suffix)
+
+@lru_cache(maxsize=64)
+def compile_layout(source=DEFAULT_LAYOUT, width=DEFAULT_WIDTH, encoding=DEFAULT_ENCODING):
+    """
+    Compile a layout, cached by its source so an edited layout is
+    compiled again while an unchanged one never is
+
+    Args:
+        source: Layout template (see module docstring)
+        width: Printable characters per line at normal size
+        encoding: Printer code page
+
+    Returns:
+        CompiledLayout
+
+    Raises:
+        ValueError: On an unknown directive
+    """
+    header, items, footer = [], [], []
+    target = header
+
+    for line in source.strip("\n").splitlines():
+        directives_text, text = LINE_PATTERN.match(line).groups()
+        directives = {}
+        for name, arg in DIRECTIVE_PATTERN.findall(directives_text):
+            if name not in STYLE_DIRECTIVES | {"rule", "feed", "cut"}:
+                raise ValueError(f"Unknown layout directive [{name}] in line: {line}")
+            directives[name] = int(arg) if arg else None
+
+        if "item" in directives:
+            if target is footer and items:
+                raise ValueError("All [item] lines of a layout must be next to each other")
+            target = items
+        elif target is items:
+            target = footer
+
+        if "cut" in directives:
+            target.append(CUT)
+            continue
+        if "feed" in directives:
+            target.append(b"\x1bd" + bytes([min(directives["feed"] or 1, 255)]))
+            continue
+        if "rule" in directives:
+            target.append(ALIGN["left"] + ("-" * width).encode(encoding) + b"\n")
+            continue
+
+        align = next((a for a in ("center", "right") if a in directives), "left")
+        prefix = ALIGN[align]
+        suffix = b""
+        line_width = width
+        if "bold" in directives:
+            prefix += BOLD_ON
+            suffix = BOLD_OFF + suffix
+        if "double" in directives:
+            prefix += DOUBLE_ON
+            suffix = DOUBLE_OFF + suffix
+            line_width = width // 2
+
+        fields = tuple(dict.fromkeys(
+            field for _, field, _, _ in Formatter().parse(text) if field
+        ))
+        if fields:
+            target.append((prefix, text, fields, suffix, line_width))
+        else:
+            target.append(prefix + text.encode(encoding, "replace") + b"\n" + suffix)
+
+    return CompiledLayout(tuple(header), tuple(items), tuple(footer), width, encoding)
+
+def render_ticket(ticket, items, source=DEFAULT_LAYOUT, width=DEFAULT_WIDTH):
+    """
+    Render a ticket with a (cached) compiled layout
+    """
+    return compile_layout(source or DEFAULT_LAYOUT, width).render(ticket, items)
+
+def _text(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
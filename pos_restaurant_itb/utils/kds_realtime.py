@@ -0,0 +1,196 @@
+# File: pos_restaurant_itb/utils/kds_realtime.py
+
+"""
+Realtime updates for kitchen screens
+
+Every change a kitchen screen shows is pushed as a small delta on the
+`pos_restaurant_kds` socket event, to the room of the branch and to the
+room of each kitchen station concerned. Screens join their rooms with the
+`pos_restaurant:kds_subscribe` socket event (see realtime/handlers.js) and
+only fetch the full list when they (re)connect.
+
+Events are sent after the transaction commits and dropped on rollback.
+Messages have a "type":
+
+    kds_new          a new Kitchen Display Order with its items (station
+                     rooms get only the items routed to the station)
+    kds_status       {kds, status, last_updated} of an existing one
+    kds_items        {kds, items: [{name, kot_status}]}: item status changes
+    kitchen_station  {rows: [...]}: Kitchen Station rows to add or merge
+                     by name; new rows carry all fields, updates only the
+                     changed ones
+"""
+
+import frappe
+from frappe import _
+from pos_restaurant_itb.utils.kitchen_routing import (
+    get_item_group_lfts,
+    get_kitchen_stations_for_items,
+    get_routing_index,
+    lookup_stations,
+)
+from pos_restaurant_itb.utils.kot_helpers import KITCHEN_STATUSES, get_status_qty_field
+from pos_restaurant_itb.utils.permissions import kds_permissions
+
+KDS_EVENT = "pos_restaurant_kds"
+
+KDS_ITEM_FIELDS = (
+    "item_code", "item_name", "qty", "attribute_summary", "note", "kot_status",
+    "cancelled"
+)
+
+KITCHEN_STATION_FIELDS = (
+    "name", "kot", "item_code", "item_name", "status", "qty", "attribute_summary",
+    "note", "cancelled", "last_updated"
+)
+
+def get_branch_room(branch):
+    return f"pos_restaurant:branch:{branch}"
+
+def get_station_room(station):
+    return f"pos_restaurant:station:{station}"
+
+@frappe.whitelist()
+def get_kds_rooms(branch, station=None):
+    """
+    Rooms a kitchen screen joins, called by the socket server when a
+    screen subscribes
+
+    Args:
+        branch: Branch of the screen
+        station: Kitchen Station Setup the screen shows, if any
+
+    Returns:
+        List of room names
+    """
+    check_kds_access(branch)
+    # Socket clients may send an unset station as a string
+    if station in ("", "undefined", "null"):
+        station = None
+
+    rooms = [get_branch_room(branch)]
+    if station:
+        if frappe.db.get_value("Kitchen Station Setup", station, "branch") != branch:
+            frappe.throw(_("Kitchen station {0} does not belong to branch {1}.").format(station, branch))
+        rooms.append(get_station_room(station))
+
+    return rooms
+
+def check_kds_access(branch):
+    """
+    Throws unless the user may follow the kitchen displays of a branch
+    """
+    if not branch or not frappe.db.exists("Branch", branch):
+        frappe.throw(_("Branch {0} not found.").format(branch))
+
+    if not frappe.has_permission("Kitchen Display Order", "read") or not kds_permissions(
+        frappe._dict(branch=branch)
+    ):
+        frappe.throw(_("Not permitted to follow kitchen displays."), frappe.PermissionError)
+
+def publish_to_rooms(messages):
+    """
+    Send a message per room once the transaction commits
+
+    Args:
+        messages: Dict of room -> message
+    """
+    for room, message in messages.items():
+        frappe.publish_realtime(KDS_EVENT, message, room=room, after_commit=True)
+
+def publish_kds_created(kds):
+    """
+    Announce a new Kitchen Display Order
+
+    Args:
+        kds: The Kitchen Display Order document
+    """
+    message = {
+        "type": "kds_new",
+        "kds": kds.name,
+        "kot": kds.kot_id,
+        "table": kds.table_number,
+        "status": kds.status,
+        "last_updated": kds.last_updated
+    }
+
+    def with_items(rows):
+        return dict(message, items=[{field: row.get(field) for field in KDS_ITEM_FIELDS} for row in rows])
+
+    publish_to_rooms({get_branch_room(kds.branch): with_items(kds.item_list)})
+    publish_to_rooms({
+        get_station_room(station): with_items(rows)
+        for station, rows in get_kitchen_stations_for_items(kds.item_list, kds.branch).items()
+    })
+
+def publish_kds_status(kds_name, branch, status, last_updated=None):
+    """
+    Announce the new status of a Kitchen Display Order
+    """
+    publish_to_rooms({
+        get_branch_room(branch): {
+            "type": "kds_status",
+            "kds": kds_name,
+            "status": status,
+            "last_updated": last_updated
+        }
+    })
+
+def publish_kds_items(kds_name, branch, items):
+    """
+    Announce item status changes of a Kitchen Display Order
+
+    Args:
+        items: List of {"name", "kot_status"} of the changed KDS items
+    """
+    publish_to_rooms({
+        get_branch_room(branch): {"type": "kds_items", "kds": kds_name, "items": items}
+    })
+
+def publish_kitchen_station_rows(rows):
+    """
+    Announce new or changed Kitchen Station rows
+
+    Rows are routed to station rooms by their item group; each room gets
+    one message with all of its rows.
+
+    Args:
+        rows: Dicts with at least name, branch and item_group, plus the
+            fields that changed. Per-line rows (with kot_item) also carry
+            their unit counters.
+    """
+    rows_by_room = {}
+    stations_by_group = {}
+    lfts = get_item_group_lfts([row.get("item_group") for row in rows if row.get("branch")])
+
+    for row in rows:
+        branch = row.get("branch")
+        if not branch:
+            continue
+
+        key = (branch, row.get("item_group"))
+        if key not in stations_by_group:
+            stations_by_group[key] = lookup_stations(get_routing_index(branch), lfts.get(key[1]))
+
+        delta = get_kitchen_station_delta(row)
+        rows_by_room.setdefault(get_branch_room(branch), []).append(delta)
+        for station in stations_by_group[key]:
+            rows_by_room.setdefault(get_station_room(station), []).append(delta)
+
+    publish_to_rooms({
+        room: {"type": "kitchen_station", "rows": room_rows}
+        for room, room_rows in rows_by_room.items()
+    })
+
+def get_kitchen_station_delta(row):
+    """
+    The fields of a Kitchen Station row that are sent to screens
+    """
+    delta = {field: row.get(field) for field in KITCHEN_STATION_FIELDS if field in row}
+    if row.get("kot_item"):
+        delta["unit_counts"] = {
+            status: row.get(get_status_qty_field(status)) or 0 for status in KITCHEN_STATUSES
+        }
+    elif "unit_counts" in row:
+        delta["unit_counts"] = row["unit_counts"]
+    return delta
@@ -0,0 +1,114 @@
+# File: pos_restaurant_itb/utils/kitchen_pipeline.py
+
+import frappe
+from frappe.utils import add_to_date, now_datetime
+from pos_restaurant_itb.utils.doc_handoff import handoff
+from pos_restaurant_itb.utils.kot_printing import print_kot
+from pos_restaurant_itb.utils.settings import get_pos_setting
+
+# Kitchen pipeline modes, set with `pos_restaurant_kitchen_pipeline`
+SYNC = "sync"     # build KDS and Kitchen Station rows inside the KOT insert
+QUEUE = "queue"   # build them in a background job after the KOT commits
+
+PIPELINE_METHOD = "pos_restaurant_itb.utils.kitchen_pipeline.run_kitchen_pipeline"
+
+def get_kitchen_pipeline_mode():
+    """
+    Returns SYNC (default) or QUEUE
+    """
+    return QUEUE if get_pos_setting("kitchen_pipeline", SYNC) == QUEUE else SYNC
+
+def process_kot_after_insert(doc, method=None):
+    """
+    KOT after_insert hook: create the KDS and Kitchen Station entries
+
+    In queue mode the work is enqueued after the KOT's transaction commits,
+    so the POS save returns as soon as the order and KOT are durable.
+    Tickets for auto-printing stations are sent after commit in both modes.
+
+    Args:
+        doc: The Kitchen Order Ticket document
+        method: The method that triggered this hook (unused)
+    """
+    try:
+        print_kot(doc)
+    except Exception as e:
+        # Printing is best effort, the KOT and kitchen screens come first
+        frappe.log_error(
+            title=f"KOT Printing Error for {doc.name}",
+            message=f"Error: {str(e)}\n\nTraceback: {frappe.get_traceback()}"
+        )
+
+    if get_kitchen_pipeline_mode() == QUEUE:
+        enqueue_kitchen_pipeline(doc.name)
+    else:
+        # Both steps reuse the KOT in memory instead of reloading it
+        with handoff(doc):
+            run_kitchen_pipeline(doc.name)
+
+def enqueue_kitchen_pipeline(kot_id):
+    """
+    Enqueue the kitchen pipeline for a KOT
+
+    The job id doubles as idempotency key: a KOT already waiting in the
+    queue is not enqueued a second time.
+    """
+    frappe.enqueue(
+        PIPELINE_METHOD,
+        queue="short",
+        job_id=get_pipeline_job_id(kot_id),
+        deduplicate=True,
+        enqueue_after_commit=True,
+        kot_id=kot_id
+    )
+
+def get_pipeline_job_id(kot_id):
+    return f"pos_restaurant_kitchen_pipeline::{frappe.local.site}::{kot_id}"
+
+def run_kitchen_pipeline(kot_id):
+    """
+    Create the KDS and Kitchen Station entries for a KOT
+
+    Safe to run more than once for the same KOT: the KOT row is locked for
+    the duration, a KDS is only created when none exists (its name is
+    derived from the KOT, so a second one cannot be inserted) and Kitchen
+    Station rows are only created once.
+    """
+    from pos_restaurant_itb.api.kds_handler import create_kds_from_kot
+    from pos_restaurant_itb.api.kitchen_station import create_kitchen_station_items_from_kot
+
+    if get_kitchen_pipeline_mode() == QUEUE:
+        # Serialize concurrent runs for the same KOT (job retry vs. sweeper)
+        frappe.db.sql(
+            "SELECT name FROM `tabKitchen Order Ticket` WHERE name = %s FOR UPDATE",
+            (kot_id,)
+        )
+
+    create_kds_from_kot(kot_id)
+
+    if not frappe.db.exists("Kitchen Station", {"kot": kot_id}):
+        create_kitchen_station_items_from_kot(kot_id)
+
+def enqueue_missing_kitchen_pipelines():
+    """
+    Scheduler job: re-enqueue the pipeline for recent KOTs that have no KDS
+
+    This backs the queue mode guarantee that every KOT eventually gets
+    exactly one KDS, even if a job was lost or failed.
+    """
+    if get_kitchen_pipeline_mode() != QUEUE:
+        return
+
+    now = now_datetime()
+    missing = frappe.db.sql("""
+        SELECT kot.name
+        FROM `tabKitchen Order Ticket` kot
+        INNER JOIN `tabBranch` branch ON branch.name = kot.branch
+        LEFT JOIN `tabKitchen Display Order` kds ON kds.name = CONCAT('KDS-', kot.name)
+        WHERE kds.name IS NULL
+        AND branch.is_active = 1
+        AND kot.creation BETWEEN %s AND %s
+    """, (add_to_date(now, days=-1), add_to_date(now, minutes=-2)), pluck=True)
+
+    for kot_id in missing:
+        enqueue_kitchen_pipeline(kot_id)
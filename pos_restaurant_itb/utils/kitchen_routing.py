@@ -1,7 +1,13 @@
 # File: pos_restaurant_itb/utils/kitchen_routing.py
 
+from bisect import bisect_right
+
 import frappe
 from frappe import _
+from pos_restaurant_itb.utils.cache import delete_cache
+
+ROUTING_INDEX_CACHE_KEY = "pos_restaurant_kitchen_routing_index"
+STATION_PRINTERS_CACHE_KEY = "pos_restaurant_station_printers"
 
 def get_kitchen_stations_for_item(item_code, branch):
     """
@@ -18,56 +24,216 @@ def get_kitchen_stations_for_item(item_code, branch):
         return []
     
     # Get the item group for this item
-    item_group = frappe.db.get_value("Item", item_code, "item_group")
+    item_group = frappe.get_cached_value("Item", item_code, "item_group")
     if not item_group:
         return []
     
-    # Find active kitchen stations for this branch
-    stations = []
-    
-    # First find stations that handle all item groups
-    all_item_stations = frappe.get_all(
-        "Kitchen Station Setup",
-        filters={
-            "branch": branch,
-            "is_active": 1,
-            "allow_all_item_groups": 1
-        },
-        fields=["name", "station_name"]
-    )
-    stations.extend([s.name for s in all_item_stations])
-    
-    # Then find stations that specifically handle this item group
-    primary_group_stations = frappe.get_all(
-        "Kitchen Station Setup",
-        filters={
-            "branch": branch,
-            "is_active": 1,
-            "item_group": item_group
-        },
-        fields=["name", "station_name"]
+    return get_kitchen_stations_for_item_group(item_group, branch)
+
+def get_kitchen_stations_for_items(item_codes, branch):
+    """
+    Routes every line of a ticket in one pass.
+    
+    Item group positions for all lines are read with one query and
+    stations come from the cached routing index, so the query count does
+    not grow with the number of lines.
+    
+    Args:
+        item_codes: One entry per ticket line, either an item code or a row
+            with an item_code attribute (e.g. KOT Item); duplicates allowed
+        branch: The branch where the order is placed
+        
+    Returns:
+        Dict of kitchen station name -> list of the lines it should prepare,
+        in ticket order. Lines no station handles are left out.
+    """
+    if not item_codes or not branch:
+        return {}
+    
+    codes = [line if isinstance(line, str) else line.item_code for line in item_codes]
+    positions = get_item_group_positions(codes)
+    index = get_routing_index(branch)
+    
+    lines_by_station = {}
+    for line, item_code in zip(item_codes, codes):
+        if item_code not in positions:
+            continue
+        for station in lookup_stations(index, positions[item_code]):
+            lines_by_station.setdefault(station, []).append(line)
+    
+    return lines_by_station
+
+def get_item_groups(item_codes):
+    """
+    Map item codes to their item group with a single query
+    """
+    if not item_codes:
+        return {}
+    
+    return dict(frappe.get_all(
+        "Item",
+        filters={"name": ["in", list(set(item_codes))]},
+        fields=["name", "item_group"],
+        as_list=True
+    ))
+
+def get_item_group_positions(item_codes):
+    """
+    Map item codes to the nested-set `lft` of their item group with a
+    single query
+
+    Items without an item group are left out; an item whose group is
+    missing from the tree maps to None.
+    """
+    if not item_codes:
+        return {}
+    
+    return dict(frappe.db.sql("""
+        SELECT i.name, ig.lft
+        FROM `tabItem` i
+        LEFT JOIN `tabItem Group` ig ON ig.name = i.item_group
+        WHERE i.name IN %s
+        AND IFNULL(i.item_group, '') != ''
+    """, (tuple(set(item_codes)),)))
+
+def get_item_group_lfts(item_groups):
+    """
+    Map item groups to their nested-set `lft` with a single query
+
+    Read from the database, not the document cache: rebuilding the tree
+    renumbers other groups with direct updates that leave their cached
+    documents stale.
+    """
+    item_groups = {group for group in item_groups if group}
+    if not item_groups:
+        return {}
+    
+    return dict(frappe.db.sql("""
+        SELECT name, lft
+        FROM `tabItem Group`
+        WHERE name IN %s
+    """, (tuple(item_groups),)))
+
+def get_kitchen_stations_for_item_group(item_group, branch):
+    """
+    Looks up the stations for an item group in the branch routing index
+    
+    A station configured for a group also handles every descendant of
+    that group in the Item Group tree.
+    
+    Returns:
+        List of kitchen station names: stations handling all item groups
+        first, then stations whose primary group is this group or one of
+        its ancestors, then stations with it in their additional groups
+    """
+    index = get_routing_index(branch)
+    lft = get_item_group_lfts([item_group]).get(item_group)
+    return list(lookup_stations(index, lft))
+
+def lookup_stations(index, lft):
+    """
+    Finds the ordered station list for an item group position
+
+    Binary search over the segment boundaries of the routing index.
+
+    Args:
+        index: Routing index from get_routing_index
+        lft: Nested-set `lft` of the item group, or None
+
+    Returns:
+        List of kitchen station names (shared with the index, do not modify)
+    """
+    if lft is None:
+        return index["all"]
+    
+    i = bisect_right(index["bounds"], lft) - 1
+    if 0 <= i < len(index["segments"]):
+        return index["segments"][i]
+    return index["all"]
+
+def get_routing_index(branch):
+    """
+    Returns the routing index for a branch from the shared cache,
+    building it on first use
+    """
+    return frappe.cache().hget(
+        ROUTING_INDEX_CACHE_KEY, branch, generator=lambda: build_routing_index(branch)
     )
-    stations.extend([s.name for s in primary_group_stations if s.name not in stations])
+
+def build_routing_index(branch):
+    """
+    Builds the interval index of item group ranges -> ordered station list
+    for a branch with a single query
+    
+    Every configured item group covers its nested-set range [lft, rgt],
+    i.e. the group and all of its descendants. The range ends split the
+    tree into elementary segments, and each segment gets the full ordered
+    station list of the ranges covering it, so a lookup is one bisect.
     
-    # Finally, check stations that have this item group as an additional group
-    additional_group_stations = frappe.db.sql("""
-        SELECT p.name, p.station_name 
+    Returns:
+        Dict with "all" (stations that take every item group), "bounds"
+        (sorted segment start positions) and "segments" (ordered station
+        list for each segment, segments[i] covering
+        bounds[i] <= lft < bounds[i + 1])
+    """
+    rows = frappe.db.sql("""
+        SELECT p.name, p.allow_all_item_groups,
+            pg.lft AS primary_lft, pg.rgt AS primary_rgt,
+            ag.lft AS additional_lft, ag.rgt AS additional_rgt
         FROM `tabKitchen Station Setup` p
-        INNER JOIN `tabKitchen Station Item Group` c ON c.parent = p.name
+        LEFT JOIN `tabItem Group` pg ON pg.name = p.item_group
+        LEFT JOIN `tabKitchen Station Item Group` c
+            ON c.parent = p.name AND c.parenttype = 'Kitchen Station Setup'
+        LEFT JOIN `tabItem Group` ag ON ag.name = c.item_group
         WHERE p.branch = %s
         AND p.is_active = 1
-        AND c.item_group = %s
-        AND p.name NOT IN %s
-    """, (branch, item_group, stations or ["***"]), as_dict=1)
+        ORDER BY p.modified DESC, c.idx ASC
+    """, (branch,), as_dict=1)
+    
+    all_item_stations = []
+    primary = []
+    additional = []
+    for row in rows:
+        if row.allow_all_item_groups and row.name not in all_item_stations:
+            all_item_stations.append(row.name)
+        if row.primary_lft is not None and (row.primary_lft, row.primary_rgt, row.name) not in primary:
+            primary.append((row.primary_lft, row.primary_rgt, row.name))
+        if row.additional_lft is not None:
+            additional.append((row.additional_lft, row.additional_rgt, row.name))
     
-    stations.extend([s.name for s in additional_group_stations if s.name not in stations])
+    bounds = sorted({lft for lft, rgt, station in primary + additional}
+        | {rgt + 1 for lft, rgt, station in primary + additional})
     
-    return stations
+    segments = []
+    for position in bounds[:-1]:
+        stations = list(all_item_stations)
+        for ranges in (primary, additional):
+            stations.extend(
+                station for lft, rgt, station in ranges
+                if lft <= position <= rgt and station not in stations
+            )
+        segments.append(stations)
+    
+    return {"all": all_item_stations, "bounds": bounds, "segments": segments}
+
+def clear_routing_index(doc=None, method=None, *args):
+    """
+    Drops the cached routing index of every branch, now and after commit
+
+    Called when a Kitchen Station Setup (with its item group rows) is
+    saved, renamed or deleted, and when an Item Group is saved or deleted
+    (which renumbers the lft/rgt ranges); a station can move between
+    branches, so all branches are rebuilt lazily.
+    """
+    delete_cache(ROUTING_INDEX_CACHE_KEY)
 
 def get_printers_for_kitchen_station(station_name):
     """
     Gets the list of printers assigned to a kitchen station
     
+    Resolved lists are cached per station, so printing a ticket does not
+    read the database to find its printers.
+    
     Args:
         station_name: The name of the kitchen station
         
@@ -77,36 +243,72 @@ def get_printers_for_kitchen_station(station_name):
     if not station_name:
         return []
     
+    printers = frappe.cache().hget(
+        STATION_PRINTERS_CACHE_KEY, station_name,
+        generator=lambda: build_printers_for_kitchen_station(station_name)
+    )
+    # Callers may modify the entries, keep the cached list intact
+    return [dict(printer) for printer in printers]
+
+def build_printers_for_kitchen_station(station_name):
+    """
+    Resolves the printer list of a station: the default printer first,
+    then the assigned printers, each with its print format (falling back
+    to the station's print format)
+    """
+    if not frappe.db.exists("Kitchen Station Setup", station_name):
+        return []
+    
     station = frappe.get_doc("Kitchen Station Setup", station_name)
-    printers = []
     
-    # Add the default printer first, if specified
+    printer_names = [p.printer for p in station.assigned_printers or []]
     if station.default_printer:
-        printer_doc = frappe.get_doc("Printer Mapping POS Restaurant", station.default_printer)
-        printers.append({
+        printer_names.append(station.default_printer)
+    
+    printer_docs = {
+        printer.name: printer
+        for printer in frappe.get_all(
+            "Printer Mapping POS Restaurant",
+            filters={"name": ["in", list(set(printer_names))]},
+            fields=["name", "printer_type", "ip_address", "port"]
+        )
+    } if printer_names else {}
+    
+    def resolve(printer_name, print_format, is_default):
+        printer_doc = printer_docs.get(printer_name)
+        if not printer_doc:
+            return None
+        is_network = printer_doc.printer_type == "Network"
+        return {
             "printer_name": printer_doc.name,
             "printer_type": printer_doc.printer_type,
-            "ip_address": printer_doc.ip_address if printer_doc.printer_type == "Network" else None,
-            "port": printer_doc.port if printer_doc.printer_type == "Network" else None,
-            "print_format": station.print_format,
-            "is_default": 1
-        })
+            "ip_address": printer_doc.ip_address if is_network else None,
+            "port": printer_doc.port if is_network else None,
+            "print_format": print_format,
+            "is_default": is_default
+        }
+    
+    printers = []
+    
+    # Add the default printer first, if specified
+    if station.default_printer:
+        printers.append(resolve(station.default_printer, station.print_format, 1))
     
     # Add assigned printers
-    if station.assigned_printers:
-        for p in station.assigned_printers:
-            # Skip if it's the same as default printer
-            if station.default_printer and p.printer == station.default_printer:
-                continue
-                
-            printer_doc = frappe.get_doc("Printer Mapping POS Restaurant", p.printer)
-            printers.append({
-                "printer_name": printer_doc.name,
-                "printer_type": printer_doc.printer_type,
-                "ip_address": printer_doc.ip_address if printer_doc.printer_type == "Network" else None,
-                "port": printer_doc.port if printer_doc.printer_type == "Network" else None,
-                "print_format": p.print_format or station.print_format,
-                "is_default": p.is_default
-            })
-    
-    return printers
\ No newline at end of file
+    for p in station.assigned_printers or []:
+        # Skip if it's the same as default printer
+        if station.default_printer and p.printer == station.default_printer:
+            continue
+        printers.append(resolve(p.printer, p.print_format or station.print_format, p.is_default))
+    
+    return [printer for printer in printers if printer]
+
+def clear_station_printers(doc=None, method=None, *args):
+    """
+    Drops the cached printer lists of every station, now and after commit
+
+    Called when a Kitchen Station Setup or a Printer Mapping POS Restaurant
+    is saved, renamed or deleted; a printer mapping can be shared by many
+    stations.
+    """
+    delete_cache(STATION_PRINTERS_CACHE_KEY)
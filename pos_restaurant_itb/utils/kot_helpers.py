@@ -2,27 +2,174 @@
 
 import frappe
 import json
+from functools import lru_cache
+from frappe.utils import now_datetime
+from pos_restaurant_itb.utils.variants import encode_attributes, get_attributes_hash
 
 def get_attribute_summary(dynamic_attributes):
     """
     Converts dynamic_attributes in JSON format to a readable string
     This utility function can be used across multiple doctypes
+    
+    Rows store the result in their attribute_summary field when written
+    (see set_attribute_fields); JSON strings are parsed once per distinct
+    value for the remaining on-the-fly uses.
     """
     try:
         if not dynamic_attributes:
             return ""
             
         if isinstance(dynamic_attributes, str):
-            attrs = json.loads(dynamic_attributes or "[]")
-        else:
-            attrs = dynamic_attributes or []
+            return _summarize_attributes_json(dynamic_attributes)
             
-        attr_pairs = [
-            f"{attr.get('attribute_name')}: {attr.get('attribute_value')}" 
-            for attr in attrs 
-            if attr.get('attribute_name') and attr.get('attribute_value')
-        ]
-        return ", ".join(attr_pairs)
+        return _summarize_attributes(dynamic_attributes)
     except Exception as e:
         frappe.log_error(f"Error in get_attribute_summary: {str(e)}")
-        return ""
\ No newline at end of file
+        return ""
+
+@lru_cache(maxsize=1024)
+def _summarize_attributes_json(dynamic_attributes):
+    return _summarize_attributes(json.loads(dynamic_attributes or "[]"))
+
+def _summarize_attributes(attrs):
+    attr_pairs = [
+        f"{attr.get('attribute_name')}: {attr.get('attribute_value')}" 
+        for attr in attrs or [] 
+        if attr.get('attribute_name') and attr.get('attribute_value')
+    ]
+    return ", ".join(attr_pairs)
+
+def set_attribute_fields(row):
+    """
+    Normalizes a row's attribute JSON to the canonical encoding and stores
+    its summary and hash, for rows that use either dynamic_attributes or
+    variant_attributes
+
+    Identical selections then share the same attributes_hash, so they can
+    be matched and grouped on that indexed column without parsing JSON.
+    """
+    for fieldname in ("dynamic_attributes", "variant_attributes"):
+        if row.get(fieldname):
+            row.set(fieldname, encode_attributes(row.get(fieldname)))
+
+    attributes = row.get("dynamic_attributes") or row.get("variant_attributes")
+    row.attribute_summary = get_attribute_summary(attributes)
+    row.attributes_hash = get_attributes_hash(attributes)
+
+# Item-level kitchen statuses, in preparation order
+KITCHEN_STATUSES = ("Queued", "Cooking", "Ready", "Served", "Cancelled")
+
+# Status changes cooks and expo may make: forward through the preparation
+# order (skipping steps is fine, e.g. drinks go straight to Ready) or one
+# step back to undo a tap. Items can be cancelled until they are Ready;
+# a cancelled item stays cancelled.
+KITCHEN_STATUS_TRANSITIONS = {
+    "Queued": ("Cooking", "Ready", "Served", "Cancelled"),
+    "Cooking": ("Ready", "Served", "Queued", "Cancelled"),
+    "Ready": ("Served", "Cooking"),
+    "Served": ("Ready",),
+    "Cancelled": ()
+}
+
+def get_status_qty_field(status):
+    """
+    Returns the Kitchen Station counter field for a kitchen status,
+    e.g. "Cooking" -> "cooking_qty"
+    """
+    if status not in KITCHEN_STATUSES:
+        frappe.throw(frappe._("Invalid kitchen status: {0}").format(status))
+    return f"{status.lower()}_qty"
+
+def validate_kitchen_status_transition(from_status, to_status, name=None):
+    """
+    Throws unless an item may move from one kitchen status to another
+    """
+    if to_status not in KITCHEN_STATUS_TRANSITIONS.get(from_status, ()):
+        frappe.throw(frappe._("{0}: cannot change kitchen status from {1} to {2}.").format(
+            name or frappe._("Item"), from_status, to_status
+        ))
+
+def get_aggregate_unit_status(counts):
+    """
+    Derives a single kitchen status from per-status unit counts
+
+    Args:
+        counts: Dict of kitchen status -> number of units in that status
+
+    Returns:
+        "Cancelled" if every unit is cancelled, "Served" / "Ready" once all
+        remaining units reached that stage, "Cooking" as soon as any unit has
+        left the queue, otherwise "Queued"
+    """
+    active = sum(counts.get(s, 0) for s in KITCHEN_STATUSES if s != "Cancelled")
+    if not active:
+        return "Cancelled" if counts.get("Cancelled") else "Queued"
+
+    served = counts.get("Served", 0)
+    ready = counts.get("Ready", 0)
+    if served == active:
+        return "Served"
+    if ready + served == active:
+        return "Ready"
+    if counts.get("Cooking", 0) or ready or served:
+        return "Cooking"
+    return "Queued"
+
+def get_kds_counter_field(status):
+    """
+    Returns the Kitchen Display Order counter field for a kitchen status,
+    e.g. "Cooking" -> "cooking_items"
+    """
+    if status not in KITCHEN_STATUSES:
+        frappe.throw(frappe._("Invalid kitchen status: {0}").format(status))
+    return f"{status.lower()}_items"
+
+def get_item_kitchen_status(row):
+    """
+    The kitchen status a KOT Item row counts under: cancelled rows are
+    "Cancelled" whatever their kot_status
+    """
+    if row.get("cancelled"):
+        return "Cancelled"
+    return row.get("kot_status") or "Queued"
+
+def get_kds_status(counts):
+    """
+    Derives the Kitchen Display Order status from its item counts
+
+    Args:
+        counts: Dict of kitchen status -> number of items in that status
+
+    Returns:
+        "Served" / "Ready" once every item that is not cancelled reached
+        that stage, "In Progress" while any item is cooking, otherwise "New"
+    """
+    active = sum(counts.get(s, 0) for s in KITCHEN_STATUSES if s != "Cancelled")
+    if not active:
+        return "New"
+
+    served = counts.get("Served", 0)
+    if served == active:
+        return "Served"
+    if counts.get("Ready", 0) + served == active:
+        return "Ready"
+    if counts.get("Cooking", 0):
+        return "In Progress"
+    return "New"
+
+def mark_items_sent_to_kitchen(kot_name, row_names):
+    """
+    Flags POS Order Item rows as sent to kitchen with one set-based UPDATE
+
+    Args:
+        kot_name: The KOT the rows were sent with
+        row_names: Exact POS Order Item row names included in the KOT
+    """
+    if not row_names:
+        return
+
+    frappe.db.sql("""
+        UPDATE `tabPOS Order Item`
+        SET sent_to_kitchen = 1, kot_id = %s, modified = %s
+        WHERE name IN %s
+    """, (kot_name, now_datetime(), tuple(row_names)))
@@ -0,0 +1,146 @@
+# File: pos_restaurant_itb/utils/kot_printing.py
+
+import frappe
+from frappe.utils import cint, flt, format_datetime
+from pos_restaurant_itb.utils.escpos import DEFAULT_WIDTH, render_ticket
+from pos_restaurant_itb.utils.kitchen_routing import (
+    get_kitchen_stations_for_items,
+    get_printers_for_kitchen_station,
+)
+from pos_restaurant_itb.utils.print_spooler import PrintJob, get_spooler
+from pos_restaurant_itb.utils.settings import get_pos_setting
+
+DEFAULT_PRINTER_PORT = 9100
+
+def print_kot(kot):
+    """
+    Send a new KOT to the network printers of every station that has
+    `auto_print_new_orders` enabled
+
+    Tickets are rendered to ESC/POS now and handed to the print spooler
+    once the transaction commits; nothing is printed for a rolled back
+    KOT, and a slow or offline printer never delays the save.
+
+    Args:
+        kot: The Kitchen Order Ticket document
+    """
+    jobs = build_print_jobs(kot)
+    if jobs:
+        frappe.db.after_commit.add(lambda: submit_print_jobs(jobs))
+
+def build_print_jobs(kot):
+    """
+    Build one print job per auto-printing station of the KOT
+
+    A station whose print format cannot be rendered gets the default
+    layout, the error is logged.
+
+    Returns:
+        List of PrintJob, each listing the station's network printers with
+        the default printer first
+    """
+    items = [item for item in kot.kot_items if not item.cancelled]
+    jobs = []
+
+    for station, lines in get_kitchen_stations_for_items(items, kot.branch).items():
+        if not frappe.get_cached_value("Kitchen Station Setup", station, "auto_print_new_orders"):
+            continue
+
+        printers = [
+            p for p in get_printers_for_kitchen_station(station)
+            if p["printer_type"] == "Network" and p["ip_address"]
+        ]
+        if not printers:
+            continue
+
+        try:
+            data = render_kot_ticket(kot, station, lines, printers[0]["print_format"])
+        except Exception as e:
+            # A broken layout must never block the order, print the default one
+            frappe.log_error(
+                title=f"KOT Ticket Layout Error for {station}",
+                message=f"Error: {str(e)}\n\nTraceback: {frappe.get_traceback()}"
+            )
+            data = render_kot_ticket(kot, station, lines)
+
+        jobs.append(PrintJob(
+            data,
+            [(p["ip_address"], cint(p["port"]) or DEFAULT_PRINTER_PORT) for p in printers],
+            job_id=f"{kot.name}:{station}"
+        ))
+
+    return jobs
+
+def render_kot_ticket(kot, station, lines, print_format=None):
+    """
+    Render the ESC/POS ticket for one station
+
+    Args:
+        kot: The Kitchen Order Ticket document
+        station: Kitchen station name
+        lines: KOT Item rows routed to the station
+        print_format: The station's print format; its raw commands are
+            used as the ticket layout when it is a raw printing format
+
+    Returns:
+        Bytes ready to send to the printer
+    """
+    ticket = {
+        "station": frappe.get_cached_value("Kitchen Station Setup", station, "station_display_name") or station,
+        "kot": kot.name,
+        "order": kot.pos_order,
+        "table": kot.table,
+        "branch": kot.branch,
+        "waiter": kot.waiter,
+        "time": format_datetime(kot.kot_time, "HH:mm") if kot.kot_time else "",
+    }
+    items = [
+        {
+            "qty": flt(item.qty),
+            "item_code": item.item_code,
+            "item_name": item.item_name or item.item_code,
+            "attribute_summary": item.attribute_summary,
+            "note": item.note,
+        }
+        for item in lines
+    ]
+
+    return render_ticket(
+        ticket,
+        items,
+        source=get_layout_source(print_format),
+        width=cint(get_pos_setting("print_width", DEFAULT_WIDTH))
+    )
+
+def get_layout_source(print_format):
+    """
+    Returns the ESC/POS layout of a raw printing Print Format, or None for
+    the default layout
+
+    Compiled layouts are cached by their source, so editing the print
+    format takes effect on the next ticket.
+    """
+    if not print_format:
+        return None
+
+    raw_printing, raw_commands = frappe.get_cached_value(
+        "Print Format", print_format, ["raw_printing", "raw_commands"]
+    ) or (0, None)
+    return raw_commands if raw_printing else None
+
+def submit_print_jobs(jobs):
+    spooler = get_spooler(
+        attempts=cint(get_pos_setting("print_attempts", 3)),
+        timeout=flt(get_pos_setting("print_timeout", 5)),
+        on_failed=log_failed_print
+    )
+    for job in jobs:
+        spooler.submit(job)
+
+def log_failed_print(job):
+    """
+    Runs in the spooler thread, outside any request, so only logs to file
+    """
+    frappe.logger("pos_restaurant_itb.print").error(
+        f"Could not print {job.job_id} on {job.printers}: {job.errors[-1:]}"
+    )
@@ -1,5 +1,6 @@
 import frappe
 from frappe import _
+from pos_restaurant_itb.utils.doc_handoff import handoff
 
 def create_kot_from_pos_order(pos_order, method=None):
     """
@@ -27,7 +28,8 @@ def create_kot_from_pos_order(pos_order, method=None):
             "item_name": item.item_name,
             "qty": item.qty,
             "note": item.note,
-            "dynamic_attributes": item.dynamic_attributes
+            "dynamic_attributes": item.dynamic_attributes,
+            "pos_order_item": item.name
         })
     
     # Save and submit KOT
@@ -42,6 +44,9 @@ def process_pos_order_after_insert(doc, method=None):
     Process a POS Order after insert:
     1. Create Kitchen Order Ticket for items
     2. This will trigger creation of KDS and Kitchen Station via other hooks
+
+    Errors are logged and raised again, so the order and its kitchen chain
+    are rolled back together.
     
     Args:
         doc: The POS Order document
@@ -62,9 +67,10 @@ def process_pos_order_after_insert(doc, method=None):
         if not branch_is_active:
             frappe.throw(_("Cannot create kitchen orders for inactive branch."))
             
-        # Import and call KOT creation function
+        # Import and call KOT creation function, passing down the order already in memory
         from pos_restaurant_itb.api.create_kot import create_kot_from_pos_order
-        result = create_kot_from_pos_order(doc.name)
+        with handoff(doc):
+            result = create_kot_from_pos_order(doc.name)
         
         if result.get("status") == "success":
             # Log success message
@@ -74,15 +80,11 @@ def process_pos_order_after_insert(doc, method=None):
             
             # We don't need to trigger KDS and Kitchen Station creation explicitly
             # as they will be triggered by the KOT's after_insert hooks
-        
-        elif result.get("status") == "error":
-            frappe.msgprint(result.get("message"), indicator="red", alert=True)
             
     except Exception as e:
         frappe.log_error(
             title=f"Error Processing POS Order {doc.name}",
             message=f"Error: {str(e)}\n\nTraceback: {frappe.get_traceback()}"
         )
-        frappe.msgprint(_(
-            "Error processing order for kitchen: {0}"
-        ).format(str(e)), indicator="red", alert=True)
\ No newline at end of file
+        # Abort the order save too, so no half-built kitchen chain is committed
+        raise
@@ -0,0 +1,272 @@
+# File: pos_restaurant_itb/utils/print_spooler.py
+
+"""
+Asynchronous network print spooler
+
+Rendered tickets are queued per printer and sent over persistent TCP
+connections by an asyncio event loop running in a daemon thread, so a slow
+or offline printer never holds up the code that submitted the ticket.
+
+Each printer address has its own queue and worker: tickets for one printer
+print in submission order and a stalled printer only delays its own queue.
+A send is retried with exponential backoff; when a printer keeps failing
+the ticket moves on to the next printer of the job.
+
+This module does not depend on Frappe; see utils/kot_printing.py for the
+glue that builds jobs from KOTs.
+"""
+
+import asyncio
+import atexit
+import threading
+
+DEFAULT_ATTEMPTS = 3
+DEFAULT_TIMEOUT = 5.0
+DEFAULT_BACKOFF = 0.5
+
+class PrintJob:
+    """
+    A rendered ticket and the printers that may print it
+
+    Args:
+        data: Bytes to send to the printer
+        printers: (host, port) addresses in order of preference; later
+            ones are used when the earlier ones fail
+        job_id: Optional identifier for logging
+    """
+    def __init__(self, data, printers, job_id=None):
+        if not printers:
+            raise ValueError("A print job needs at least one printer")
+
+        self.data = bytes(data)
+        self.printers = list(dict.fromkeys((host, int(port)) for host, port in printers))
+        self.job_id = job_id
+        self.printed_on = None
+        self.errors = []
+        self.done = threading.Event()
+
+    @property
+    def failed(self):
+        return self.done.is_set() and self.printed_on is None
+
+class PrinterConnectionPool:
+    """
+    Persistent TCP connections, one per printer address
+
+    A connection is opened on first use and kept for later tickets; it is
+    dropped after any send error so the next attempt reconnects.
+    """
+    def __init__(self, timeout=DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        self._connections = {}
+
+    async def send(self, address, data):
+        writer = await self._get_writer(address)
+        try:
+            writer.write(data)
+            await asyncio.wait_for(writer.drain(), self.timeout)
+        except BaseException:
+            await self.discard(address)
+            raise
+
+    async def discard(self, address):
+        connection = self._connections.pop(address, None)
+        if connection:
+            await self._close(connection[1])
+
+    async def close(self):
+        for address in list(self._connections):
+            await self.discard(address)
+
+    async def _get_writer(self, address):
+        connection = self._connections.get(address)
+        if connection:
+            reader, writer = connection
+            # The printer closed its end since the last ticket
+            if not writer.is_closing() and not reader.at_eof():
+                return writer
+            await self.discard(address)
+
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(*address), self.timeout)
+        self._connections[address] = (reader, writer)
+        return writer
+
+    async def _close(self, writer):
+        writer.close()
+        try:
+            await asyncio.wait_for(writer.wait_closed(), self.timeout)
+        except (OSError, asyncio.TimeoutError):
+            pass
+
+class PrintSpooler:
+    """
+    Per-printer ticket queues served by a background event loop
+
+    Args:
+        attempts: Sends per printer before failing over to the next one
+        timeout: Seconds allowed to connect to or write to a printer
+        backoff: Delay before the first retry, doubled on every retry
+        on_failed: Optional callable(job) run (in the spooler thread) when
+            no printer of a job could print it
+    """
+    def __init__(self, attempts=DEFAULT_ATTEMPTS, timeout=DEFAULT_TIMEOUT,
+                 backoff=DEFAULT_BACKOFF, on_failed=None):
+        self.attempts = max(int(attempts), 1)
+        self.backoff = backoff
+        self.on_failed = on_failed
+        self.pool = PrinterConnectionPool(timeout)
+
+        self._loop = None
+        self._thread = None
+        self._queues = {}
+        self._workers = []
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def submit(self, job):
+        """
+        Queue a job and return immediately; job.done is set once it has
+        been printed or has failed on every printer
+        """
+        self._start()
+        self._loop.call_soon_threadsafe(self._enqueue, job.printers[0], job)
+        return job
+
+    def stop(self, timeout=DEFAULT_TIMEOUT, drain=False):
+        """
+        Stop the event loop and close all printer connections
+
+        With drain, queued jobs get up to timeout seconds to print first.
+        Jobs that were not printed then fail: on_failed runs for each of
+        them, so no ticket is dropped silently.
+        """
+        with self._lock:
+            if not self._loop:
+                return
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+
+        drain_timeout = timeout if drain else 0
+        asyncio.run_coroutine_threadsafe(self._shutdown(drain_timeout), loop).result(
+            timeout + drain_timeout
+        )
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        loop.close()
+
+    def _start(self):
+        with self._lock:
+            if self._loop:
+                return
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(
+                target=self._loop.run_forever, name="pos-print-spooler", daemon=True
+            )
+            self._thread.start()
+
+    def _enqueue(self, address, job):
+        self._pending.add(job)
+        queue = self._queues.get(address)
+        if queue is None:
+            queue = self._queues[address] = asyncio.Queue()
+            self._workers.append(self._loop.create_task(self._worker(address, queue)))
+        queue.put_nowait(job)
+
+    async def _worker(self, address, queue):
+        while True:
+            job = await queue.get()
+            try:
+                await self._print(address, job)
+            except Exception as e:
+                # Keep the worker alive whatever happens to one ticket
+                job.errors.append((address, e))
+                self._finish(job)
+            finally:
+                queue.task_done()
+
+    async def _print(self, address, job):
+        for attempt in range(self.attempts):
+            try:
+                await self.pool.send(address, job.data)
+            except (OSError, asyncio.TimeoutError) as e:
+                job.errors.append((address, e))
+                if attempt + 1 < self.attempts:
+                    await asyncio.sleep(self.backoff * 2 ** attempt)
+            else:
+                job.printed_on = address
+                self._finish(job)
+                return
+
+        # Fail over to the next printer of the job
+        position = job.printers.index(address)
+        if position + 1 < len(job.printers):
+            self._enqueue(job.printers[position + 1], job)
+        else:
+            self._finish(job)
+
+    def _finish(self, job):
+        self._pending.discard(job)
+        try:
+            if job.printed_on is None and self.on_failed:
+                self.on_failed(job)
+        finally:
+            job.done.set()
+
+    async def _shutdown(self, drain_timeout=0):
+        if drain_timeout:
+            try:
+                await asyncio.wait_for(self._drained(), drain_timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queues = {}
+
+        for job in list(self._pending):
+            job.errors.append((None, RuntimeError("Print spooler stopped before the job was printed")))
+            self._finish(job)
+        await self.pool.close()
+
+    async def _drained(self):
+        while self._pending:
+            await asyncio.sleep(0.05)
+
+_spooler = None
+_spooler_config = None
+_spooler_lock = threading.Lock()
+
+def get_spooler(**kwargs):
+    """
+    Returns the process-wide spooler, created with kwargs on first use
+
+    When kwargs differ from the ones the spooler was built with (e.g. a
+    changed site config), a new spooler takes over; the old one finishes
+    its queued jobs in the background and stops.
+    """
+    global _spooler, _spooler_config
+    with _spooler_lock:
+        if _spooler is not None and kwargs != _spooler_config:
+            threading.Thread(
+                target=_spooler.stop, kwargs={"drain": True},
+                name="pos-print-spooler-stop", daemon=True
+            ).start()
+            _spooler = None
+        if _spooler is None:
+            _spooler = PrintSpooler(**kwargs)
+            _spooler_config = kwargs
+        return _spooler
+
+@atexit.register
+def stop_spooler():
+    """
+    Stops the process-wide spooler, giving queued jobs a moment to print;
+    the ones left unprinted are reported through on_failed
+    """
+    global _spooler, _spooler_config
+    with _spooler_lock:
+        spooler, _spooler, _spooler_config = _spooler, None, None
+    if spooler:
+        spooler.stop(drain=True)
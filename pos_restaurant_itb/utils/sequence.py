@@ -0,0 +1,171 @@
+# File: pos_restaurant_itb/utils/sequence.py
+
+import threading
+
+import frappe
+from frappe.utils import cint, now_datetime
+from pos_restaurant_itb.utils.settings import get_pos_setting
+
+SEQUENCE_DOCTYPE = "POS Sequence"
+
+# Number blocks handed to this worker process, keyed by (site, sequence key).
+# Each block is {"next": int, "end": int, "owner": thread ident or None}.
+# A block is only shared with other threads once the transaction that
+# reserved it has committed; until then only the reserving thread uses it,
+# so a rollback can never leave numbers in use that the database gave back.
+_blocks = {}
+_blocks_lock = threading.Lock()
+
+
+def get_sequence_key(reference_doctype, branch_code, date_str):
+    """
+    Build the name of the POS Sequence row for a (doctype, branch, date) key
+    """
+    return f"{reference_doctype}-{branch_code}-{date_str}"
+
+
+def get_sequence_block_size():
+    """
+    Numbers reserved per round trip to the sequence store.
+
+    1 (default) keeps numbering strictly gapless and ordered. Larger values
+    let each worker hand out IDs from memory, at the cost of gaps and
+    out-of-order IDs between workers.
+    """
+    return max(cint(get_pos_setting("sequence_block_size", 1)), 1)
+
+
+def next_sequence(reference_doctype, branch_code, date_str, legacy_prefix=None):
+    """
+    Return the next number for a (doctype, branch, date) key.
+
+    The number comes from the POS Sequence store with an atomic increment,
+    so concurrent workers never receive the same value and no table scan
+    is needed.
+
+    Args:
+        reference_doctype: DocType the number is generated for
+        branch_code: Branch code used in the generated ID
+        date_str: Date part of the generated ID (YYYYMMDD)
+        legacy_prefix: Name prefix used by documents created before the
+            sequence store existed; only read once to seed a new key
+
+    Returns:
+        The allocated number as int
+    """
+    block_size = get_sequence_block_size()
+    if block_size == 1:
+        return _reserve(reference_doctype, branch_code, date_str, 1, legacy_prefix)
+
+    block_key = (frappe.local.site, get_sequence_key(reference_doctype, branch_code, date_str))
+    thread_id = threading.get_ident()
+
+    with _blocks_lock:
+        block = _blocks.get(block_key)
+        if block and block["next"] <= block["end"] and block["owner"] in (None, thread_id):
+            number = block["next"]
+            block["next"] += 1
+            return number
+
+    end = _reserve(reference_doctype, branch_code, date_str, block_size, legacy_prefix)
+    start = end - block_size + 1
+    block = {"next": start + 1, "end": end, "owner": thread_id}
+
+    with _blocks_lock:
+        _blocks[block_key] = block
+
+    def release_block():
+        block["owner"] = None
+
+    def discard_block():
+        with _blocks_lock:
+            if _blocks.get(block_key) is block:
+                del _blocks[block_key]
+
+    frappe.db.after_commit.add(release_block)
+    frappe.db.after_rollback.add(discard_block)
+
+    return start
+
+
+def reserve_sequence(reference_doctype, branch_code, date_str, count, legacy_prefix=None):
+    """
+    Reserve `count` consecutive numbers for a (doctype, branch, date) key
+    in one round trip, for callers that create many documents at once
+
+    Returns:
+        range of the reserved numbers
+    """
+    end = _reserve(reference_doctype, branch_code, date_str, count, legacy_prefix)
+    return range(end - count + 1, end + 1)
+
+
+def _reserve(reference_doctype, branch_code, date_str, count, legacy_prefix=None):
+    """
+    Atomically advance a sequence by `count` and return the new high-water mark.
+
+    LAST_INSERT_ID(expr) hands the incremented value back on this connection
+    only, so the read and the write are a single statement.
+    """
+    key = get_sequence_key(reference_doctype, branch_code, date_str)
+
+    if not frappe.db.exists(SEQUENCE_DOCTYPE, key):
+        seed = _get_legacy_seed(reference_doctype, legacy_prefix) if legacy_prefix else 0
+        timestamp = now_datetime()
+        frappe.db.sql(
+            """INSERT IGNORE INTO `tabPOS Sequence`
+               (name, creation, modified, modified_by, owner,
+                reference_doctype, branch_code, sequence_date, current)
+               VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+            (key, timestamp, timestamp, "Administrator", "Administrator",
+             reference_doctype, branch_code, date_str, seed)
+        )
+
+    frappe.db.sql(
+        """UPDATE `tabPOS Sequence`
+           SET current = LAST_INSERT_ID(current + %s)
+           WHERE name = %s""",
+        (count, key)
+    )
+    return cint(frappe.db.sql("SELECT LAST_INSERT_ID()")[0][0])
+
+
+def _get_legacy_seed(reference_doctype, prefix):
+    """
+    Highest number already used under `prefix`, so keys created while
+    documents for the same day exist continue after them
+    """
+    last = frappe.db.sql(
+        f"""SELECT name FROM `tab{reference_doctype}`
+            WHERE name LIKE %s
+            ORDER BY name DESC LIMIT 1""",
+        (prefix + "-%",)
+    )
+    return cint(last[0][0].split("-")[-1]) if last else 0
+
+
+def reserve_naming_series(prefix, count):
+    """
+    Reserve `count` consecutive numbers from Frappe's own naming series.
+
+    Doctypes named with a `PREFIX.####` series draw from the `tabSeries`
+    row for PREFIX; reserving a range there lets bulk writers assign names
+    up front that never collide with documents inserted one by one.
+
+    Args:
+        prefix: Series key, e.g. "KS-"
+        count: How many numbers to reserve
+
+    Returns:
+        range of the reserved numbers
+    """
+    frappe.db.sql(
+        "INSERT IGNORE INTO `tabSeries` (name, current) VALUES (%s, 0)",
+        (prefix,)
+    )
+    frappe.db.sql(
+        "UPDATE `tabSeries` SET current = LAST_INSERT_ID(current + %s) WHERE name = %s",
+        (count, prefix)
+    )
+    end = cint(frappe.db.sql("SELECT LAST_INSERT_ID()")[0][0])
+    return range(end - count + 1, end + 1)
@@ -0,0 +1,24 @@
+# File: pos_restaurant_itb/utils/settings.py
+
+import frappe
+
+CONF_PREFIX = "pos_restaurant_"
+
+
+def get_pos_setting(key, default=None):
+    """
+    Read an operational setting for this app from site_config.json
+
+    Settings are stored with the `pos_restaurant_` prefix, e.g.
+    `pos_restaurant_sequence_block_size`, so they can be tuned per site
+    with `bench --site <site> set-config` without a migration.
+
+    Args:
+        key: Setting name without the prefix
+        default: Value returned when the setting is not configured
+
+    Returns:
+        The configured value or the default
+    """
+    value = frappe.conf.get(f"{CONF_PREFIX}{key}")
+    return default if value is None else value
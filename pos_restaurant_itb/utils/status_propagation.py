@@ -0,0 +1,609 @@
+# File: pos_restaurant_itb/utils/status_propagation.py
+
+"""
+Kitchen status propagation
+
+Status flows up one chain:
+
+    Kitchen Station rows -> KOT line (the KOT Item on the KOT and its copy
+    on the KDS) -> Kitchen Display Order -> Kitchen Order Ticket -> POS Order
+
+A batch of leaf changes is rolled up one level at a time: every ancestor
+the batch touches is computed in memory and written at most once, with
+direct UPDATEs (no document save, no Version). Nothing is committed here.
+
+While a batch runs, is_propagating() is true and document hooks that
+would start a propagation of their own (KDS and Kitchen Station
+on_update) skip it, so a write never loops back through the chain.
+"""
+
+from contextlib import contextmanager
+
+import frappe
+from frappe import _
+from frappe.utils import cint, now_datetime
+from pos_restaurant_itb.utils.kds_realtime import (
+    publish_kds_items,
+    publish_kds_status,
+    publish_kitchen_station_rows,
+)
+from pos_restaurant_itb.utils.kot_helpers import (
+    KITCHEN_STATUSES,
+    KITCHEN_STATUS_TRANSITIONS,
+    get_aggregate_unit_status,
+    get_item_kitchen_status,
+    get_kds_counter_field,
+    get_kds_status,
+    get_status_qty_field,
+    validate_kitchen_status_transition,
+)
+
+COUNTER_FIELDS = [get_status_qty_field(status) for status in KITCHEN_STATUSES]
+KDS_COUNTER_FIELDS = [get_kds_counter_field(status) for status in KITCHEN_STATUSES]
+
+# KOT statuses that need nothing more from the kitchen
+KOT_DONE_STATUSES = ("Ready", "Served")
+
+# POS Order statuses that follow the kitchen; a Ready for Billing order
+# goes back to In Progress when kitchen work reopens
+OPEN_POS_ORDER_STATUSES = ("Draft", "In Progress", "Ready for Billing")
+
+@contextmanager
+def propagating():
+    """
+    Marks the code inside as part of a propagation, see is_propagating
+    """
+    frappe.local.status_propagation_depth = getattr(frappe.local, "status_propagation_depth", 0) + 1
+    try:
+        yield
+    finally:
+        frappe.local.status_propagation_depth -= 1
+
+def is_propagating():
+    """
+    True while a propagation runs; hooks must not start another one
+    """
+    return getattr(frappe.local, "status_propagation_depth", 0) > 0
+
+def move_kitchen_station_rows(names, to_status, from_status=None):
+    """
+    Move Kitchen Station rows to a status and propagate up the chain
+
+    Rows already in the target status are left alone. Per-line rows move
+    their units in from_status, or by default every unit in an earlier
+    status that may move to the target.
+
+    Returns:
+        Propagation result (see propagate_lines) with "updated", the
+        number of rows changed
+    """
+    with propagating():
+        updated, source_items = set_kitchen_station_statuses(names, to_status, from_status)
+        result = propagate_lines(get_line_statuses(source_items))
+
+    result["updated"] = updated
+    return result
+
+def move_kot_items(names, to_status, from_status=None):
+    """
+    Move KOT Items (KOT rows or their KDS copies) to a status, with the
+    Kitchen Station rows of their lines, and propagate up the chain
+
+    Returns:
+        Propagation result (see propagate_lines) with "updated", the
+        number of KOT lines changed
+    """
+    with propagating():
+        line_statuses = get_kot_item_targets(names, to_status, from_status)
+        set_kitchen_station_rows_for_lines(line_statuses)
+        result = propagate_lines(line_statuses)
+
+    result["updated"] = len(line_statuses)
+    return result
+
+def propagate_kitchen_station_changes(source_items):
+    """
+    Propagate Kitchen Station rows that were changed outside of a batch
+    (a unit move, a saved document)
+
+    Args:
+        source_items: KOT Item rows whose Kitchen Station rows changed
+    """
+    source_items = {name for name in source_items if name}
+    if is_propagating() or not source_items:
+        return
+
+    with propagating():
+        return propagate_lines(get_line_statuses(source_items))
+
+def propagate_kds_item_changes(kds_changes):
+    """
+    Apply item count changes to Kitchen Display Orders and propagate their
+    new statuses
+
+    Args:
+        kds_changes: Dict of KDS name -> {kitchen status: change in its
+            item count}; an empty dict only recomputes the status
+    """
+    with propagating():
+        kds_statuses, kot_statuses = set_kds_statuses(kds_changes)
+        result = propagate_kot_statuses(kot_statuses)
+
+    result["kds"] = kds_statuses
+    return result
+
+def propagate_kds_status(kds):
+    """
+    Carry the status of a saved Kitchen Display Order to its KOT and
+    POS Order
+    """
+    if is_propagating() or not kds.kot_id:
+        return
+
+    with propagating():
+        return propagate_kot_statuses({kds.kot_id: kds.status})
+
+def propagate_lines(line_statuses):
+    """
+    Write new KOT line statuses and everything above them
+
+    Args:
+        line_statuses: Dict of KOT Item row (on the KOT) -> kitchen status
+
+    Returns:
+        Dict with "kds" (KDS name -> status), "kot" and "pos_order" (name
+        -> new status, for the ones that changed)
+    """
+    kds_statuses, kot_statuses = set_kds_statuses(set_line_statuses(line_statuses))
+    result = propagate_kot_statuses(kot_statuses)
+    result["kds"] = kds_statuses
+    return result
+
+def propagate_kot_statuses(kot_statuses):
+    """
+    Write KOT statuses and the POS Order statuses that follow from them
+    """
+    kot_changes, pos_orders = set_kot_statuses(kot_statuses)
+    return {"kot": kot_changes, "pos_order": set_pos_order_statuses(pos_orders)}
+
+def set_kitchen_station_statuses(names, to_status, from_status=None):
+    """
+    Move Kitchen Station rows to a status with set-based updates
+
+    Returns:
+        Tuple of (number of rows changed, set of the KOT Item rows they
+        prepare)
+    """
+    rows = frappe.db.sql(
+        f"""SELECT name, kot_item, source_kot_item, branch, item_group, status, qty,
+                {", ".join(COUNTER_FIELDS)}
+            FROM `tabKitchen Station`
+            WHERE name IN %s
+            FOR UPDATE""",
+        (tuple(names),),
+        as_dict=True
+    )
+    missing = set(names) - {row.name for row in rows}
+    if missing:
+        frappe.throw(_("Kitchen Station {0} not found.").format(", ".join(sorted(missing))))
+
+    # Default sources for per-line rows: earlier statuses that may move forward to the target
+    sources = [from_status] if from_status else [
+        s for s in KITCHEN_STATUSES[:KITCHEN_STATUSES.index(to_status)]
+        if to_status in KITCHEN_STATUS_TRANSITIONS[s]
+    ]
+
+    per_unit = []
+    per_line = []
+    for row in rows:
+        if row.kot_item:
+            counts = {s: cint(row[get_status_qty_field(s)]) for s in KITCHEN_STATUSES}
+            moved = sum(counts[s] for s in sources if s != to_status)
+            if not moved:
+                continue
+            for s in sources:
+                if s != to_status and counts[s]:
+                    validate_kitchen_status_transition(s, to_status, row.name)
+                    counts[s] = 0
+            counts[to_status] += moved
+            row.unit_counts = counts
+            row.status = get_aggregate_unit_status(counts)
+            per_line.append(row)
+        else:
+            if row.status == to_status:
+                continue
+            if from_status and row.status != from_status:
+                frappe.throw(_("{0} is {1}, not {2}.").format(row.name, row.status, from_status))
+            validate_kitchen_status_transition(row.status, to_status, row.name)
+            row.status = to_status
+            per_unit.append(row)
+
+    timestamp = now_datetime()
+    values = {"timestamp": timestamp, "user": frappe.session.user}
+
+    if per_unit:
+        frappe.db.sql("""
+            UPDATE `tabKitchen Station`
+            SET status = %(status)s, last_updated = %(timestamp)s,
+                modified = %(timestamp)s, modified_by = %(user)s
+            WHERE name IN %(names)s
+        """, dict(values, status=to_status, names=tuple(row.name for row in per_unit)))
+
+    for row in per_line:
+        frappe.db.sql(f"""
+            UPDATE `tabKitchen Station`
+            SET {", ".join(f"`{field}` = %({field})s" for field in COUNTER_FIELDS)},
+                status = %(status)s, last_updated = %(timestamp)s,
+                modified = %(timestamp)s, modified_by = %(user)s
+            WHERE name = %(name)s
+        """, dict(
+            values,
+            name=row.name,
+            status=row.status,
+            **{get_status_qty_field(s): row.unit_counts[s] for s in KITCHEN_STATUSES}
+        ))
+
+    changed = per_unit + per_line
+    publish_kitchen_station_changes(changed, timestamp)
+
+    return len(changed), {row.source_kot_item or row.kot_item for row in changed} - {None, ""}
+
+def publish_kitchen_station_changes(rows, timestamp):
+    """
+    Push the new status (and unit counts) of changed Kitchen Station rows
+    """
+    publish_kitchen_station_rows([
+        dict(
+            {"name": row.name, "branch": row.branch, "item_group": row.item_group,
+             "status": row.status, "last_updated": timestamp},
+            **({"unit_counts": row.unit_counts} if row.kot_item else {})
+        )
+        for row in rows
+    ])
+
+def get_line_statuses(source_items):
+    """
+    Roll the Kitchen Station rows of KOT lines up to a status per line
+
+    Args:
+        source_items: KOT Item row names
+
+    Returns:
+        Dict of KOT Item row name -> kitchen status of all its units
+    """
+    if not source_items:
+        return {}
+
+    counts_by_line = {name: dict.fromkeys(KITCHEN_STATUSES, 0) for name in source_items}
+    for row in frappe.db.sql(f"""
+        SELECT source_kot_item, kot_item, status, {", ".join(COUNTER_FIELDS)}
+        FROM `tabKitchen Station`
+        WHERE source_kot_item IN %s
+    """, (tuple(source_items),), as_dict=True):
+        counts = counts_by_line[row.source_kot_item]
+        if row.kot_item:
+            for status in KITCHEN_STATUSES:
+                counts[status] += cint(row[get_status_qty_field(status)])
+        else:
+            counts[row.status or "Queued"] += 1
+
+    return {
+        name: get_aggregate_unit_status(counts)
+        for name, counts in counts_by_line.items()
+        if any(counts.values())
+    }
+
+def get_kot_item_targets(names, to_status, from_status=None):
+    """
+    Check KOT Items (KOT rows or their KDS copies) against the allowed
+    transitions
+
+    The Kitchen Station rows of the lines are locked first, then the KOT
+    Items are read for the check with FOR UPDATE, so both kinds of bulk
+    change take locks in the same order and nothing changes between the
+    check and the write.
+
+    Returns:
+        Dict of KOT row name -> target status, for lines that change
+    """
+    lines = frappe.db.sql("""
+        SELECT DISTINCT IF(parenttype = 'Kitchen Display Order', source_kot_item, name)
+        FROM `tabKOT Item`
+        WHERE name IN %s
+    """, (tuple(names),), pluck=True)
+    lines = [line for line in lines if line]
+    if lines:
+        frappe.db.sql("""
+            SELECT name
+            FROM `tabKitchen Station`
+            WHERE source_kot_item IN %s
+            FOR UPDATE
+        """, (tuple(lines),))
+
+    rows = frappe.db.sql("""
+        SELECT name, parenttype, source_kot_item, kot_status, cancelled
+        FROM `tabKOT Item`
+        WHERE name IN %s
+        FOR UPDATE
+    """, (tuple(names),), as_dict=True)
+    missing = set(names) - {row.name for row in rows}
+    if missing:
+        frappe.throw(_("KOT Item {0} not found.").format(", ".join(sorted(missing))))
+
+    targets = {}
+    for row in rows:
+        current = get_item_kitchen_status(row)
+        if current == to_status:
+            continue
+        if from_status and current != from_status:
+            frappe.throw(_("{0} is {1}, not {2}.").format(row.name, current, from_status))
+        validate_kitchen_status_transition(current, to_status, row.name)
+
+        line = row.source_kot_item if row.parenttype == "Kitchen Display Order" else row.name
+        if line:
+            targets[line] = to_status
+
+    return targets
+
+def set_kitchen_station_rows_for_lines(line_statuses):
+    """
+    Move every unit of the given KOT lines that is not cancelled to the
+    line's new status, so the Kitchen Station rows agree with the line
+    """
+    if not line_statuses:
+        return
+
+    rows = frappe.db.sql(f"""
+        SELECT name, kot_item, source_kot_item, branch, item_group, status, qty,
+            {", ".join(COUNTER_FIELDS)}
+        FROM `tabKitchen Station`
+        WHERE source_kot_item IN %s
+        AND status != 'Cancelled'
+        FOR UPDATE
+    """, (tuple(line_statuses),), as_dict=True)
+
+    timestamp = now_datetime()
+    changed = []
+    for row in rows:
+        status = line_statuses[row.source_kot_item]
+        if row.kot_item:
+            cancelled = cint(row.cancelled_qty)
+            counts = dict.fromkeys(KITCHEN_STATUSES, 0)
+            counts["Cancelled"] = cancelled
+            counts[status] += cint(row.qty) - cancelled
+            if all(cint(row[get_status_qty_field(s)]) == counts[s] for s in KITCHEN_STATUSES):
+                continue
+            row.unit_counts = counts
+        elif row.status == status:
+            continue
+        row.status = status
+        changed.append(row)
+
+    for row in changed:
+        frappe.db.sql(f"""
+            UPDATE `tabKitchen Station`
+            SET status = %(status)s, last_updated = %(timestamp)s, modified = %(timestamp)s,
+                modified_by = %(user)s
+                {"".join(f", `{field}` = %({field})s" for field in COUNTER_FIELDS) if row.kot_item else ""}
+            WHERE name = %(name)s
+        """, dict(
+            {"name": row.name, "status": row.status, "timestamp": timestamp, "user": frappe.session.user},
+            **({get_status_qty_field(s): row.unit_counts[s] for s in KITCHEN_STATUSES} if row.kot_item else {})
+        ))
+
+    publish_kitchen_station_changes(changed, timestamp)
+
+def set_line_statuses(line_statuses):
+    """
+    Write new statuses to KOT lines and their KDS copies, with one UPDATE
+    per target status
+
+    Args:
+        line_statuses: Dict of KOT row name -> kitchen status
+
+    Returns:
+        Dict of KDS name -> item count changes per status, for
+        set_kds_statuses
+    """
+    if not line_statuses:
+        return {}
+
+    rows = frappe.db.sql("""
+        SELECT name, parent, parenttype, source_kot_item, kot_status, cancelled
+        FROM `tabKOT Item`
+        WHERE (name IN %(lines)s AND parenttype = 'Kitchen Order Ticket')
+        OR (source_kot_item IN %(lines)s AND parenttype = 'Kitchen Display Order')
+        FOR UPDATE
+    """, {"lines": tuple(line_statuses)}, as_dict=True)
+
+    names_by_status = {}
+    kds_changes = {}
+    kds_items = {}
+    for row in rows:
+        if row.cancelled:
+            continue
+        line = row.source_kot_item if row.parenttype == "Kitchen Display Order" else row.name
+        status = line_statuses[line]
+        current = get_item_kitchen_status(row)
+        if current == status:
+            continue
+
+        names_by_status.setdefault(status, []).append(row.name)
+        if row.parenttype == "Kitchen Display Order":
+            changes = kds_changes.setdefault(row.parent, {})
+            changes[current] = changes.get(current, 0) - 1
+            changes[status] = changes.get(status, 0) + 1
+            kds_items.setdefault(row.parent, []).append({"name": row.name, "kot_status": status})
+
+    timestamp = now_datetime()
+    for status, names in names_by_status.items():
+        frappe.db.sql("""
+            UPDATE `tabKOT Item`
+            SET kot_status = %s, kot_last_update = %s
+            WHERE name IN %s
+        """, (status, timestamp, tuple(names)))
+
+    if kds_items:
+        branches = dict(frappe.get_all(
+            "Kitchen Display Order",
+            filters={"name": ["in", list(kds_items)]},
+            fields=["name", "branch"],
+            as_list=True
+        ))
+        for kds_name, items in kds_items.items():
+            publish_kds_items(kds_name, branches.get(kds_name), items)
+
+    return kds_changes
+
+def set_kds_statuses(kds_changes):
+    """
+    Apply item count changes to Kitchen Display Orders, one UPDATE each
+
+    The KDS rows are locked while their counters are read, so concurrent
+    changes to the same KDS are applied one after the other.
+
+    Returns:
+        Tuple of (KDS name -> status, KOT name -> status for the KDS whose
+        status changed)
+    """
+    if not kds_changes:
+        return {}, {}
+
+    rows = frappe.db.sql(
+        f"""SELECT name, branch, kot_id, status, {", ".join(KDS_COUNTER_FIELDS)}
+            FROM `tabKitchen Display Order`
+            WHERE name IN %s
+            FOR UPDATE""",
+        (tuple(kds_changes),),
+        as_dict=True
+    )
+    missing = set(kds_changes) - {row.name for row in rows}
+    if missing:
+        frappe.throw(_("Kitchen Display Order {0} not found.").format(", ".join(sorted(missing))))
+
+    kds_statuses = {}
+    kot_statuses = {}
+    for row in rows:
+        changes = kds_changes[row.name]
+        counts = {
+            s: cint(row[get_kds_counter_field(s)]) + cint(changes.get(s))
+            for s in KITCHEN_STATUSES
+        }
+        if any(count < 0 for count in counts.values()):
+            frappe.throw(_("Item counts of {0} cannot be negative.").format(row.name))
+
+        status = get_kds_status(counts)
+        kds_statuses[row.name] = status
+        moved = [s for s in KITCHEN_STATUSES if cint(changes.get(s))]
+        if status == row.status and not moved:
+            continue
+
+        values = {get_kds_counter_field(s): counts[s] for s in moved}
+        values.update({"status": status, "last_updated": now_datetime()})
+        frappe.db.sql(
+            f"""UPDATE `tabKitchen Display Order`
+                SET {", ".join(f"`{field}` = %({field})s" for field in values)}
+                WHERE name = %(name)s""",
+            dict(values, name=row.name)
+        )
+
+        if status != row.status:
+            if row.kot_id:
+                kot_statuses[row.kot_id] = status
+            publish_kds_status(row.name, row.branch, status, values["last_updated"])
+
+    return kds_statuses, kot_statuses
+
+def set_kot_statuses(kot_statuses):
+    """
+    Write KOT statuses, one UPDATE per target status
+
+    Returns:
+        Tuple of (KOT name -> status for the KOTs that changed, set of
+        their POS Orders)
+    """
+    if not kot_statuses:
+        return {}, set()
+
+    rows = frappe.db.sql("""
+        SELECT name, status, pos_order
+        FROM `tabKitchen Order Ticket`
+        WHERE name IN %s
+    """, (tuple(kot_statuses),), as_dict=True)
+
+    changes = {row.name: kot_statuses[row.name] for row in rows if row.status != kot_statuses[row.name]}
+    write_statuses("Kitchen Order Ticket", changes)
+
+    return changes, {row.pos_order for row in rows if row.name in changes and row.pos_order}
+
+def set_pos_order_statuses(pos_orders):
+    """
+    Keep open POS Orders in step with their kitchen work
+
+    An order is "Ready for Billing" when every item that is not cancelled
+    went to the kitchen and every KOT of the order that is not cancelled
+    is Ready or Served; otherwise it is "In Progress", so an undone item
+    or a new KOT takes a Ready for Billing order back. Paid and cancelled
+    orders are left alone.
+
+    Returns:
+        Dict of POS Order name -> new status, for the ones that changed
+    """
+    if not pos_orders:
+        return {}
+
+    orders = frappe.db.sql("""
+        SELECT name, status
+        FROM `tabPOS Order`
+        WHERE name IN %s
+        AND status IN %s
+    """, (tuple(pos_orders), OPEN_POS_ORDER_STATUSES), as_dict=True)
+    if not orders:
+        return {}
+
+    names = tuple(order.name for order in orders)
+    kot_statuses = {}
+    for pos_order, status in frappe.db.sql("""
+        SELECT pos_order, status
+        FROM `tabKitchen Order Ticket`
+        WHERE pos_order IN %s
+        AND status != 'Cancelled'
+    """, (names,)):
+        kot_statuses.setdefault(pos_order, []).append(status)
+
+    unsent = set(frappe.db.sql("""
+        SELECT DISTINCT parent
+        FROM `tabPOS Order Item`
+        WHERE parent IN %s
+        AND parenttype = 'POS Order'
+        AND cancelled = 0
+        AND sent_to_kitchen = 0
+    """, (names,), pluck=True))
+
+    changes = {}
+    for order in orders:
+        statuses = kot_statuses.get(order.name)
+        done = statuses and order.name not in unsent and all(s in KOT_DONE_STATUSES for s in statuses)
+        # A Draft order passes through In Progress in the same write
+        status = "Ready for Billing" if done else "In Progress"
+        if status != order.status:
+            changes[order.name] = status
+
+    write_statuses("POS Order", changes)
+    return changes
+
+def write_statuses(doctype, statuses):
+    """
+    Write a status per document, one UPDATE per distinct status
+    """
+    names_by_status = {}
+    for name, status in statuses.items():
+        names_by_status.setdefault(status, []).append(name)
+
+    timestamp = now_datetime()
+    for status, names in names_by_status.items():
+        frappe.db.sql(f"""
+            UPDATE `tab{doctype}`
+            SET status = %s, modified = %s, modified_by = %s
+            WHERE name IN %s
+        """, (status, timestamp, frappe.session.user, tuple(names)))
@@ -0,0 +1,317 @@
+# File: pos_restaurant_itb/utils/variants.py
+
+import hashlib
+import json
+
+import frappe
+from frappe import _
+from pos_restaurant_itb.utils.cache import delete_cache
+
+VARIANT_INDEX_CACHE_KEY = "pos_restaurant_variant_index"
+ATTRIBUTE_CATALOG_CACHE_KEY = "pos_restaurant_attribute_catalog"
+
+def get_attributes_dict(dynamic_attributes):
+    """
+    Converts dynamic attributes to an attribute -> value dict
+
+    Args:
+        dynamic_attributes: List (or JSON list) in the format
+            [{"attribute_name": "Color", "attribute_value": "Red"}, ...]
+    """
+    if isinstance(dynamic_attributes, str):
+        dynamic_attributes = json.loads(dynamic_attributes or "[]")
+
+    return {
+        attr.get("attribute_name"): attr.get("attribute_value")
+        for attr in dynamic_attributes or []
+        if attr.get("attribute_name") and attr.get("attribute_value")
+    }
+
+def get_attribute_pairs(dynamic_attributes):
+    """
+    Converts dynamic attributes to a sorted list of unique (name, value)
+    pairs; an attribute may have several values, e.g. two toppings
+
+    Args:
+        dynamic_attributes: List (or JSON list) in the format
+            [{"attribute_name": "Color", "attribute_value": "Red"}, ...]
+    """
+    if isinstance(dynamic_attributes, str):
+        dynamic_attributes = json.loads(dynamic_attributes or "[]")
+
+    return sorted({
+        (str(attr.get("attribute_name")), str(attr.get("attribute_value")))
+        for attr in dynamic_attributes or []
+        if attr.get("attribute_name") and attr.get("attribute_value")
+    })
+
+def encode_attributes(dynamic_attributes):
+    """
+    Canonical encoding of attributes, enforced when rows are written
+
+    Exact (name, value) duplicates are dropped, the rest is sorted by name
+    and value and dumped with sorted keys and compact separators, so the
+    same selection always gives the same string whatever order it was sent
+    in. Several values of one attribute are all kept.
+
+    Args:
+        dynamic_attributes: List (or JSON list) in the format
+            [{"attribute_name": "Color", "attribute_value": "Red"}, ...]
+
+    Returns:
+        Canonical JSON string, or None when there are no attributes
+    """
+    try:
+        pairs = get_attribute_pairs(dynamic_attributes)
+    except (ValueError, TypeError, AttributeError):
+        frappe.throw(_("Invalid attributes: {0}").format(dynamic_attributes))
+
+    return encode_attribute_pairs(pairs) if pairs else None
+
+def encode_attributes_dict(attrs_dict):
+    """
+    Canonical encoding of an attribute -> value dict, see encode_attributes
+    """
+    return encode_attribute_pairs(sorted((str(name), str(value)) for name, value in attrs_dict.items()))
+
+def encode_attribute_pairs(pairs):
+    """
+    Canonical encoding of sorted (name, value) pairs, see encode_attributes
+    """
+    return json.dumps(
+        [{"attribute_name": name, "attribute_value": value} for name, value in pairs],
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False
+    )
+
+def get_attributes_hash(encoded_attributes):
+    """
+    Fixed-width hash of canonically encoded attributes, stored in the
+    attributes_hash column; None when there are no attributes
+    """
+    if not encoded_attributes:
+        return None
+    return hashlib.sha1(encoded_attributes.encode()).hexdigest()
+
+def get_attribute_signature(attrs_dict):
+    """
+    Signature of an attribute -> value dict: the attributes_hash a row
+    with these attributes gets, so the same attributes in any order give
+    the same signature
+    """
+    return get_attributes_hash(encode_attributes_dict(attrs_dict))
+
+def find_variant(template_item, attrs_dict):
+    """
+    Finds the variant of a template that has the given attribute values
+
+    An exact signature match is a single lookup in the cached index. When
+    the selection only names some of the variant's attributes, the first
+    variant (most recently modified) having all of them is returned.
+
+    Args:
+        template_item: Template item code
+        attrs_dict: Attribute -> value dict
+
+    Returns:
+        Item code of the variant, or None if no match found
+    """
+    if not template_item or not attrs_dict:
+        return None
+
+    index = get_variant_index(template_item)
+    variant = index["by_signature"].get(get_attribute_signature(attrs_dict))
+    if variant:
+        return variant
+
+    requested = attrs_dict.items()
+    for variant, variant_attrs in index["variants"]:
+        if requested <= variant_attrs.items():
+            return variant
+
+    return None
+
+def get_variant_details(template_item, variant):
+    """
+    Returns item_name, rate and uom of a variant from the cached index
+    """
+    return get_variant_index(template_item)["details"].get(variant)
+
+def get_variant_index(template_item):
+    """
+    Returns the variant index of a template from the shared cache,
+    building it on first use
+    """
+    return frappe.cache().hget(
+        VARIANT_INDEX_CACHE_KEY, template_item,
+        generator=lambda: build_variant_index(template_item)
+    )
+
+def prefetch_variant_indexes(template_items):
+    """
+    Loads the variant indexes of many templates into the shared cache,
+    building the missing ones with a single query
+    """
+    cache = frappe.cache()
+    missing = [
+        template for template in set(template_items)
+        if template and cache.hget(VARIANT_INDEX_CACHE_KEY, template) is None
+    ]
+    for template, index in build_variant_indexes(missing).items():
+        cache.hset(VARIANT_INDEX_CACHE_KEY, template, index)
+
+def build_variant_index(template_item):
+    """
+    Builds the signature -> variant index of a template with a single query
+
+    Returns:
+        Dict with "by_signature" (attributes hash -> item code),
+        "variants" (ordered list of (item code, attribute dict)) and
+        "details" (item code -> item_name, rate, uom)
+    """
+    return build_variant_indexes([template_item])[template_item]
+
+def build_variant_indexes(template_items):
+    """
+    Builds the variant indexes of many templates with a single query
+
+    Returns:
+        Dict of template item code -> index (see build_variant_index)
+    """
+    attrs_by_variant = {template: {} for template in template_items}
+    details = {template: {} for template in template_items}
+
+    rows = frappe.db.sql("""
+        SELECT i.name, i.variant_of, i.item_name, i.standard_rate, i.stock_uom,
+            a.attribute, a.attribute_value
+        FROM `tabItem` i
+        LEFT JOIN `tabItem Variant Attribute` a
+            ON a.parent = i.name AND a.parenttype = 'Item'
+        WHERE i.variant_of IN %s
+        ORDER BY i.modified DESC, i.name, a.idx
+    """, (tuple(template_items),), as_dict=1) if template_items else []
+
+    for row in rows:
+        attrs = attrs_by_variant[row.variant_of].setdefault(row.name, {})
+        if row.attribute:
+            attrs[row.attribute] = row.attribute_value
+        details[row.variant_of][row.name] = {
+            "item_name": row.item_name,
+            "rate": row.standard_rate,
+            "uom": row.stock_uom
+        }
+
+    indexes = {}
+    for template, variants in attrs_by_variant.items():
+        by_signature = {}
+        for variant, attrs in variants.items():
+            by_signature.setdefault(get_attribute_signature(attrs), variant)
+
+        indexes[template] = {
+            "by_signature": by_signature,
+            "variants": list(variants.items()),
+            "details": details[template]
+        }
+
+    return indexes
+
+def clear_variant_index(doc, method=None, *args):
+    """
+    Item hook: drops the cached index of the template an Item belongs to
+
+    Covers saving, deleting and renaming a variant (its attributes, name
+    or details changed) and a template (its variants may have been
+    regenerated).
+    """
+    templates = {doc.variant_of, doc.name if doc.has_variants else None}
+
+    previous = doc.get_doc_before_save() if hasattr(doc, "get_doc_before_save") else None
+    if previous:
+        templates.add(previous.variant_of)
+    if args and doc.has_variants:
+        # after_rename passes the old name first
+        templates.add(args[0])
+
+    delete_cache(VARIANT_INDEX_CACHE_KEY, templates)
+
+def get_attribute_catalog(template_item):
+    """
+    Returns the attribute catalog of a template from the shared cache,
+    building it on first use
+
+    Returns:
+        Dict with "version" (content hash, changes whenever the catalog
+        does) and "attributes" (list of {"attribute", "values"}; empty for
+        items that are not templates)
+    """
+    return frappe.cache().hget(
+        ATTRIBUTE_CATALOG_CACHE_KEY, template_item,
+        generator=lambda: build_attribute_catalog(template_item)
+    )
+
+def build_attribute_catalog(template_item):
+    """
+    Builds the attribute catalog of a template with a single query
+
+    Values listed on the template's attribute row win; otherwise all values
+    of the Item Attribute are offered.
+    """
+    return build_attribute_catalogs([template_item])[template_item]
+
+def build_attribute_catalogs(template_items):
+    """
+    Builds the attribute catalogs of many templates with a single query
+
+    Returns:
+        Dict of template item code -> catalog (see get_attribute_catalog)
+    """
+    attributes = {template: {} for template in template_items}
+
+    rows = frappe.db.sql("""
+        SELECT i.name AS template, a.attribute, a.attribute_values, v.attribute_value
+        FROM `tabItem` i
+        INNER JOIN `tabItem Variant Attribute` a
+            ON a.parent = i.name AND a.parenttype = 'Item'
+        LEFT JOIN `tabItem Attribute Value` v
+            ON v.parent = a.attribute AND v.parenttype = 'Item Attribute'
+            AND IFNULL(a.attribute_values, '') = ''
+        WHERE i.name IN %s
+        AND i.has_variants = 1
+        ORDER BY i.name, a.idx, v.idx
+    """, (tuple(template_items),), as_dict=1) if template_items else []
+
+    for row in rows:
+        template_attributes = attributes[row.template]
+        if row.attribute not in template_attributes:
+            template_attributes[row.attribute] = row.attribute_values.split("\n") if row.attribute_values else []
+        if row.attribute_value:
+            template_attributes[row.attribute].append(row.attribute_value)
+
+    catalogs = {}
+    for template, template_attributes in attributes.items():
+        catalog = [{"attribute": attribute, "values": values} for attribute, values in template_attributes.items()]
+        catalogs[template] = {"version": get_content_hash(catalog), "attributes": catalog}
+
+    return catalogs
+
+def get_content_hash(value):
+    """
+    Short hash of a JSON-serializable value, identical on every worker
+    """
+    return hashlib.sha1(
+        json.dumps(value, sort_keys=True, separators=(",", ":"), default=str).encode()
+    ).hexdigest()[:16]
+
+def clear_attribute_catalog(doc, method=None, *args):
+    """
+    Item / Item Attribute hook: drops cached attribute catalogs
+
+    An Item only affects its own catalog; an Item Attribute's values can
+    be offered by any template, so all catalogs are dropped.
+    """
+    if doc.doctype == "Item":
+        # after_rename passes the old name first
+        delete_cache(ATTRIBUTE_CATALOG_CACHE_KEY, [doc.name, args[0] if args else None])
+    else:
+        delete_cache(ATTRIBUTE_CATALOG_CACHE_KEY)
@@ -0,0 +1,25 @@
+// realtime/handlers.js
+//
+// Loaded by the Frappe socket.io server for every connection. Kitchen
+// screens emit `pos_restaurant:kds_subscribe` with their branch (and
+// station) to receive `pos_restaurant_kds` events, see
+// pos_restaurant_itb/utils/kds_realtime.py.
+
+const GET_KDS_ROOMS = "/api/method/pos_restaurant_itb.utils.kds_realtime.get_kds_rooms";
+
+function pos_restaurant_handlers(socket) {
+	socket.on("pos_restaurant:kds_subscribe", ({ branch, station } = {}) => {
+		// The server checks the user's permissions and the branch. Query
+		// params are strings, so leave station out rather than send "undefined"
+		const args = station ? { branch, station } : { branch };
+		socket
+			.frappe_request(GET_KDS_ROOMS, args)
+			.then((res) => res.json())
+			.then(({ message }) => {
+				(message || []).forEach((room) => socket.join(room));
+			})
+			.catch((e) => console.log("pos_restaurant:kds_subscribe failed", e));
+	});
+}
+
+module.exports = pos_restaurant_handlers;
@@ -0,0 +1,58 @@
+# tests/test_escpos.py
+
+import unittest
+
+from pos_restaurant_itb.utils.escpos import (
+    BOLD_OFF,
+    BOLD_ON,
+    CUT,
+    DOUBLE_ON,
+    INIT,
+    compile_layout,
+    render_ticket,
+)
+
+TICKET = {"station": "Grill", "kot": "KOT-20260101-TEST-0001", "table": "T1", "waiter": "", "time": "12:00"}
+
+class TestEscPosRenderer(unittest.TestCase):
+    def test_default_layout(self):
+        """Test that a ticket renders header, items with attributes and notes, and a cut."""
+        items = [
+            {"qty": 2.0, "item_name": "Fried Rice", "attribute_summary": "Spice: Hot", "note": "No egg"},
+            {"qty": 1, "item_name": "Iced Tea", "attribute_summary": "", "note": None},
+        ]
+
+        data = render_ticket(TICKET, items)
+
+        self.assertTrue(data.startswith(INIT))
+        self.assertTrue(data.endswith(CUT))
+        self.assertIn(DOUBLE_ON + b"Grill\n", data)
+        self.assertIn(BOLD_ON + b"2 x Fried Rice\n" + BOLD_OFF, data)
+        self.assertIn(b"   Spice: Hot\n", data)
+        self.assertIn(b"   Note: No egg\n", data)
+        self.assertIn(BOLD_ON + b"1 x Iced Tea\n" + BOLD_OFF, data)
+        # Empty fields drop their line
+        self.assertNotIn(b"Waiter:", data)
+        self.assertEqual(data.count(b"Note:"), 1)
+        # Items come after the header and before the footer rule
+        self.assertLess(data.index(b"Table: T1"), data.index(b"Fried Rice"))
+        self.assertLess(data.index(b"Iced Tea"), data.rindex(b"-" * 48))
+
+    def test_custom_layout_and_wrapping(self):
+        """Test a custom layout, line wrapping and the compiled layout cache."""
+        source = "[right]{kot}\n[rule]\n[item]{qty}x {item_name}\n[cut]"
+
+        data = render_ticket(TICKET, [{"qty": 1, "item_name": "word " * 10}], source=source, width=24)
+
+        self.assertIn(b"\x1ba\x02KOT-20260101-TEST-0001\n", data)
+        self.assertIn(b"-" * 24 + b"\n", data)
+        self.assertIn(b"1x word word word word\nword word word word word\nword\n", data)
+        self.assertIs(compile_layout(source, 24), compile_layout(source, 24))
+
+    def test_unknown_directive(self):
+        """Test that a layout with an unknown directive is rejected."""
+        with self.assertRaises(ValueError):
+            compile_layout("[blink]{kot}")
+
+if __name__ == "__main__":
+    unittest.main()
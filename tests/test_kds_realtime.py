@@ -0,0 +1,86 @@
+# tests/test_kds_realtime.py
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from pos_restaurant_itb.utils.kds_realtime import (
+    KDS_EVENT,
+    get_branch_room,
+    get_kds_rooms,
+    get_station_room,
+    publish_kds_status,
+    publish_kitchen_station_rows,
+)
+from pos_restaurant_itb.utils.kitchen_routing import clear_routing_index
+from tests.utils import make_test_branch, make_test_item_group, make_test_kitchen_station
+
+class TestKDSRealtime(FrappeTestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Set up test data and dependencies."""
+        super().setUpClass()
+        make_test_branch()
+
+        # Create test item group and a station preparing it
+        make_test_item_group("Test Fried Food")
+        make_test_kitchen_station("Test Fry Station", item_group="Test Fried Food")
+
+        clear_routing_index()
+
+    def test_kds_rooms(self):
+        """Test that a screen gets its branch room and, when it shows one, its station room."""
+        self.assertEqual(get_kds_rooms("Test Branch"), [get_branch_room("Test Branch")])
+        self.assertEqual(
+            get_kds_rooms("Test Branch", "Test Fry Station"),
+            [get_branch_room("Test Branch"), get_station_room("Test Fry Station")]
+        )
+
+        with self.assertRaises(frappe.ValidationError):
+            get_kds_rooms("Test Branch Missing")
+
+    def test_branch_only_subscription(self):
+        """Test that a screen without a station gets its branch room whatever the socket sends."""
+        for station in (None, "", "undefined"):
+            self.assertEqual(get_kds_rooms("Test Branch", station), [get_branch_room("Test Branch")])
+
+    def test_kitchen_station_rows_are_routed(self):
+        """Test that a Kitchen Station change is sent after commit to the branch and station rooms only."""
+        with patch.object(frappe, "publish_realtime") as publish_realtime:
+            publish_kitchen_station_rows([{
+                "name": "KS-TEST-0001",
+                "branch": "Test Branch",
+                "item_group": "Test Fried Food",
+                "status": "Cooking",
+                "last_updated": "2026-01-01 12:00:00",
+                "unit_counts": {"Queued": 1, "Cooking": 1}
+            }])
+
+        rooms = {call.kwargs["room"]: call for call in publish_realtime.call_args_list}
+        self.assertIn(get_branch_room("Test Branch"), rooms)
+        self.assertIn(get_station_room("Test Fry Station"), rooms)
+
+        call = rooms[get_station_room("Test Fry Station")]
+        self.assertEqual(call.args[0], KDS_EVENT)
+        self.assertTrue(call.kwargs["after_commit"])
+        self.assertEqual(call.args[1], {
+            "type": "kitchen_station",
+            "rows": [{
+                "name": "KS-TEST-0001",
+                "status": "Cooking",
+                "last_updated": "2026-01-01 12:00:00",
+                "unit_counts": {"Queued": 1, "Cooking": 1}
+            }]
+        })
+
+    def test_kds_status_goes_to_branch_room(self):
+        """Test that a KDS status change is a compact message to the branch room."""
+        with patch.object(frappe, "publish_realtime") as publish_realtime:
+            publish_kds_status("KDS-TEST", "Test Branch", "Ready")
+
+        publish_realtime.assert_called_once_with(
+            KDS_EVENT,
+            {"type": "kds_status", "kds": "KDS-TEST", "status": "Ready", "last_updated": None},
+            room=get_branch_room("Test Branch"),
+            after_commit=True
+        )
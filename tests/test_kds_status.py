@@ -0,0 +1,150 @@
+# tests/test_kds_status.py
+
+import frappe
+from unittest.mock import patch
+from pos_restaurant_itb.api.kitchen_station import move_kitchen_station_units
+from pos_restaurant_itb.api.kitchen_status import update_kitchen_status
+from pos_restaurant_itb.api.kot_status_update import (
+    apply_kds_item_status_changes,
+    update_kds_status_from_kot,
+)
+from pos_restaurant_itb.utils.kot_helpers import get_kds_status
+from tests.utils import KitchenTestCase
+
+class TestKDSStatus(KitchenTestCase):
+    def test_kds_status_from_counts(self):
+        """Test the KDS status derived from item counts."""
+        self.assertEqual(get_kds_status({}), "New")
+        self.assertEqual(get_kds_status({"Cancelled": 2}), "New")
+        self.assertEqual(get_kds_status({"Queued": 1, "Cooking": 1}), "In Progress")
+        self.assertEqual(get_kds_status({"Queued": 1, "Ready": 1}), "New")
+        self.assertEqual(get_kds_status({"Ready": 1, "Served": 1, "Cancelled": 1}), "Ready")
+        self.assertEqual(get_kds_status({"Served": 2, "Cancelled": 1}), "Served")
+
+    def test_item_counts_drive_status(self):
+        """Test that item status changes update counters and status without saving the KDS."""
+        kds_name, kot_id = self.create_kds(lines=2)
+        self.assertEqual(frappe.db.get_value("Kitchen Display Order", kds_name, "queued_items"), 2)
+
+        versions = frappe.db.count("Version", {"ref_doctype": "Kitchen Display Order", "docname": kds_name})
+
+        self.assertEqual(apply_kds_item_status_changes(kds_name, {"Queued": -1, "Cooking": 1}), "In Progress")
+        self.assertEqual(apply_kds_item_status_changes(kds_name, {"Queued": -1, "Ready": 1}), "In Progress")
+        self.assertEqual(apply_kds_item_status_changes(kds_name, {"Cooking": -1, "Ready": 1}), "Ready")
+
+        kds = frappe.db.get_value(
+            "Kitchen Display Order", kds_name,
+            ["status", "queued_items", "cooking_items", "ready_items"], as_dict=True
+        )
+        self.assertEqual((kds.status, kds.queued_items, kds.cooking_items, kds.ready_items), ("Ready", 0, 0, 2))
+        self.assertEqual(frappe.db.get_value("Kitchen Order Ticket", kot_id, "status"), "Ready")
+        self.assertEqual(
+            frappe.db.count("Version", {"ref_doctype": "Kitchen Display Order", "docname": kds_name}),
+            versions
+        )
+
+        # Recomputing from unchanged counters writes nothing
+        with self.assertQueryCount(1):
+            update_kds_status_from_kot(kds_name)
+
+        with self.assertRaises(frappe.ValidationError):
+            apply_kds_item_status_changes(kds_name, {"Queued": -1, "Cooking": 1})
+
+    def test_bulk_kitchen_station_transition(self):
+        """Test that firing all units of a ticket updates the line, KDS and KOT once."""
+        kds_name, kot_id = self.create_kds(lines=2)
+        units = frappe.get_all("Kitchen Station", filters={"kot": kot_id}, pluck="name")
+
+        result = update_kitchen_status("Kitchen Station", units, "Cooking")
+
+        self.assertEqual(result["updated"], len(units))
+        self.assertEqual(result["kds"], {kds_name: "In Progress"})
+        self.assertEqual(frappe.db.get_value("KOT Item", {"parent": kot_id}, "kot_status"), "Cooking")
+        self.assertEqual(frappe.db.get_value("KOT Item", {"parent": kds_name}, "kot_status"), "Cooking")
+        self.assertEqual(frappe.db.get_value("Kitchen Order Ticket", kot_id, "status"), "In Progress")
+
+        # Tapping again changes nothing
+        self.assertEqual(update_kitchen_status("Kitchen Station", units, "Cooking")["updated"], 0)
+
+        update_kitchen_status("Kitchen Station", units, "Served")
+        with self.assertRaises(frappe.ValidationError):
+            update_kitchen_status("Kitchen Station", units, "Queued")
+
+    def test_bulk_kot_item_transition(self):
+        """Test that moving KDS items moves their Kitchen Station rows and recomputes the KDS."""
+        kds_name, kot_id = self.create_kds(lines=2)
+        kds_items = frappe.get_all("KOT Item", filters={"parent": kds_name}, pluck="name")
+
+        result = update_kitchen_status("KOT Item", kds_items, "Ready")
+
+        self.assertEqual(result["updated"], 2)
+        self.assertEqual(result["kds"], {kds_name: "Ready"})
+        self.assertEqual(
+            set(frappe.get_all("Kitchen Station", filters={"kot": kot_id}, pluck="status")),
+            {"Ready"}
+        )
+        self.assertEqual(frappe.db.get_value("Kitchen Display Order", kds_name, "ready_items"), 2)
+
+        with self.assertRaises(frappe.ValidationError):
+            update_kitchen_status("KOT Item", kds_items, "Cooking", from_status="Queued")
+
+    def test_cancel_kot_items(self):
+        """Test that queued items can be cancelled and stay cancelled."""
+        kds_name, kot_id = self.create_kds(lines=2)
+        kds_items = frappe.get_all("KOT Item", filters={"parent": kds_name}, pluck="name", order_by="idx")
+
+        result = update_kitchen_status("KOT Item", kds_items[:1], "Cancelled")
+
+        self.assertEqual(result["updated"], 1)
+        self.assertEqual(frappe.db.get_value("KOT Item", kds_items[0], "kot_status"), "Cancelled")
+        self.assertEqual(
+            sorted(frappe.get_all("Kitchen Station", filters={"kot": kot_id}, pluck="status")),
+            ["Cancelled", "Queued"]
+        )
+        self.assertEqual(frappe.db.get_value("Kitchen Display Order", kds_name, "cancelled_items"), 1)
+
+        with self.assertRaises(frappe.ValidationError):
+            update_kitchen_status("KOT Item", kds_items[:1], "Queued")
+
+        update_kitchen_status("KOT Item", kds_items[1:], "Ready")
+        with self.assertRaises(frappe.ValidationError):
+            update_kitchen_status("KOT Item", kds_items[1:], "Cancelled")
+
+    def test_bulk_transition_checks_branch_access(self):
+        """Test that rows of a branch the user may not access are left alone."""
+        kds_name, kot_id = self.create_kds()
+        units = frappe.get_all("Kitchen Station", filters={"kot": kot_id}, pluck="name")
+
+        with patch("pos_restaurant_itb.utils.kds_realtime.kds_permissions", return_value=False):
+            with self.assertRaises(frappe.PermissionError):
+                update_kitchen_status("Kitchen Station", units, "Cooking")
+
+        self.assertEqual(frappe.db.get_value("Kitchen Station", units[0], "status"), "Queued")
+
+    def test_unit_moves_follow_transitions(self):
+        """Test that moving units of a per-line row is checked against the allowed transitions."""
+        frappe.conf.pos_restaurant_kitchen_station_storage = "per_line"
+        self.addCleanup(frappe.conf.pop, "pos_restaurant_kitchen_station_storage", None)
+        kds_name, kot_id = self.create_kds()
+        row = frappe.db.get_value("Kitchen Station", {"kot": kot_id}, "name")
+
+        result = move_kitchen_station_units(row, "Queued", "Served")
+        self.assertEqual(result["unit_counts"]["Served"], 1)
+
+        with self.assertRaises(frappe.ValidationError):
+            move_kitchen_station_units(row, "Served", "Queued")
+        with self.assertRaises(frappe.ValidationError):
+            move_kitchen_station_units(row, "Cancelled", "Cooking")
+
+    def test_unit_moves_check_branch_access(self):
+        """Test that units of a branch the user may not access cannot be moved."""
+        frappe.conf.pos_restaurant_kitchen_station_storage = "per_line"
+        self.addCleanup(frappe.conf.pop, "pos_restaurant_kitchen_station_storage", None)
+        kds_name, kot_id = self.create_kds()
+        row = frappe.db.get_value("Kitchen Station", {"kot": kot_id}, "name")
+
+        with patch("pos_restaurant_itb.utils.kds_realtime.kds_permissions", return_value=False):
+            with self.assertRaises(frappe.PermissionError):
+                move_kitchen_station_units(row, "Queued", "Cooking")
+
+        self.assertEqual(frappe.db.get_value("Kitchen Station", row, "queued_qty"), 1)
@@ -0,0 +1,68 @@
+# tests/test_kds_sync.py
+
+import frappe
+from frappe.utils import add_to_date, now_datetime
+from pos_restaurant_itb.api.kds_sync import get_kds_changes
+from pos_restaurant_itb.api.kitchen_status import update_kitchen_status
+from tests.utils import KitchenTestCase
+
+class TestKDSSync(KitchenTestCase):
+    def test_initial_sync_and_tombstones(self):
+        """Test a full sync without cursor, then only changes and tombstones after one."""
+        before = f"{add_to_date(now_datetime(), seconds=-1)}|"
+        kds_name, kot_id = self.create_kds()
+
+        changes = get_kds_changes("Test Branch")
+        kds = next(kds for kds in changes["kds"] if kds.name == kds_name)
+        self.assertEqual(kds.kot, kot_id)
+        self.assertEqual([item["item_code"] for item in kds["items"]], ["Test Food Item"])
+        self.assertIn(kot_id, [row["kot"] for row in changes["kitchen_station"]])
+        self.assertTrue(changes["cursor"])
+
+        frappe.db.set_value("Kitchen Display Order", kds_name, {
+            "archived": 1,
+            "last_updated": add_to_date(now_datetime(), seconds=1)
+        })
+
+        changes = get_kds_changes("Test Branch", since_cursor=before)
+        self.assertIn(kds_name, changes["removed"]["kds"])
+        self.assertNotIn(kds_name, [kds.name for kds in changes["kds"]])
+
+    def test_no_changes(self):
+        """Test that a poll after the latest change returns nothing and keeps its cursor."""
+        cursor = "2099-01-01 00:00:00|"
+
+        changes = get_kds_changes("Test Branch", since_cursor=cursor)
+
+        self.assertEqual(changes["kds"], [])
+        self.assertEqual(changes["kitchen_station"], [])
+        self.assertEqual(changes["removed"], {"kds": [], "kitchen_station": []})
+        self.assertEqual(changes["cursor"], "2099-01-01 00:00:00|")
+
+    def test_deleted_rows_are_tombstoned(self):
+        """Test that a deleted Kitchen Station row is listed under removed after a cursor."""
+        kds_name, kot_id = self.create_kds()
+        cursor = f"{add_to_date(now_datetime(), seconds=-1)}|"
+        row = frappe.db.get_value("Kitchen Station", {"kot": kot_id}, "name")
+
+        frappe.delete_doc("Kitchen Station", row, ignore_permissions=True)
+
+        changes = get_kds_changes("Test Branch", since_cursor=cursor)
+        self.assertTrue(frappe.db.exists("Kitchen Tombstone", {"reference_name": row, "branch": "Test Branch"}))
+        self.assertIn(row, changes["removed"]["kitchen_station"])
+        self.assertNotIn(row, [r["name"] for r in changes["kitchen_station"]])
+
+    def test_served_rows_are_removed_after_cursor(self):
+        """Test that served Kitchen Station rows are dropped on both the full and the incremental sync."""
+        kds_name, kot_id = self.create_kds()
+        cursor = f"{add_to_date(now_datetime(), seconds=-1)}|"
+        row = frappe.db.get_value("Kitchen Station", {"kot": kot_id}, "name")
+
+        update_kitchen_status("Kitchen Station", [row], "Served")
+
+        changes = get_kds_changes("Test Branch", since_cursor=cursor)
+        self.assertIn(row, changes["removed"]["kitchen_station"])
+        self.assertNotIn(row, [r["name"] for r in changes["kitchen_station"]])
+
+        changes = get_kds_changes("Test Branch")
+        self.assertNotIn(row, [r["name"] for r in changes["kitchen_station"]])
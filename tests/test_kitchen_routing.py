@@ -0,0 +1,101 @@
+# tests/test_kitchen_routing.py
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from pos_restaurant_itb.utils.kitchen_routing import (
+    clear_routing_index,
+    clear_station_printers,
+    get_printers_for_kitchen_station,
+    get_kitchen_stations_for_item,
+    get_kitchen_stations_for_items,
+)
+from tests.utils import (
+    make_test_branch,
+    make_test_item,
+    make_test_item_group,
+    make_test_kitchen_station,
+)
+
+class TestKitchenRouting(FrappeTestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Set up test data and dependencies."""
+        super().setUpClass()
+        make_test_branch()
+        make_test_item()
+
+        # Create test item group tree: Test Beverages > Test Hot Beverages
+        make_test_item_group("Test Beverages", is_group=1)
+        make_test_item_group("Test Hot Beverages", "Test Beverages")
+        make_test_item("Test Hot Tea", item_group="Test Hot Beverages", standard_rate=20)
+
+        # Create test kitchen stations
+        make_test_kitchen_station("Test Grill Station", item_group="Products")
+        make_test_kitchen_station("Test Expo Station", item_group="Services", allow_all_item_groups=1)
+        make_test_kitchen_station("Test Bar Station", item_group="Test Beverages")
+
+        clear_routing_index()
+        clear_station_printers()
+
+    def test_single_item_routing(self):
+        """Test that an item routes to all-groups stations first, then its group's stations."""
+        stations = get_kitchen_stations_for_item("Test Food Item", "Test Branch")
+        self.assertEqual(stations, ["Test Expo Station", "Test Grill Station"])
+
+    def test_descendant_item_group_routing(self):
+        """Test that a station configured for a group also gets items of its child groups."""
+        stations = get_kitchen_stations_for_item("Test Hot Tea", "Test Branch")
+        self.assertEqual(stations, ["Test Expo Station", "Test Bar Station"])
+
+        lines_by_station = get_kitchen_stations_for_items(["Test Hot Tea", "Test Food Item"], "Test Branch")
+        self.assertEqual(lines_by_station["Test Bar Station"], ["Test Hot Tea"])
+        self.assertEqual(lines_by_station["Test Grill Station"], ["Test Food Item"])
+
+    def test_whole_ticket_routing(self):
+        """Test station -> lines mapping for a whole ticket."""
+        lines = ["Test Food Item", "Test Food Item", "Test Food Item"]
+
+        lines_by_station = get_kitchen_stations_for_items(lines, "Test Branch")
+
+        self.assertEqual(len(lines_by_station["Test Grill Station"]), 3)
+        self.assertEqual(len(lines_by_station["Test Expo Station"]), 3)
+
+    def test_whole_ticket_routing_query_count(self):
+        """Test that routing a ticket costs the same queries regardless of its size."""
+        # Warm the routing index
+        get_kitchen_stations_for_items(["Test Food Item"], "Test Branch")
+
+        with self.assertQueryCount(1):
+            get_kitchen_stations_for_items(["Test Food Item"] * 2, "Test Branch")
+
+        with self.assertQueryCount(1):
+            get_kitchen_stations_for_items(["Test Food Item"] * 20, "Test Branch")
+
+    def test_station_printers_are_cached(self):
+        """Test that resolving a station's printers a second time reads nothing from the database."""
+        printers = get_printers_for_kitchen_station("Test Grill Station")
+
+        with self.assertQueryCount(0):
+            self.assertEqual(get_printers_for_kitchen_station("Test Grill Station"), printers)
+
+    def test_routing_index_is_cleared_after_commit(self):
+        """Test that a station change drops the routing index again once it commits."""
+        with patch.object(frappe.db.after_commit, "add") as after_commit:
+            clear_routing_index()
+
+        after_commit.assert_called_once()
+
+    def test_renamed_station_is_routed_by_new_name(self):
+        """Test that renaming a station drops the cached routing index."""
+        make_test_item_group("Test Rename Food")
+        make_test_item("Test Rename Dish", item_group="Test Rename Food")
+        make_test_kitchen_station("Test Rename Station", item_group="Test Rename Food")
+        self.assertIn("Test Rename Station", get_kitchen_stations_for_item("Test Rename Dish", "Test Branch"))
+
+        frappe.rename_doc("Kitchen Station Setup", "Test Rename Station", "Test Renamed Station", force=True)
+
+        stations = get_kitchen_stations_for_item("Test Rename Dish", "Test Branch")
+        self.assertIn("Test Renamed Station", stations)
+        self.assertNotIn("Test Rename Station", stations)
@@ -0,0 +1,71 @@
+# tests/test_kot_printing.py
+
+from unittest.mock import patch
+
+import frappe
+from pos_restaurant_itb.utils import kot_printing
+from pos_restaurant_itb.utils.kitchen_routing import clear_routing_index
+from tests.utils import (
+    KitchenTestCase,
+    create_test_order,
+    make_test_item,
+    make_test_item_group,
+    make_test_kitchen_station,
+)
+
+class TestKOTPrinting(KitchenTestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Set up test data and dependencies."""
+        super().setUpClass()
+        # Create an auto-printing station whose print format cannot be rendered
+        if not frappe.db.exists("Print Format", "Test Broken KOT Layout"):
+            frappe.get_doc({
+                "doctype": "Print Format",
+                "name": "Test Broken KOT Layout",
+                "doc_type": "Kitchen Order Ticket",
+                "standard": "No",
+                "raw_printing": 1,
+                "raw_commands": "[blink]{kot}"
+            }).insert(ignore_if_duplicate=True)
+
+        make_test_item_group("Test Printed Food")
+        make_test_item("Test Printed Item", item_group="Test Printed Food")
+        make_test_kitchen_station(
+            "Test Print Station",
+            item_group="Test Printed Food",
+            print_format="Test Broken KOT Layout",
+            auto_print_new_orders=1
+        )
+
+        clear_routing_index()
+
+    def test_broken_print_format_still_creates_kot(self):
+        """Test that a layout error falls back to the default layout instead of dropping the KOT."""
+        printers = [{
+            "printer_type": "Network",
+            "ip_address": "127.0.0.1",
+            "port": 9100,
+            "print_format": "Test Broken KOT Layout"
+        }]
+        with patch.object(kot_printing, "get_printers_for_kitchen_station", return_value=printers):
+            pos_order = create_test_order(item_code="Test Printed Item")
+
+            kot_id = frappe.db.get_value("POS Order Item", pos_order.items[0].name, "kot_id")
+            self.assertTrue(kot_id)
+            self.assertTrue(frappe.db.exists("Kitchen Display Order", f"KDS-{kot_id}"))
+
+            # The station still gets a ticket, in the default layout
+            jobs = kot_printing.build_print_jobs(frappe.get_doc("Kitchen Order Ticket", kot_id))
+            self.assertEqual(len(jobs), 1)
+            self.assertIn(b"Test Printed Item", jobs[0].data)
+
+    def test_print_error_does_not_block_kitchen_pipeline(self):
+        """Test that a failure while printing still leaves the KOT, KDS and Kitchen Station rows."""
+        with patch.object(kot_printing, "get_kitchen_stations_for_items", side_effect=Exception("Routing down")):
+            pos_order = create_test_order(item_code="Test Printed Item")
+
+        kot_id = frappe.db.get_value("POS Order Item", pos_order.items[0].name, "kot_id")
+        self.assertTrue(kot_id)
+        self.assertTrue(frappe.db.exists("Kitchen Display Order", f"KDS-{kot_id}"))
+        self.assertTrue(frappe.db.exists("Kitchen Station", {"kot": kot_id}))
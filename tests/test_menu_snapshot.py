@@ -0,0 +1,67 @@
+# tests/test_menu_snapshot.py
+
+import gzip
+import json
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from werkzeug.test import EnvironBuilder
+from werkzeug.wrappers import Request
+from pos_restaurant_itb.api.menu_snapshot import (
+    clear_menu_snapshot,
+    get_menu_delta,
+    get_menu_snapshot,
+)
+from tests.utils import make_test_branch, make_test_item
+
+class TestMenuSnapshot(FrappeTestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Set up test data and dependencies."""
+        super().setUpClass()
+        make_test_branch()
+
+        # Create test menu item
+        make_test_item("Test Menu Item", is_sales_item=1, standard_rate=50)
+
+        clear_menu_snapshot()
+
+    def request_snapshot(self, **headers):
+        request = Request(EnvironBuilder(method="GET", headers=headers).get_environ())
+        previous = getattr(frappe.local, "request", None)
+        frappe.local.request = request
+        try:
+            return get_menu_snapshot("Test Branch")
+        finally:
+            frappe.local.request = previous
+
+    def test_snapshot_is_compressed_and_conditional(self):
+        """Test the snapshot is served gzip-compressed with an ETag and answers 304 when unchanged."""
+        response = self.request_snapshot(**{"Accept-Encoding": "gzip"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        snapshot = json.loads(gzip.decompress(response.get_data()))
+        self.assertEqual(response.headers["ETag"], f'"{snapshot["version"]}"')
+        self.assertEqual(snapshot["items"]["Test Menu Item"]["uom"], "Nos")
+
+        response = self.request_snapshot(**{"If-None-Match": response.headers["ETag"]})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_data(), b"")
+
+    def test_menu_delta(self):
+        """Test that a delta carries only the entries changed since the terminal's version."""
+        version = get_menu_delta("Test Branch", "")["version"]
+        self.assertEqual(get_menu_delta("Test Branch", version), {"version": version, "unchanged": True})
+
+        item = frappe.get_doc("Item", "Test Menu Item")
+        item.item_name = "Test Menu Item Renamed"
+        item.save()
+
+        delta = get_menu_delta("Test Branch", version)
+        self.assertNotEqual(delta["version"], version)
+        self.assertEqual(list(delta["changed"]["items"]), ["Test Menu Item"])
+        self.assertEqual(delta["changed"]["items"]["Test Menu Item"]["item_name"], "Test Menu Item Renamed")
+        self.assertEqual(delta["removed"], {"items": [], "templates": []})
+
+        self.assertTrue(get_menu_delta("Test Branch", "unknown")["reset"])
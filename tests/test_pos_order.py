@@ -3,6 +3,7 @@
 import pytest
 import json
 import frappe
+from unittest.mock import patch
 from frappe.tests.utils import FrappeTestCase
 from frappe.utils import now_datetime
 from pos_restaurant_itb.utils.kot_helpers import get_attribute_summary
@@ -245,6 +246,178 @@ class TestPOSOrder(FrappeTestCase):
         self.assertEqual(stored_attrs[0]["attribute_value"], "Medium")
         self.assertEqual(stored_attrs[1]["attribute_name"], "Toppings")
         self.assertEqual(stored_attrs[1]["attribute_value"], "Cheese")
+    
+    def test_attribute_summary_stored_on_save(self):
+        """Test the attribute summary is computed when the order is saved and stored on the row."""
+        pos_order = frappe.new_doc("POS Order")
+        pos_order.branch = "Test Branch"
+        pos_order.order_type = "Dine In"
+        pos_order.table = "Test Table-1"
+        pos_order.append("items", {
+            "item_code": "Test Food Variant-M-C",
+            "item_name": "Test Food Variant Medium Cheese",
+            "qty": 1,
+            "rate": 120,
+            "amount": 120,
+            "template_item": "Test Food Template",
+            "variant_attributes": json.dumps([
+                {"attribute_name": "Spice Level", "attribute_value": "Medium"},
+                {"attribute_name": "Toppings", "attribute_value": "Cheese"}
+            ])
+        })
+        pos_order.insert()
+        
+        stored = frappe.db.get_value("POS Order Item", pos_order.items[0].name, "attribute_summary")
+        self.assertEqual(stored, "Spice Level: Medium, Toppings: Cheese")
+    
+    def test_canonical_attributes(self):
+        """Test attributes are stored in canonical form with a hash shared by identical selections."""
+        from pos_restaurant_itb.utils.variants import get_attribute_signature
+        
+        pos_order = frappe.new_doc("POS Order")
+        pos_order.branch = "Test Branch"
+        pos_order.order_type = "Dine In"
+        pos_order.table = "Test Table-1"
+        for attrs in (
+            [
+                {"attribute_name": "Toppings", "attribute_value": "Cheese"},
+                {"attribute_name": "Spice Level", "attribute_value": "Medium"},
+                {"attribute_name": "Toppings", "attribute_value": "Cheese"}
+            ],
+            [
+                {"attribute_value": "Medium", "attribute_name": "Spice Level"},
+                {"attribute_value": "Cheese", "attribute_name": "Toppings"}
+            ]
+        ):
+            pos_order.append("items", {
+                "item_code": "Test Food Variant-M-C",
+                "qty": 1,
+                "rate": 120,
+                "template_item": "Test Food Template",
+                "variant_attributes": json.dumps(attrs, indent=2)
+            })
+        pos_order.insert()
+        
+        first, second = pos_order.items
+        self.assertEqual(
+            first.variant_attributes,
+            '[{"attribute_name":"Spice Level","attribute_value":"Medium"},'
+            '{"attribute_name":"Toppings","attribute_value":"Cheese"}]'
+        )
+        self.assertEqual(second.variant_attributes, first.variant_attributes)
+        self.assertEqual(len(first.attributes_hash), 40)
+        self.assertEqual(second.attributes_hash, first.attributes_hash)
+        self.assertEqual(
+            first.attributes_hash,
+            get_attribute_signature({"Toppings": "Cheese", "Spice Level": "Medium"})
+        )
+    
+    def test_multi_value_attributes_kept(self):
+        """Test that several values of one attribute survive the canonical encoding."""
+        from pos_restaurant_itb.utils.variants import encode_attributes
+        
+        encoded = encode_attributes([
+            {"attribute_name": "Toppings", "attribute_value": "Extra Cheese"},
+            {"attribute_name": "Spice Level", "attribute_value": "Hot"},
+            {"attribute_name": "Toppings", "attribute_value": "Cheese"},
+            {"attribute_name": "Toppings", "attribute_value": "Extra Cheese"}
+        ])
+        
+        self.assertEqual(
+            json.loads(encoded),
+            [
+                {"attribute_name": "Spice Level", "attribute_value": "Hot"},
+                {"attribute_name": "Toppings", "attribute_value": "Cheese"},
+                {"attribute_name": "Toppings", "attribute_value": "Extra Cheese"}
+            ]
+        )
+    
+    def test_resolve_item_variant(self):
+        """Test variant resolution through the cached variant index."""
+        from pos_restaurant_itb.pos_restaurant_itb.doctype.pos_order_item.pos_order_item import POSOrderItem
+        from pos_restaurant_itb.utils.variants import clear_variant_index
+        
+        clear_variant_index(frappe.get_doc("Item", "Test Food Template"))
+        
+        # Attribute order does not matter
+        attrs = [
+            {"attribute_name": "Toppings", "attribute_value": "Cheese"},
+            {"attribute_name": "Spice Level", "attribute_value": "Medium"}
+        ]
+        self.assertEqual(POSOrderItem.resolve_item_variant("Test Food Template", attrs), "Test Food Variant-M-C")
+        
+        # A partial selection matches a variant having those values
+        partial = [{"attribute_name": "Spice Level", "attribute_value": "Medium"}]
+        self.assertEqual(POSOrderItem.resolve_item_variant("Test Food Template", partial), "Test Food Variant-M-C")
+        
+        no_match = [{"attribute_name": "Spice Level", "attribute_value": "Hot"}]
+        self.assertIsNone(POSOrderItem.resolve_item_variant("Test Food Template", no_match))
+        
+        # Served from the cached index
+        with self.assertQueryCount(0):
+            POSOrderItem.resolve_item_variant("Test Food Template", json.dumps(attrs))
+    
+    def test_get_attributes_for_item(self):
+        """Test the cached attribute catalog and its version token."""
+        from pos_restaurant_itb.api.get_attributes_for_item import get_attributes_for_item
+        from pos_restaurant_itb.utils.variants import clear_attribute_catalog
+        
+        clear_attribute_catalog(frappe.get_doc("Item", "Test Food Template"))
+        
+        attributes = get_attributes_for_item("Test Food Template")
+        self.assertEqual(attributes[0], {"attribute": "Spice Level", "values": ["Mild", "Medium", "Hot"]})
+        self.assertEqual(get_attributes_for_item("Test Food Variant-M-C"), [])
+        
+        catalog = get_attributes_for_item("Test Food Template", version="")
+        self.assertEqual(catalog["attributes"], attributes)
+        
+        with self.assertQueryCount(0):
+            unchanged = get_attributes_for_item("Test Food Template", version=catalog["version"])
+        self.assertEqual(unchanged, {"version": catalog["version"], "unchanged": True})
+    
+    def test_resolve_variants_for_cart(self):
+        """Test batch variant resolution reports one result per line."""
+        from pos_restaurant_itb.api.resolve_variant import resolve_variants
+        
+        medium_cheese = [
+            {"attribute_name": "Spice Level", "attribute_value": "Medium"},
+            {"attribute_name": "Toppings", "attribute_value": "Cheese"}
+        ]
+        hot = [{"attribute_name": "Spice Level", "attribute_value": "Hot"}]
+        
+        results = resolve_variants(json.dumps([
+            {"template": "Test Food Template", "attributes": medium_cheese},
+            ["Test Food Template", json.dumps(hot)],
+            {"template": "Test Food Template", "attributes": medium_cheese}
+        ]))
+        
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0]["status"], "success")
+        self.assertEqual(results[0]["item_code"], "Test Food Variant-M-C")
+        self.assertEqual(results[0]["uom"], "Nos")
+        self.assertEqual(results[1]["status"], "error")
+        self.assertEqual(results[2], results[0])
+    
+    def test_resolve_variants_skips_malformed_lines(self):
+        """Test that malformed cart lines are reported without failing the cart, on one query."""
+        from pos_restaurant_itb.api.resolve_variant import resolve_variants
+        from pos_restaurant_itb.utils.variants import VARIANT_INDEX_CACHE_KEY
+        
+        medium_cheese = [
+            {"attribute_name": "Spice Level", "attribute_value": "Medium"},
+            {"attribute_name": "Toppings", "attribute_value": "Cheese"}
+        ]
+        frappe.cache().delete_value(VARIANT_INDEX_CACHE_KEY)
+        
+        with self.assertQueryCount(1):
+            results = resolve_variants([
+                "Test Food Template",
+                ["Test Food Template", medium_cheese, "extra"],
+                {"template": "Test Food Template", "attributes": medium_cheese}
+            ])
+        
+        self.assertEqual([r["status"] for r in results], ["error", "error", "success"])
+        self.assertEqual(results[2]["item_code"], "Test Food Variant-M-C")
 
 
 class TestKOTCreation(FrappeTestCase):
@@ -465,6 +638,110 @@ class TestKOTCreation(FrappeTestCase):
             self.assertEqual(item.sent_to_kitchen, 1)
             self.assertTrue(item.kot_id)
 
+    def test_batch_kot_creation(self):
+        """Test creating KOTs for several POS Orders in one call."""
+        from pos_restaurant_itb.api.create_kot import create_kots_for_orders
+        
+        order_names = []
+        for qty in (1, 3):
+            pos_order = frappe.new_doc("POS Order")
+            pos_order.branch = "Test Branch"
+            pos_order.order_type = "Dine In"
+            pos_order.table = "Test Table-1"
+            pos_order.append("items", {
+                "item_code": "Test Food Item",
+                "item_name": "Test Food Item",
+                "qty": qty,
+                "rate": 100,
+                "amount": 100 * qty,
+                "sent_to_kitchen": 0
+            })
+            pos_order.total_amount = 100 * qty
+            pos_order.insert()
+            
+            # Undo the automatic send so the batch has something to fire
+            frappe.db.set_value("POS Order Item", pos_order.items[0].name, {"sent_to_kitchen": 0, "kot_id": None})
+            order_names.append(pos_order.name)
+        
+        results = create_kots_for_orders(order_names + ["TEST-DOES-NOT-EXIST"])
+        
+        self.assertEqual(results["TEST-DOES-NOT-EXIST"]["status"], "error")
+        kot_ids = [results[name]["kot_id"] for name in order_names]
+        for name in order_names:
+            self.assertEqual(results[name]["status"], "success")
+        self.assertNotEqual(kot_ids[0], kot_ids[1])
+        
+        date_str = now_datetime().strftime("%Y%m%d")
+        for name, kot_id in zip(order_names, kot_ids):
+            self.assertTrue(kot_id.startswith(f"KOT-{date_str}-TEST-"))
+            
+            kot = frappe.get_doc("Kitchen Order Ticket", kot_id)
+            self.assertEqual(kot.pos_order, name)
+            self.assertEqual(len(kot.kot_items), 1)
+            
+            item = frappe.get_all("POS Order Item", filters={"parent": name}, fields=["sent_to_kitchen", "kot_id"])[0]
+            self.assertEqual(item.sent_to_kitchen, 1)
+            self.assertEqual(item.kot_id, kot_id)
+            
+            # The KOT after_insert pipeline still ran
+            self.assertTrue(frappe.db.exists("Kitchen Display Order", f"KDS-{kot_id}"))
+        
+        # Nothing left to send on a second call
+        results = create_kots_for_orders(order_names)
+        for name in order_names:
+            self.assertEqual(results[name]["status"], "warning")
+    
+    def test_kitchen_pipeline_does_not_commit(self):
+        """Test that POS Order -> KOT -> KDS -> Kitchen Station runs in one transaction."""
+        pos_order = frappe.new_doc("POS Order")
+        pos_order.branch = "Test Branch"
+        pos_order.order_type = "Dine In"
+        pos_order.table = "Test Table-1"
+        pos_order.append("items", {
+            "item_code": "Test Food Item",
+            "item_name": "Test Food Item",
+            "qty": 2,
+            "rate": 100,
+            "amount": 200,
+            "sent_to_kitchen": 0
+        })
+        pos_order.total_amount = 200
+
+        # after_insert builds the whole kitchen chain; the request commits once at the end
+        with patch.object(frappe.db, "commit") as commit:
+            pos_order.insert()
+
+        self.assertEqual(commit.call_count, 0)
+
+        kot_id = frappe.db.get_value("POS Order Item", pos_order.items[0].name, "kot_id")
+        self.assertTrue(kot_id)
+        self.assertTrue(frappe.db.exists("Kitchen Display Order", f"KDS-{kot_id}"))
+        self.assertEqual(frappe.db.count("Kitchen Station", {"kot": kot_id}), 2)
+
+    def test_kitchen_pipeline_error_aborts_order(self):
+        """Test that a failure while building the KOT is raised instead of saving a partial chain."""
+        pos_order = frappe.new_doc("POS Order")
+        pos_order.branch = "Test Branch"
+        pos_order.order_type = "Dine In"
+        pos_order.table = "Test Table-1"
+        pos_order.append("items", {
+            "item_code": "Test Food Item",
+            "item_name": "Test Food Item",
+            "qty": 1,
+            "rate": 100,
+            "amount": 100,
+            "sent_to_kitchen": 0
+        })
+        pos_order.total_amount = 100
+
+        with patch(
+            "pos_restaurant_itb.api.create_kot.get_waiter_from_user",
+            side_effect=frappe.ValidationError("Waiter lookup failed")
+        ):
+            with self.assertRaises(frappe.ValidationError):
+                pos_order.insert()
+
+
 
 class TestAttributeSummary(FrappeTestCase):
     def test_attribute_summary_valid_input(self):
@@ -525,4 +802,15 @@ class TestAttributeSummary(FrappeTestCase):
         self.assertEqual(get_attribute_summary("{invalid json}"), "")
         
         # Test with non-list, non-string input
-        self.assertEqual(get_attribute_summary(123), "")
\ No newline at end of file
+        self.assertEqual(get_attribute_summary(123), "")
+    
+    def test_attribute_summary_json_parsed_once(self):
+        """Test that the same attribute JSON is only parsed once."""
+        from pos_restaurant_itb.utils.kot_helpers import _summarize_attributes_json
+        
+        json_attrs = json.dumps([{"attribute_name": "Sauce", "attribute_value": "Sambal"}])
+        get_attribute_summary(json_attrs)
+        hits = _summarize_attributes_json.cache_info().hits
+        
+        self.assertEqual(get_attribute_summary(json_attrs), "Sauce: Sambal")
+        self.assertEqual(_summarize_attributes_json.cache_info().hits, hits + 1)
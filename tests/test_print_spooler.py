@@ -0,0 +1,170 @@
+# tests/test_print_spooler.py
+
+import socket
+import socketserver
+import threading
+import time
+import unittest
+
+from pos_restaurant_itb.utils.print_spooler import PrintJob, PrintSpooler, get_spooler, stop_spooler
+
+class StandInPrinter(socketserver.ThreadingTCPServer):
+    """Local TCP server that records what a network printer would receive."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        self.received = b""
+        self.connections = 0
+        self.open_sockets = []
+        self.lock = threading.Lock()
+        super().__init__(("127.0.0.1", 0), StandInPrinterHandler)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def address(self):
+        return self.server_address
+
+    def wait_for(self, data, timeout=5):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self.lock:
+                if self.received == data:
+                    return True
+            time.sleep(0.01)
+        return False
+
+    def drop_connections(self):
+        """Close the printer side of every open connection, like a power cycle."""
+        with self.lock:
+            sockets, self.open_sockets = self.open_sockets, []
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                # Already closed by the client
+                pass
+
+    def close(self):
+        self.drop_connections()
+        self.shutdown()
+        self.server_close()
+
+class StandInPrinterHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        with self.server.lock:
+            self.server.connections += 1
+            self.server.open_sockets.append(self.request)
+        while True:
+            try:
+                chunk = self.request.recv(4096)
+            except OSError:
+                break
+            if not chunk:
+                break
+            with self.server.lock:
+                self.server.received += chunk
+        with self.server.lock:
+            if self.request in self.server.open_sockets:
+                self.server.open_sockets.remove(self.request)
+
+def get_offline_address():
+    """Address of a port nothing listens on."""
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    address = sock.getsockname()
+    sock.close()
+    return address
+
+class TestPrintSpooler(unittest.TestCase):
+    def setUp(self):
+        self.printer = StandInPrinter()
+        self.failed = []
+        self.spooler = PrintSpooler(attempts=2, timeout=1, backoff=0.01, on_failed=self.failed.append)
+
+    def tearDown(self):
+        self.spooler.stop()
+        self.printer.close()
+
+    def test_tickets_share_one_connection(self):
+        """Test that tickets for a printer are sent in order over one persistent connection."""
+        jobs = [PrintJob(f"ticket {i}\n".encode(), [self.printer.address]) for i in range(3)]
+        for job in jobs:
+            self.spooler.submit(job)
+
+        for job in jobs:
+            self.assertTrue(job.done.wait(5))
+            self.assertEqual(job.printed_on, self.printer.address)
+
+        self.assertTrue(self.printer.wait_for(b"ticket 0\nticket 1\nticket 2\n"))
+        self.assertEqual(self.printer.connections, 1)
+
+    def test_failover_to_next_printer(self):
+        """Test that a ticket moves to the next printer after retries on an offline one."""
+        offline = get_offline_address()
+        job = self.spooler.submit(PrintJob(b"ticket\n", [offline, self.printer.address]))
+
+        self.assertTrue(job.done.wait(5))
+        self.assertEqual(job.printed_on, self.printer.address)
+        self.assertEqual([address for address, error in job.errors], [offline, offline])
+        self.assertTrue(self.printer.wait_for(b"ticket\n"))
+        self.assertEqual(self.failed, [])
+
+    def test_all_printers_offline(self):
+        """Test that submitting never blocks and a job fails once every printer is tried."""
+        job = PrintJob(b"ticket\n", [get_offline_address(), get_offline_address()])
+
+        started = time.monotonic()
+        self.spooler.submit(job)
+        self.assertLess(time.monotonic() - started, 0.5)
+
+        self.assertTrue(job.done.wait(5))
+        self.assertTrue(job.failed)
+        self.assertEqual(len(job.errors), 4)
+        self.assertEqual(self.failed, [job])
+
+    def test_reconnects_after_printer_restart(self):
+        """Test that a dropped pooled connection is replaced on the next ticket."""
+        first = self.spooler.submit(PrintJob(b"one\n", [self.printer.address]))
+        self.assertTrue(first.done.wait(5))
+        self.assertTrue(self.printer.wait_for(b"one\n"))
+
+        self.printer.drop_connections()
+        # Let the spooler see the connection close
+        time.sleep(0.2)
+
+        second = self.spooler.submit(PrintJob(b"two\n", [self.printer.address]))
+        self.assertTrue(second.done.wait(5))
+        self.assertEqual(second.printed_on, self.printer.address)
+        self.assertTrue(self.printer.wait_for(b"one\ntwo\n"))
+        self.assertEqual(self.printer.connections, 2)
+
+    def test_stop_reports_unsent_jobs(self):
+        """Test that jobs still waiting when the spooler stops fail through on_failed."""
+        spooler = PrintSpooler(attempts=2, timeout=1, backoff=30, on_failed=self.failed.append)
+        job = spooler.submit(PrintJob(b"ticket\n", [get_offline_address()]))
+        # Let the first attempt fail, the retry then waits for the backoff
+        time.sleep(0.2)
+
+        spooler.stop()
+
+        self.assertTrue(job.done.is_set())
+        self.assertTrue(job.failed)
+        self.assertEqual(self.failed, [job])
+
+    def test_spooler_rebuilt_on_config_change(self):
+        """Test that the shared spooler is replaced when its settings change, after draining the old one."""
+        self.addCleanup(stop_spooler)
+        first = get_spooler(attempts=2, timeout=1)
+        self.assertIs(get_spooler(attempts=2, timeout=1), first)
+
+        job = first.submit(PrintJob(b"ticket\n", [self.printer.address]))
+        second = get_spooler(attempts=3, timeout=1)
+
+        self.assertIsNot(second, first)
+        self.assertEqual(second.attempts, 3)
+        self.assertTrue(job.done.wait(5))
+        self.assertEqual(job.printed_on, self.printer.address)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+# tests/test_sequence.py
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from pos_restaurant_itb.api.kitchen_station import bulk_insert_kitchen_station_rows, has_doc_event_hooks
+from pos_restaurant_itb.utils import sequence
+from pos_restaurant_itb.utils.kot_helpers import KITCHEN_STATUSES, get_status_qty_field
+from pos_restaurant_itb.utils.sequence import get_sequence_key, next_sequence
+from tests.utils import TEST_BRANCH, TEST_ITEM, KitchenTestCase
+
+class TestSequenceAllocator(FrappeTestCase):
+    def setUp(self):
+        self.key_parts = ("POS Order", "SEQTEST", "20000101")
+        frappe.db.delete("POS Sequence", {"name": get_sequence_key(*self.key_parts)})
+        sequence._blocks.clear()
+
+    def tearDown(self):
+        frappe.conf.pop("pos_restaurant_sequence_block_size", None)
+        sequence._blocks.clear()
+        frappe.db.rollback()
+
+    def test_numbers_increment_without_gaps(self):
+        """Test that the default block size hands out consecutive numbers."""
+        numbers = [next_sequence(*self.key_parts) for _ in range(3)]
+        self.assertEqual(numbers, [1, 2, 3])
+
+        current = frappe.db.get_value("POS Sequence", get_sequence_key(*self.key_parts), "current")
+        self.assertEqual(current, 3)
+
+    def test_block_allocation(self):
+        """Test that a block is reserved once and served from memory."""
+        frappe.conf.pos_restaurant_sequence_block_size = 5
+
+        numbers = [next_sequence(*self.key_parts) for _ in range(5)]
+        self.assertEqual(numbers, [1, 2, 3, 4, 5])
+
+        # Only one reservation hit the store for the whole block
+        current = frappe.db.get_value("POS Sequence", get_sequence_key(*self.key_parts), "current")
+        self.assertEqual(current, 5)
+
+        # The next call reserves a fresh block
+        self.assertEqual(next_sequence(*self.key_parts), 6)
+        current = frappe.db.get_value("POS Sequence", get_sequence_key(*self.key_parts), "current")
+        self.assertEqual(current, 10)
+
+class TestKitchenStationNames(KitchenTestCase):
+    def test_bulk_and_single_inserts_share_the_series(self):
+        """Test that bulk and per-document Kitchen Station inserts get consecutive, distinct names."""
+        kds_name, kot_id = self.create_kds()
+        row = {
+            "kot": kot_id,
+            "branch": TEST_BRANCH,
+            "item_code": TEST_ITEM,
+            "item_name": TEST_ITEM,
+            "item_group": "Products",
+            "status": "Queued",
+            "cancelled": 0,
+            "qty": 1
+        }
+        row.update({get_status_qty_field(status): 0 for status in KITCHEN_STATUSES})
+
+        bulk_names = bulk_insert_kitchen_station_rows([dict(row), dict(row)])
+        single = frappe.new_doc("Kitchen Station")
+        single.update(row)
+        single.insert(ignore_permissions=True)
+
+        names = bulk_names + [single.name]
+        numbers = [int(name.rsplit("-", 1)[1]) for name in names]
+        self.assertEqual(len(set(names)), 3)
+        self.assertEqual(numbers, list(range(numbers[0], numbers[0] + 3)))
+
+    def test_wildcard_doc_events_keep_per_document_inserts(self):
+        """Test that insert handlers of another app for every doctype disable the bulk path."""
+        def has_hooks(doc_events_by_app):
+            def get_hooks(hook=None, default=None, app_name=None):
+                return doc_events_by_app.get(app_name, {})
+            with patch.object(frappe, "get_installed_apps", return_value=list(doc_events_by_app)), \
+                    patch.object(frappe, "get_hooks", side_effect=get_hooks):
+                return has_doc_event_hooks("Kitchen Station")
+
+        framework = {"*": {"on_update": ["frappe.desk.notifications.clear_doctype_notifications"]}}
+        own = {"Kitchen Station": {"on_trash": "pos_restaurant_itb.tombstone"}}
+
+        self.assertFalse(has_hooks({"frappe": framework, "pos_restaurant_itb": own}))
+        self.assertTrue(has_hooks({
+            "frappe": framework,
+            "pos_restaurant_itb": own,
+            "other_app": {"*": {"validate": "other_app.validate"}}
+        }))
+        self.assertTrue(has_hooks({"frappe": {}, "other_app": {"Kitchen Station": {"after_insert": "x"}}}))
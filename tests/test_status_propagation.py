@@ -0,0 +1,81 @@
+# tests/test_status_propagation.py
+
+import frappe
+from pos_restaurant_itb.api.create_kot import create_kots_for_orders
+from pos_restaurant_itb.api.kitchen_status import update_kitchen_status
+from pos_restaurant_itb.utils.status_propagation import propagating
+from tests.utils import TEST_ITEM, KitchenTestCase
+
+class TestStatusPropagation(KitchenTestCase):
+    def test_served_units_make_order_ready_for_billing(self):
+        """Test that serving every Kitchen Station unit rolls up to the KOT and the POS Order."""
+        kds_name, kot_id = self.create_kds(lines=2)
+        pos_order = frappe.db.get_value("Kitchen Order Ticket", kot_id, "pos_order")
+        units = frappe.get_all("Kitchen Station", filters={"kot": kot_id}, pluck="name")
+
+        result = update_kitchen_status("Kitchen Station", units[:1], "Served")
+        self.assertEqual(result["pos_order"], {})
+        self.assertNotEqual(frappe.db.get_value("POS Order", pos_order, "status"), "Ready for Billing")
+
+        result = update_kitchen_status("Kitchen Station", units[1:], "Served")
+
+        self.assertEqual(result["kds"], {kds_name: "Served"})
+        self.assertEqual(result["kot"], {kot_id: "Served"})
+        self.assertEqual(result["pos_order"], {pos_order: "Ready for Billing"})
+        self.assertEqual(frappe.db.get_value("Kitchen Order Ticket", kot_id, "status"), "Served")
+        self.assertEqual(frappe.db.get_value("POS Order", pos_order, "status"), "Ready for Billing")
+
+    def test_kds_save_during_propagation_does_not_loop(self):
+        """Test that a KDS saved while a change propagates leaves its KOT to the propagation."""
+        kds_name, kot_id = self.create_kds()
+
+        kds = frappe.get_doc("Kitchen Display Order", kds_name)
+        kds.status = "In Progress"
+        with propagating():
+            kds.save()
+        self.assertEqual(frappe.db.get_value("Kitchen Order Ticket", kot_id, "status"), "New")
+
+        kds.reload()
+        kds.status = "In Progress"
+        kds.save()
+        self.assertEqual(frappe.db.get_value("Kitchen Order Ticket", kot_id, "status"), "In Progress")
+
+    def test_reopened_kitchen_work_takes_order_back_to_in_progress(self):
+        """Test that stepping an item back reopens a Ready for Billing order."""
+        kds_name, kot_id = self.create_kds()
+        pos_order = frappe.db.get_value("Kitchen Order Ticket", kot_id, "pos_order")
+        units = frappe.get_all("Kitchen Station", filters={"kot": kot_id}, pluck="name")
+
+        update_kitchen_status("Kitchen Station", units, "Ready")
+        self.assertEqual(frappe.db.get_value("POS Order", pos_order, "status"), "Ready for Billing")
+
+        result = update_kitchen_status("Kitchen Station", units, "Cooking")
+
+        self.assertEqual(result["pos_order"], {pos_order: "In Progress"})
+        self.assertEqual(frappe.db.get_value("POS Order", pos_order, "status"), "In Progress")
+
+    def test_batch_kot_reopens_ready_for_billing_order(self):
+        """Test that a batch-created KOT takes a Ready for Billing order back to In Progress."""
+        kds_name, kot_id = self.create_kds()
+        pos_order = frappe.db.get_value("Kitchen Order Ticket", kot_id, "pos_order")
+        units = frappe.get_all("Kitchen Station", filters={"kot": kot_id}, pluck="name")
+
+        update_kitchen_status("Kitchen Station", units, "Served")
+        self.assertEqual(frappe.db.get_value("POS Order", pos_order, "status"), "Ready for Billing")
+
+        order = frappe.get_doc("POS Order", pos_order)
+        order.append("items", {
+            "item_code": TEST_ITEM,
+            "item_name": TEST_ITEM,
+            "qty": 1,
+            "rate": 100,
+            "amount": 100,
+            "sent_to_kitchen": 0
+        })
+        order.total_amount = 200
+        order.save()
+
+        results = create_kots_for_orders([pos_order])
+
+        self.assertEqual(results[pos_order]["status"], "success")
+        self.assertEqual(frappe.db.get_value("POS Order", pos_order, "status"), "In Progress")
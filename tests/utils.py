@@ -0,0 +1,94 @@
+# tests/utils.py
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+TEST_BRANCH = "Test Branch"
+TEST_TABLE = "Test Table-1"
+TEST_ITEM = "Test Food Item"
+
+def make_test_branch():
+    if not frappe.db.exists("Branch", TEST_BRANCH):
+        frappe.get_doc({
+            "doctype": "Branch",
+            "branch": TEST_BRANCH,
+            "branch_code": "TEST",
+            "company": "_Test Company",
+            "is_active": 1
+        }).insert(ignore_if_duplicate=True)
+
+def make_test_table():
+    if not frappe.db.exists("POS Table", TEST_TABLE):
+        frappe.get_doc({
+            "doctype": "POS Table",
+            "table_id": TEST_TABLE,
+            "branch": TEST_BRANCH,
+            "is_active": 1
+        }).insert(ignore_if_duplicate=True)
+
+def make_test_item(item_code=TEST_ITEM, **fields):
+    if not frappe.db.exists("Item", item_code):
+        frappe.get_doc(dict({
+            "doctype": "Item",
+            "item_code": item_code,
+            "item_name": item_code,
+            "item_group": "Products",
+            "stock_uom": "Nos",
+            "is_stock_item": 0,
+            "standard_rate": 100
+        }, **fields)).insert(ignore_if_duplicate=True)
+
+def make_test_item_group(item_group_name, parent_item_group="All Item Groups", is_group=0):
+    if not frappe.db.exists("Item Group", item_group_name):
+        frappe.get_doc({
+            "doctype": "Item Group",
+            "item_group_name": item_group_name,
+            "parent_item_group": parent_item_group,
+            "is_group": is_group
+        }).insert(ignore_if_duplicate=True)
+
+def make_test_kitchen_station(station_name, **fields):
+    if not frappe.db.exists("Kitchen Station Setup", station_name):
+        frappe.get_doc(dict({
+            "doctype": "Kitchen Station Setup",
+            "station_name": station_name,
+            "branch": TEST_BRANCH,
+            "is_active": 1
+        }, **fields)).insert(ignore_if_duplicate=True)
+
+def create_test_order(lines=1, item_code=TEST_ITEM):
+    """Create a POS Order whose after_insert builds the KOT, KDS and Kitchen Station rows."""
+    pos_order = frappe.new_doc("POS Order")
+    pos_order.branch = TEST_BRANCH
+    pos_order.order_type = "Dine In"
+    pos_order.table = TEST_TABLE
+    for i in range(lines):
+        pos_order.append("items", {
+            "item_code": item_code,
+            "item_name": item_code,
+            "qty": 1,
+            "rate": 100,
+            "amount": 100,
+            "note": f"Line {i}",
+            "sent_to_kitchen": 0
+        })
+    pos_order.total_amount = 100 * lines
+    pos_order.insert()
+    return pos_order
+
+class KitchenTestCase(FrappeTestCase):
+    """Test case with the test branch, table and food item in place"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up test data and dependencies."""
+        super().setUpClass()
+        make_test_branch()
+        make_test_table()
+        make_test_item()
+
+    def create_kds(self, lines=1):
+        """Create a POS Order and return the names of its KDS and KOT."""
+        pos_order = create_test_order(lines)
+        kot_id = frappe.db.get_value("POS Order Item", pos_order.items[0].name, "kot_id")
+        return f"KDS-{kot_id}", kot_id